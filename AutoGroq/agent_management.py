@@ -1,33 +1,31 @@
 # agent_management.py
 
 import base64
-import json
 import logging
 import os   
 import re
-import requests
 import streamlit as st
 
-from configs.config import BUILT_IN_AGENTS, LLM_PROVIDER, FALLBACK_MODEL_TOKEN_LIMITS, SUPPORTED_PROVIDERS
+from configs.config import (BUILT_IN_AGENTS, CAPABILITY_TIERS, DEFAULT_CAPABILITY_TIER, FALLBACK_MODEL_TOKEN_LIMITS,
+                            SUPPORTED_PROVIDERS)
 
 from models.agent_base_model import AgentBaseModel
-from models.tool_base_model import ToolBaseModel
-from utils.api_utils import fetch_available_models, get_api_key
+from utils.api_utils import extract_content, fetch_available_models, get_api_key
 from utils.error_handling import log_error
+from utils.persistence_utils import get_project_store, record_agent, record_agents
 from utils.tool_utils import populate_tool_models, show_tools
-from utils.ui_utils import display_goal, get_llm_provider, update_discussion_and_whiteboard
+from utils.ui_utils import display_goal, get_llm_provider, get_session_engine, show_engine_messages
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
 def agent_button_callback(agent_index):
     def callback():
-        logger.debug(f"Agent button clicked for index: {agent_index}")
+        logger.debug("Agent button clicked for index: %s", agent_index)
         st.session_state['selected_agent_index'] = agent_index
         agent = st.session_state.agents[agent_index]
         
-        logger.debug(f"Agent: {agent}")
+        logger.debug("Agent: %s", agent)
         
         # Check if the agent is an instance of AgentBaseModel
         if isinstance(agent, AgentBaseModel):
@@ -38,7 +36,7 @@ def agent_button_callback(agent_index):
             agent_name = agent.get('config', {}).get('name', '')
             agent_description = agent.get('description', '')
         
-        logger.debug(f"Agent name: {agent_name}, description: {agent_description}")
+        logger.debug("Agent name: %s, description: %s", agent_name, agent_description)
         
         st.session_state['form_agent_name'] = agent_name
         st.session_state['form_agent_description'] = agent_description
@@ -48,37 +46,7 @@ def agent_button_callback(agent_index):
 
 
 def construct_request(agent, agent_name, description, user_request, user_input, rephrased_request, reference_url, tool_results):
-    request = f"Act as the {agent_name} who {description}."
-    if user_request:
-        request += f" Original request was: {user_request}."
-    if rephrased_request:
-        request += f" You are helping a team work on satisfying {rephrased_request}."
-    if user_input:
-        request += f" Additional input: {user_input}."
-    if reference_url and reference_url in st.session_state.reference_html:
-        html_content = st.session_state.reference_html[reference_url]
-        request += f" Reference URL content: {html_content}."
-    if st.session_state.discussion:
-        request += f" The discussion so far has been {st.session_state.discussion[-50000:]}."
-    if tool_results:
-        request += f" tool results: {tool_results}."
-    
-    # Check if agent is an AgentBaseModel instance
-    if isinstance(agent, AgentBaseModel):
-        agent_tools = agent.tools
-    else:
-        agent_tools = agent.get('tools', [])
-    
-    if agent_tools:
-        request += "\n\nYou have access to the following tools:\n"
-        for tool in agent_tools:
-            if isinstance(tool, ToolBaseModel):
-                request += f"{str(tool)}\n"
-            elif isinstance(tool, dict):
-                request += f"{tool.get('name', 'Unknown Tool')}: {tool.get('description', 'No description available')}\n"
-        request += "\nTo use a tool, include its name and arguments in your response, e.g., 'I will use calculate_compound_interest(1000, 0.05, 10) to determine the future value.'"
-    
-    return request
+    return get_session_engine().construct_request(agent, agent_name, description, user_request, user_input, rephrased_request, reference_url, tool_results)
 
 
 def display_agents():
@@ -180,6 +148,7 @@ def display_agent_edit_form(agent, edit_index):
             if st.session_state.get(f"delete_confirmed_{edit_index}_{agent.name}", False):
                 if st.button("Confirm Deletion", key=f"confirm_delete_{edit_index}_{agent.name}"):
                     st.session_state.agents.pop(edit_index)
+                    record_agents(get_project_store(), st.session_state)
                     st.session_state[f'show_edit_{edit_index}'] = False
                     del st.session_state[f"delete_confirmed_{edit_index}_{agent.name}"]
                     st.experimental_rerun()
@@ -191,6 +160,7 @@ def display_agent_edit_form(agent, edit_index):
             if container.button("X", key=f"delete_{edit_index}_{agent.name}"):
                 if st.session_state.get(f"delete_confirmed_{edit_index}_{agent.name}", False):
                     st.session_state.agents.pop(edit_index)
+                    record_agents(get_project_store(), st.session_state)
                     st.session_state[f'show_edit_{edit_index}'] = False
                     st.experimental_rerun()
                 else:
@@ -234,6 +204,31 @@ def display_agent_edit_form(agent, edit_index):
                 st.error(f"No models available for {selected_provider}.")
                 selected_model = None
 
+            auto_route = st.checkbox(
+                "Auto-route",
+                value=bool(agent.auto_route),
+                help="Let AutoGroq move this agent to the fastest healthy model that meets its tier and context size",
+                key=f"auto_route_{edit_index}_{agent.name}"
+            )
+            if auto_route:
+                current_tier = agent.capability_tier if agent.capability_tier in CAPABILITY_TIERS else DEFAULT_CAPABILITY_TIER
+                capability_tier = st.selectbox(
+                    "Capability tier",
+                    options=CAPABILITY_TIERS,
+                    index=CAPABILITY_TIERS.index(current_tier),
+                    key=f"capability_tier_{edit_index}_{agent.name}"
+                )
+                min_context = st.number_input(
+                    "Minimum context (tokens)",
+                    min_value=0,
+                    value=int(agent.min_context or 0),
+                    step=1024,
+                    key=f"min_context_{edit_index}_{agent.name}"
+                )
+            else:
+                capability_tier = agent.capability_tier
+                min_context = agent.min_context
+
         with col2:
             if st.button("Set for ALL agents", key=f"set_all_agents_{edit_index}_{agent.name}"):
                 for agent in st.session_state.agents:
@@ -244,6 +239,7 @@ def display_agent_edit_form(agent, edit_index):
                         agent.config['llm_config']['config_list'] = [{}]
                     agent.config['llm_config']['config_list'][0]['model'] = selected_model
                     agent.config['llm_config']['max_tokens'] = provider_models.get(selected_model, 4096)
+                    agent.invalidate()
                 st.experimental_rerun()
         
         # Display the description in a text area
@@ -252,22 +248,26 @@ def display_agent_edit_form(agent, edit_index):
         col1, col2 = st.columns([3, 1])
         with col1:
             if st.button("Update User Description", key=f"regenerate_{edit_index}_{agent.name}"):
-                print(f"Regenerate button clicked for agent {edit_index}")
+                logger.debug("Regenerate button clicked for agent %s", edit_index)
                 new_description = regenerate_agent_description(agent)
                 if new_description:
                     agent.description = new_description
-                    print(f"Description regenerated for {agent.name}: {new_description}")
+                    logger.debug("Description regenerated for %s: %s", agent.name, new_description)
                     st.session_state[f"regenerate_description_{edit_index}_{agent.name}"] = True
                     description_value = new_description
                     st.experimental_rerun()
                 else:
-                    print(f"Failed to regenerate description for {agent.name}")
+                    logger.error("Failed to regenerate description for %s", agent.name)
         with col2:
             if st.button("Save", key=f"save_{edit_index}_{agent.name}"):
+                previous_name = agent.name
                 agent.name = new_name
                 agent.description = new_description
                 agent.provider = selected_provider
                 agent.model = selected_model
+                agent.auto_route = auto_route
+                agent.capability_tier = capability_tier
+                agent.min_context = min_context or None
                 
                 # Update the config as well
                 agent.config['provider'] = selected_provider
@@ -277,16 +277,18 @@ def display_agent_edit_form(agent, edit_index):
                     agent.config['llm_config']['config_list'] = [{}]
                 agent.config['llm_config']['config_list'][0]['model'] = selected_model
                 agent.config['llm_config']['max_tokens'] = provider_models.get(selected_model, 4096)
+                agent.invalidate()
                 
                 st.session_state[f'show_edit_{edit_index}'] = False
             
                 if 'edit_agent_index' in st.session_state:
                     del st.session_state['edit_agent_index']
                 st.session_state.agents[edit_index] = agent
+                record_agent(get_project_store(), st.session_state, agent, previous_name=previous_name)
                 st.experimental_rerun()
 
     # Add a debug print to check the agent's description
-    print(f"Agent {agent.name} description: {agent.description}")
+    logger.debug("Agent %s description: %s", agent.name, agent.description)
 
 
 def download_agent_file(expert_name):
@@ -310,170 +312,24 @@ def download_agent_file(expert_name):
         st.error(f"File not found: {json_file}")
 
 
-def extract_content(response):
-    if isinstance(response, dict) and 'choices' in response:
-        # Handle response from providers like Groq
-        return response['choices'][0]['message']['content']
-    elif hasattr(response, 'content') and isinstance(response.content, list):
-        # Handle Anthropic-style response
-        return response.content[0].text
-    elif isinstance(response, requests.models.Response):
-        # Handle response from providers using requests.Response
-        try:
-            json_response = response.json()
-            if 'choices' in json_response and json_response['choices']:
-                return json_response['choices'][0]['message']['content']
-        except json.JSONDecodeError:
-            logger.error("Failed to decode JSON from response")
-    logger.error(f"Unexpected response format: {type(response)}")
-    return None
-
-
 def process_agent_interaction(agent_index):
-    agent = st.session_state.agents[agent_index]
-    logger.debug(f"Processing interaction for agent: {agent.name}")
-    logger.debug(f"Agent tools: {agent.tools}")
-    
-    if isinstance(agent, AgentBaseModel):
-        agent_name = agent.name
-        description = agent.description
-        agent_tools = agent.tools
+    engine = get_session_engine()
+    if st.session_state.get("auto_moderate") and st.session_state.get("speculative_moderation"):
+        # The moderator's next prompt is produced alongside this turn
+        content, moderator_response = engine.run_speculative_turn(agent_index, prefetch_next=True)
+        st.session_state.pending_moderator_response = moderator_response
     else:
-        # Fallback for dictionary-like structure
-        agent_name = agent.get('config', {}).get('name', '')
-        description = agent.get('description', '')
-        agent_tools = agent.get("tools", [])
-    
-    user_request = st.session_state.get('user_request', '')
-    user_input = st.session_state.get('user_input', '')
-    rephrased_request = st.session_state.get('rephrased_request', '')
-    reference_url = st.session_state.get('reference_url', '')
-    
-    # Execute associated tools for the agent
-    tool_results = {}
-    for tool in agent_tools:
-        try:
-            logger.debug(f"Executing tool: {tool.name}")
-            if tool.name in st.session_state.tool_functions:
-                tool_function = st.session_state.tool_functions[tool.name]
-                if tool.name == 'fetch_web_content' and reference_url:
-                    tool_result = tool_function(reference_url)
-                elif tool.name == 'generate_code':
-                    tool_result = tool_function(user_input or user_request or rephrased_request)
-                else:
-                    tool_result = tool_function(user_input or user_request or rephrased_request)
-                logger.debug(f"Tool result: {tool_result[:500]}...")  # Log first 500 characters of result
-            else:
-                logger.error(f"Tool function not found for {tool.name}")
-                tool_result = f"Error: Tool function not found for {tool.name}"
-            
-            tool_results[tool.name] = tool_result
-            
-            logger.debug(f"Tool result for {tool.name}: {tool_result[:500]}...")
-            
-            # Update the tool_result_string in the session state
-            st.session_state.tool_result_string = tool_result[:1000] + "..."  # Limit to first 1000 characters
-            
-            # Update the discussion and whiteboard immediately
-            update_discussion_and_whiteboard(tool.name, st.session_state.tool_result_string, "")
-            
-        except Exception as e:
-            error_message = f"Error executing tool {tool.name}: {str(e)}"
-            logger.error(error_message, exc_info=True)
-            tool_results[tool.name] = error_message
-            st.session_state.tool_result_string = error_message
-            update_discussion_and_whiteboard(tool.name, error_message, "")
-    
-    request = construct_request(agent, agent_name, description, user_request, user_input, rephrased_request, reference_url, tool_results)
-    
-    # Use the agent-specific provider and model
-    if isinstance(agent, AgentBaseModel):
-        provider = agent.provider or st.session_state.get('provider', LLM_PROVIDER)
-        model = agent.model or st.session_state.get('model', 'default')
-    else:
-        # Fallback for dictionary-like structure
-        provider = agent.get('provider') or st.session_state.get('provider', LLM_PROVIDER)
-        model = agent.get('model') or st.session_state.get('model', 'default')
-
-    logger.debug(f"Using provider: {provider}, model: {model}")
-
-    api_key = get_api_key(provider)
-    llm_provider = get_llm_provider(api_key=api_key, provider=provider)
-    
-    llm_request_data = {
-        "model": model,
-        "temperature": st.session_state.temperature,
-        "max_tokens": FALLBACK_MODEL_TOKEN_LIMITS.get(model, 4096),
-        "top_p": 1,
-        "stop": "TERMINATE",
-        "messages": [
-            {
-                "role": "user",
-                "content": request
-            }
-        ]
-    }
-    logger.debug(f"Sending request to {provider} using model {model}")
-    response = llm_provider.send_request(llm_request_data)
-    
-    content = extract_content(response)
-    if content:
-        update_discussion_and_whiteboard(agent_name, content, user_input)
-        st.session_state['form_agent_name'] = agent_name
-        st.session_state['form_agent_description'] = description
-        st.session_state['selected_agent_index'] = agent_index
-    else:
-        error_message = f"Error: Failed to extract content from response"
-        log_error(error_message)
-        logger.error(error_message)
+        content = engine.process_agent_interaction(agent_index)
+    show_engine_messages(engine)
+    if not content:
+        log_error("Error: Failed to extract content from response")
 
     # Force a rerun to update the UI and trigger the moderator if necessary
     st.experimental_rerun()
 
 
 def regenerate_agent_description(agent):
-    agent_name = agent.name if hasattr(agent, 'name') else "Unknown Agent"
-    agent_description = agent.description if hasattr(agent, 'description') else ""
-    print(f"agent_name: {agent_name}")
-    print(f"agent_description: {agent_description}")
-    user_request = st.session_state.get('user_request', '')
-    print(f"user_request: {user_request}")
-    discussion_history = st.session_state.get('discussion_history', '')
-    prompt = f"""
-    You are an AI assistant helping to improve an agent's description. The agent's current details are:
-    Name: {agent_name}
-    Description: {agent_description}
-    The current user request is: {user_request}
-    The discussion history so far is: {discussion_history}
-    Please generate a revised description for this agent that defines it in the best manner possible to address the current user request, taking into account the discussion thus far. Return only the revised description, written in the third-person, without any additional commentary or narrative. It is imperative that you return ONLY the text of the new description written in the third-person. No preamble, no narrative, no superfluous commentary whatsoever. Just the description, written in the third-person, unlabeled, please.  You will have been successful if your reply is thorough, comprehensive, concise, written in the third-person, and adherent to all of these instructions.
-    """
-    print(f"regenerate_agent_description called with agent_name: {agent_name}")
-    print(f"regenerate_agent_description called with prompt: {prompt}")
-    
-    api_key = get_api_key()
-    llm_provider = get_llm_provider(api_key=api_key)
-    llm_request_data = {
-        "model": st.session_state.model,
-        "temperature": st.session_state.temperature,
-        "max_tokens": st.session_state.max_tokens,
-        "top_p": 1,
-        "stop": "TERMINATE",
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-    }
-    response = llm_provider.send_request(llm_request_data)
-
-    if response.status_code == 200:
-        response_data = llm_provider.process_response(response)
-        if "choices" in response_data and response_data["choices"]:
-            content = response_data["choices"][0]["message"]["content"]
-            return content.strip()
-
-    return None
+    return get_session_engine().regenerate_agent_description(agent)
 
 
 def retrieve_agent_information(agent_index):
@@ -4,10 +4,11 @@ import datetime
 import streamlit as st
 from configs.config import LLM_PROVIDER
 from models.agent_base_model import AgentBaseModel
-from models.tool_base_model import ToolBaseModel
 from tools.code_generator import code_generator_tool
 
 class CodeDeveloperAgent(AgentBaseModel):
+    __slots__ = ()
+
     def __init__(self, name, description, tools, config, role, goal, backstory, provider, model):
         current_timestamp = datetime.datetime.now().isoformat()
         super().__init__(name=name, description=description, tools=tools, config=config,
@@ -39,11 +40,3 @@ class CodeDeveloperAgent(AgentBaseModel):
             provider=st.session_state.get('provider', LLM_PROVIDER),
             model=st.session_state.get('model', 'default')
         )
-    
-
-    def to_dict(self):
-        data = self.__dict__
-        for key, value in data.items():
-            if isinstance(value, ToolBaseModel):
-                data[key] = value.to_dict()
-        return data
\ No newline at end of file
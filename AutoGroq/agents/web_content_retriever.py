@@ -4,10 +4,11 @@ import datetime
 import streamlit as st
 from configs.config import LLM_PROVIDER
 from models.agent_base_model import AgentBaseModel
-from models.tool_base_model import ToolBaseModel
 from tools.fetch_web_content import fetch_web_content_tool
 
 class WebContentRetrieverAgent(AgentBaseModel):
+    __slots__ = ("reference_url", "web_content")
+
     def __init__(self, name, description, tools, config, role, goal, backstory, provider, model):
         current_timestamp = datetime.datetime.now().isoformat()
         super().__init__(name=name, description=description, tools=tools, config=config,
@@ -42,13 +43,6 @@ class WebContentRetrieverAgent(AgentBaseModel):
             model=st.session_state.get('model', 'default')
         )
 
-    def to_dict(self):
-        data = self.__dict__
-        for key, value in data.items():
-            if isinstance(value, ToolBaseModel):
-                data[key] = value.to_dict()
-        return data
-
     def retrieve_web_content(self, reference_url):
         """
         Retrieve web content from the given reference URL and store it in the agent's memory.
@@ -76,6 +70,9 @@ class WebContentRetrieverAgent(AgentBaseModel):
         Returns:
             str: The stored web content or None if not available.
         """
+        if self.web_content is None and getattr(self, "reference_url", None):
+            # Dropped to keep the session under its memory cap; fetch it again
+            self.retrieve_web_content(self.reference_url)
         return self.web_content
 
     def get_reference_url(self):
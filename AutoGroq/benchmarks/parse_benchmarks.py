@@ -0,0 +1,128 @@
+# benchmarks/parse_benchmarks.py
+
+"""
+Microbenchmarks for utils/parse_utils.py against the inline parsing it replaced.
+
+    python benchmarks/parse_benchmarks.py [--deliverables N] [--experts N] [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+# Add the root directory to the Python module search path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.parse_utils import extract_json_objects, parse_numbered_items, split_pm_sections
+
+
+def build_pm_output(deliverables, experts, numbered=False):
+    # numbered=True gives the "1. Project Outline:" layout some models use for the headers
+    headers = ["Project Outline:", "Key Deliverables:", "Team of Experts:"]
+    if numbered:
+        headers = [f"{i}. {header}" for i, header in enumerate(headers, start=1)]
+    lines = [headers[0], "A long outline of the project. " * 40, "", headers[1]]
+    lines += [f"{i}. Deliverable number {i} with a reasonably long description of the work" for i in range(1, deliverables + 1)]
+    lines += ["", headers[2]]
+    lines += [f"{i}. Expert {i}: responsible for area {i}, with essential expertise in several tools" for i in range(1, experts + 1)]
+    return "\n".join(lines)
+
+
+def build_json_text(objects):
+    body = [
+        {"expert_name": f"Expert {i}", "description": "Writes {templated} code and \"quotes\"", "skills": {"level": i}}
+        for i in range(objects)
+    ]
+    return "Here are the agents:\n" + "\n".join(json.dumps(obj) for obj in body) + "\nThat's all."
+
+
+def legacy_parse_pm_output(text):
+    deliverables_text = None
+    for pattern in [
+        r"(?:Deliverables|Key Deliverables):\n(.*?)(?=Timeline|Team of Experts|$)",
+        r"\*\*(?:Deliverables|Key Deliverables):\*\*\n(.*?)(?=\*\*Timeline|\*\*Team of Experts|$)"
+    ]:
+        match = re.search(pattern, text, re.DOTALL)
+        if match:
+            deliverables_text = match.group(1).strip()
+            break
+    deliverables = [d.strip() for d in re.findall(r'\d+\.\s*(.*)', deliverables_text)] if deliverables_text else []
+    team_of_experts_text = None
+    for pattern in [r"\*\*Team of Experts:\*\*\n(.*)", r"Team of Experts:\n(.*)"]:
+        match = re.search(pattern, text, re.DOTALL)
+        if match:
+            team_of_experts_text = match.group(1).strip()
+            break
+    return deliverables, team_of_experts_text
+
+
+def parse_pm_output(text):
+    sections = split_pm_sections(text)
+    deliverables_text = sections.get("deliverables")
+    deliverables = parse_numbered_items(deliverables_text) if deliverables_text else []
+    return deliverables, sections.get("team of experts")
+
+
+def legacy_extract_json_objects(text):
+    objects = []
+    stack = []
+    start_index = 0
+    for i, char in enumerate(text):
+        if char == "{":
+            if not stack:
+                start_index = i
+            stack.append(char)
+        elif char == "}":
+            if stack:
+                stack.pop()
+                if not stack:
+                    objects.append(text[start_index:i+1])
+    parsed_objects = []
+    for obj_str in objects:
+        try:
+            parsed_objects.append(json.loads(obj_str))
+        except json.JSONDecodeError:
+            pass
+    return parsed_objects
+
+
+def report(name, func, arg, repeat, number):
+    best = min(timeit.repeat(lambda: func(arg), repeat=repeat, number=number)) / number
+    print(f"  {name:<28} {best * 1e6:>10.1f} us/call")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM output parsing.")
+    parser.add_argument("--deliverables", type=int, default=200, help="Deliverables in the synthetic PM output")
+    parser.add_argument("--experts", type=int, default=50, help="Experts in the synthetic PM output")
+    parser.add_argument("--objects", type=int, default=200, help="JSON objects in the synthetic agent reply")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions (best is reported)")
+    parser.add_argument("--number", type=int, default=20, help="Calls per repetition")
+    args = parser.parse_args()
+
+    pm_output = build_pm_output(args.deliverables, args.experts)
+    assert legacy_parse_pm_output(pm_output) == parse_pm_output(pm_output)
+    numbered_output = build_pm_output(args.deliverables, args.experts, numbered=True)
+    legacy_deliverables, legacy_team = legacy_parse_pm_output(numbered_output)
+    # The legacy lookahead stops after "3." and leaves an empty trailing item
+    assert ([d for d in legacy_deliverables if d], legacy_team) == parse_pm_output(numbered_output)
+    print(f"PM output ({len(pm_output)} chars, {args.deliverables} deliverables, {args.experts} experts):")
+    legacy = report("legacy regex search", legacy_parse_pm_output, pm_output, args.repeat, args.number)
+    current = report("split_pm_sections", parse_pm_output, pm_output, args.repeat, args.number)
+    print(f"  speedup: {legacy / current:.1f}x")
+
+    json_text = build_json_text(args.objects)
+    expected = extract_json_objects(json_text)
+    assert len(expected) == args.objects
+    print(f"JSON scan ({len(json_text)} chars, {args.objects} objects with braces in strings):")
+    legacy = report("legacy char loop", legacy_extract_json_objects, json_text, args.repeat, args.number)
+    current = report("find_json_spans", extract_json_objects, json_text, args.repeat, args.number)
+    print(f"  speedup: {legacy / current:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
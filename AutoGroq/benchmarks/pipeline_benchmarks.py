@@ -0,0 +1,215 @@
+# benchmarks/pipeline_benchmarks.py
+
+"""
+Offline benchmarks for the request pipeline, driven by llm_providers/mock_provider.py.
+
+    python benchmarks/pipeline_benchmarks.py
+    python benchmarks/pipeline_benchmarks.py --team-sizes 2,8 --history-sizes 10,500 --latency 0.05
+    python benchmarks/pipeline_benchmarks.py --output results.json
+    python benchmarks/pipeline_benchmarks.py --baseline results.json --tolerance 0.25
+
+Each case is timed over --iterations runs (p50/p95 reported), then run once
+more under tracemalloc to report the bytes it allocated (peak). With
+--baseline, any case whose p50 regressed by more than --tolerance exits 1.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Add the root directory to the Python module search path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+import streamlit as st
+
+from engine import AutoGroqEngine, EngineConfig, EngineState
+from llm_providers.mock_provider import MockProvider
+from utils.db_utils import export_data
+from utils.file_utils import zip_files_in_memory
+from utils.ui_utils import extract_code_from_response
+from utils.workflow_utils import get_workflow_from_agents
+
+# Tables and columns export_data writes to
+EXPORT_SCHEMA = """
+    CREATE TABLE agent (id INTEGER PRIMARY KEY, created_at TEXT, updated_at TEXT, user_id TEXT, version TEXT,
+                        type TEXT, config TEXT, task_instruction TEXT);
+    CREATE TABLE skill (id INTEGER PRIMARY KEY, created_at TEXT, updated_at TEXT, user_id TEXT, version TEXT,
+                        name TEXT, content TEXT, description TEXT, secrets TEXT, libraries TEXT);
+    CREATE TABLE workflow (id INTEGER PRIMARY KEY, created_at TEXT, updated_at TEXT, user_id TEXT, version TEXT,
+                           name TEXT, description TEXT, type TEXT, summary_method TEXT, sample_tasks TEXT);
+"""
+
+
+class BenchmarkContext:
+    def __init__(self, args):
+        self.args = args
+
+    def provider_factory(self, team_size):
+        def factory(provider, api_url=None, api_key=None):
+            return MockProvider(
+                latency=self.args.latency, tokens_per_second=self.args.tokens_per_second,
+                failure_rate=self.args.failure_rate, rate_limit_rate=self.args.rate_limit_rate,
+                team_size=team_size, deliverables=self.args.deliverables, reply_tokens=self.args.reply_tokens,
+                seed=self.args.seed
+            )
+        return factory
+
+    def new_engine(self, team_size):
+        config = EngineConfig(provider="mock", model="mock-small", max_tokens=4096)
+        return AutoGroqEngine(config, state=EngineState(), provider_factory=self.provider_factory(team_size))
+
+    def ready_engine(self, team_size, history_size):
+        """An engine that has already handled a request and holds `history_size` turns of discussion."""
+        ready = self.new_engine(team_size)
+        if not ready.handle_user_request("Build a small web service"):
+            raise RuntimeError("handle_user_request failed while preparing the benchmark")
+        reply = MockProvider(reply_tokens=self.args.reply_tokens)._agent_reply()
+        for turn in range(history_size):
+            agent = ready.state.agents[turn % len(ready.state.agents)]
+            ready.update_discussion(agent.name, reply, "")
+        return ready
+
+
+def measure(func, setup, iterations):
+    """Time `func(setup())` over `iterations` runs, then once under tracemalloc."""
+    durations = []
+    for _ in range(iterations):
+        subject = setup()
+        started_at = time.perf_counter()
+        func(subject)
+        durations.append(time.perf_counter() - started_at)
+
+    subject = setup()
+    tracemalloc.start()
+    try:
+        func(subject)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    durations.sort()
+    return {
+        "iterations": iterations,
+        "p50": statistics.median(durations),
+        "p95": durations[min(len(durations) - 1, int(round(0.95 * (len(durations) - 1))))],
+        "mean": statistics.fmean(durations),
+        "peak_alloc_bytes": peak
+    }
+
+
+def build_cases(context, args):
+    cases = []
+    for team_size in args.team_sizes:
+        cases.append((f"handle_user_request[team={team_size}]",
+                      lambda subject: subject.handle_user_request("Build a small web service"),
+                      lambda team_size=team_size: context.new_engine(team_size)))
+
+        cases.append((f"get_workflow_from_agents[team={team_size}]",
+                      lambda subject: get_workflow_from_agents(subject, model="mock-small", provider="mock"),
+                      lambda team_size=team_size: context.ready_engine(team_size, 0).state.agents))
+
+        def zip_setup(team_size=team_size):
+            ready = context.ready_engine(team_size, 0)
+            workflow_data, _ = get_workflow_from_agents(ready.state.agents, model="mock-small", provider="mock")
+            return workflow_data, ready.state.agents
+        cases.append((f"zip_files_in_memory[team={team_size}]",
+                      lambda subject: zip_files_in_memory(subject[0], agents=subject[1], tool_models=[]),
+                      zip_setup))
+
+        def export_setup(team_size=team_size):
+            ready = context.ready_engine(team_size, 0)
+            db_path = os.path.join(tempfile.mkdtemp(prefix="autogroq-bench-"), "database.sqlite")
+            with sqlite3.connect(db_path) as conn:
+                conn.executescript(EXPORT_SCHEMA)
+            st.session_state.agents = ready.state.agents
+            st.session_state.tool_models = []
+            return db_path
+        cases.append((f"export_data[team={team_size}]", export_data, export_setup))
+
+    team_size = args.team_sizes[0]
+    for history_size in args.history_sizes:
+        cases.append((f"process_agent_interaction[history={history_size}]",
+                      lambda subject: subject.process_agent_interaction(0),
+                      lambda history_size=history_size: context.ready_engine(team_size, history_size)))
+        cases.append((f"trigger_moderator[history={history_size}]",
+                      lambda subject: subject.trigger_moderator(),
+                      lambda history_size=history_size: context.ready_engine(team_size, history_size)))
+        cases.append((f"extract_code_from_response[history={history_size}]",
+                      extract_code_from_response,
+                      lambda history_size=history_size: context.ready_engine(team_size, history_size).state.discussion_history))
+    return cases
+
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(",") if size.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the AutoGroq pipeline against a mock LLM provider.")
+    parser.add_argument("--team-sizes", type=parse_sizes, default=[2, 5, 10], help="Comma-separated team sizes")
+    parser.add_argument("--history-sizes", type=parse_sizes, default=[10, 100, 500], help="Comma-separated discussion lengths (turns)")
+    parser.add_argument("--deliverables", type=int, default=3, help="Deliverables in the mock project plan")
+    parser.add_argument("--reply-tokens", type=int, default=200, help="Approximate size of each mock agent reply")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed runs per case")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock time to first byte, in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="Mock generation speed (default: instant)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability of a mock 500 response")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probability of a mock 429 response")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for failure injection")
+    parser.add_argument("--keep-throttle", action="store_true", help="Keep the moderator's RETRY_DELAY sleep")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this text")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare p50 against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown against the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    if not args.keep_throttle:
+        engine.RETRY_DELAY = 0
+
+    context = BenchmarkContext(args)
+    results = {}
+    print(f"{'case':<44} {'p50 ms':>10} {'p95 ms':>10} {'peak KiB':>10}")
+    for name, func, setup in build_cases(context, args):
+        if args.filter and args.filter not in name:
+            continue
+        # The pipeline prints liberally; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = measure(func, setup, args.iterations)
+        results[name] = result
+        print(f"{name:<44} {result['p50'] * 1000:>10.2f} {result['p95'] * 1000:>10.2f} {result['peak_alloc_bytes'] / 1024:>10.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+                       "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = []
+        for name, result in results.items():
+            if name in baseline and baseline[name]["p50"] > 0:
+                change = result["p50"] / baseline[name]["p50"] - 1
+                if change > args.tolerance:
+                    regressions.append((name, change))
+        for name, change in regressions:
+            print(f"REGRESSION {name}: p50 {change:+.0%} against baseline")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
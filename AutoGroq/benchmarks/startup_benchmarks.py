@@ -0,0 +1,134 @@
+# benchmarks/startup_benchmarks.py
+
+"""
+Cold-start import report for the Streamlit entry point.
+
+    python benchmarks/startup_benchmarks.py
+    python benchmarks/startup_benchmarks.py --module main --runs 5 --top 25
+    python benchmarks/startup_benchmarks.py --budget-ms 1500 --output startup.json
+
+Each run imports --module in a fresh interpreter under `python -X importtime`
+and parses the per-module timings it writes to stderr. The report lists the
+slowest top-level imports and the slowest modules overall (cumulative time,
+median across runs), and flags heavy optional dependencies that were loaded
+at startup even though the app only needs them on specific pages. Exits 1
+if any of those were loaded, or if the median total exceeds --budget-ms.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies that must only be imported on demand
+HEAVY_MODULES = ["altair", "anthropic", "bs4", "pandas", "numpy", "pyarrow"]
+
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( +)(\S+)\s*$")
+
+
+def run_importtime(module):
+    """Import `module` in a fresh interpreter; return [(name, depth, self_us, cumulative_us)]."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, (len(indent) - 1) // 2, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def summarize(runs, module):
+    """Median timings per module across runs, plus the total for `module`."""
+    cumulative = {}
+    self_time = {}
+    top_level = set()
+    for entries in runs:
+        # importtime lists children before their parent
+        children = []
+        for name, depth, self_us, cumulative_us in entries:
+            cumulative.setdefault(name, []).append(cumulative_us)
+            self_time.setdefault(name, []).append(self_us)
+            if depth == 1:
+                children.append(name)
+            elif depth == 0:
+                if name == module:
+                    top_level.update(children)
+                children = []
+    modules = {
+        name: {"cumulative_ms": statistics.median(values) / 1000,
+               "self_ms": statistics.median(self_time[name]) / 1000}
+        for name, values in cumulative.items()
+    }
+    total = modules.get(module, {}).get("cumulative_ms", 0.0)
+    loaded = set(modules)
+    heavy = [name for name in HEAVY_MODULES if name in loaded]
+    return {
+        "module": module,
+        "runs": len(runs),
+        "total_ms": total,
+        "module_count": len(modules),
+        "top_level": {name: modules[name] for name in sorted(top_level, key=lambda name: -modules[name]["cumulative_ms"])},
+        "modules": modules,
+        "heavy_modules_loaded": heavy
+    }
+
+
+def print_report(report, top):
+    print(f"import {report['module']}: {report['total_ms']:.1f} ms median over {report['runs']} runs, "
+          f"{report['module_count']} modules")
+
+    print(f"\n{'top-level import':<44} {'cumulative ms':>14}")
+    for name, timing in list(report["top_level"].items())[:top]:
+        print(f"{name:<44} {timing['cumulative_ms']:>14.1f}")
+
+    slowest = sorted(report["modules"].items(), key=lambda item: -item[1]["self_ms"])[:top]
+    print(f"\n{'slowest modules (self)':<44} {'self ms':>14} {'cumulative ms':>14}")
+    for name, timing in slowest:
+        print(f"{name:<44} {timing['self_ms']:>14.1f} {timing['cumulative_ms']:>14.1f}")
+
+    if report["heavy_modules_loaded"]:
+        print(f"\nHeavy modules imported at startup: {', '.join(report['heavy_modules_loaded'])}")
+    else:
+        print("\nNo heavy optional modules imported at startup.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the import-time cost of starting AutoGroq.")
+    parser.add_argument("--module", default="main", help="Module to import (default: main)")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=15, help="Rows to show per table")
+    parser.add_argument("--budget-ms", type=float, help="Fail if the median import time exceeds this")
+    parser.add_argument("--output", help="Write the full report as JSON to this file")
+    args = parser.parse_args()
+
+    runs = [run_importtime(args.module) for _ in range(args.runs)]
+    report = summarize(runs, args.module)
+    print_report(report, args.top)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    failed = bool(report["heavy_modules_loaded"])
+    if args.budget_ms is not None and report["total_ms"] > args.budget_ms:
+        print(f"Startup import time {report['total_ms']:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# cli/bundle.py
+
+import argparse
+import os
+import sys
+
+# Add the root directory to the Python module search path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from configs.config import PROJECT_DB_PATH
+from utils.bundle_utils import iter_bundle, import_bundle_to_store, open_bundle, write_store_bundle
+from utils.persistence_utils import ProjectStore
+
+
+def inspect_bundle(path):
+    counts = {}
+    with open_bundle(path) as fp:
+        for kind, _, _ in iter_bundle(fp):
+            counts[kind] = counts.get(kind, 0) + 1
+    print(f"{path}: " + ", ".join(f"{count} {kind}(s)" for kind, count in counts.items()) if counts else f"{path}: empty")
+
+
+def export_bundle(path, db_path, project_ids):
+    with open_bundle(path, "w") as fp:
+        counts = write_store_bundle(fp, ProjectStore(db_path), project_ids or None)
+    print(f"Wrote {counts['project']} project(s) and {counts['agent']} agent(s) to {path}")
+
+
+def import_bundle(path, db_path, owner):
+    with open_bundle(path) as fp:
+        project_ids = import_bundle_to_store(fp, ProjectStore(db_path), owner)
+    print(f"Imported {len(project_ids)} project(s) into {db_path}")
+    for project_id in project_ids:
+        print(f"  {project_id}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move AutoGroq projects and agent teams between environments as bundles (.jsonl or .jsonl.gz).")
+    parser.add_argument("--db", default=PROJECT_DB_PATH, help="Project store to read from or write to.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    inspect_parser = subparsers.add_parser("inspect", help="Validate a bundle and count its records.")
+    inspect_parser.add_argument("bundle")
+
+    export_parser = subparsers.add_parser("export", help="Write saved projects to a bundle.")
+    export_parser.add_argument("bundle")
+    export_parser.add_argument("--project", action="append", help="Project id to export (repeatable); all projects by default.")
+
+    import_parser = subparsers.add_parser("import", help="Save the projects of a bundle to the project store.")
+    import_parser.add_argument("bundle")
+    import_parser.add_argument("--owner", help="Owner token (the ?owner= value in the app's URL) to list the projects under in the app.")
+
+    args = parser.parse_args()
+    if args.command != "inspect" and not args.db:
+        parser.error("no project store: pass --db or set AUTOGROQ_PROJECT_DB")
+    try:
+        if args.command == "inspect":
+            inspect_bundle(args.bundle)
+        elif args.command == "export":
+            export_bundle(args.bundle, args.db, args.project)
+        else:
+            import_bundle(args.bundle, args.db, args.owner)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 import os
+import tempfile
+
 from typing import Dict
 
 # Get user home directory
@@ -15,6 +17,7 @@ DEFAULT_LMSTUDIO_API_URL = "http://localhost:1234/v1/chat/completions"
 DEFAULT_OLLAMA_API_URL = "http://127.0.0.1:11434/api/generate"
 DEFAULT_OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
 DEFAULT_ANTHROPIC_API_URL = "https://api.anthropic.com/v1/messages"
+DEFAULT_TEMPERATURE = 0.3
 
 # Try to import user-specific configurations from config_local.py
 try:
@@ -26,6 +29,21 @@ except ImportError:
 DEBUG = locals().get('DEBUG', DEFAULT_DEBUG)
 LLM_PROVIDER = locals().get('LLM_PROVIDER', DEFAULT_LLM_PROVIDER)
 
+# Logging settings. Per-module overrides come as "name=LEVEL,name=LEVEL" in
+# AUTOGROQ_LOG_LEVELS; sampling of sub-WARNING records as "name=0.1" in AUTOGROQ_LOG_SAMPLE.
+LOG_LEVEL = os.environ.get('AUTOGROQ_LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO').upper()
+LOG_FORMAT = os.environ.get('AUTOGROQ_LOG_FORMAT', 'text')  # "text" or "json"
+LOG_MODULE_LEVELS = {
+    "urllib3": "WARNING",
+    "httpx": "WARNING",
+    "watchdog": "WARNING",
+    **dict(item.split("=", 1) for item in os.environ.get('AUTOGROQ_LOG_LEVELS', '').split(",") if "=" in item)
+}
+LOG_SAMPLE_RATES = {
+    name: float(rate) for name, rate in
+    (item.split("=", 1) for item in os.environ.get('AUTOGROQ_LOG_SAMPLE', '').split(",") if "=" in item)
+}
+
 # API URLs for different providers
 API_URLS = {
     "groq": locals().get('GROQ_API_URL', DEFAULT_GROQ_API_URL),
@@ -48,6 +66,108 @@ MAX_RETRIES = 3
 RETRY_DELAY = 2  # in seconds
 RETRY_TOKEN_LIMIT = 5000
 
+# Ask providers for JSON mode / tool-use output when generating agents.
+# Falls back to a plain request (and JSON repair) if the provider rejects it.
+USE_STRUCTURED_OUTPUT = True
+
+# Metrics settings
+METRICS_HISTORY_SIZE = 500  # recent LLM calls / tool runs kept for percentiles and the Debug tab
+METRICS_PORT = int(os.environ['AUTOGROQ_METRICS_PORT']) if os.environ.get('AUTOGROQ_METRICS_PORT') else None
+
+# Tracing settings
+TRACE_HISTORY_SIZE = 50  # finished traces kept in memory for the Debug tab
+TRACE_EXPORT_PATH = os.environ.get('AUTOGROQ_TRACE_FILE')  # append spans as JSONL when set
+
+# Provider settings
+PROVIDER_CACHE_SIZE = 8  # provider clients (one per provider / URL / API key) kept alive for reuse
+OLLAMA_KEEP_ALIVE = os.environ.get('AUTOGROQ_OLLAMA_KEEP_ALIVE', '30m')  # keep the model (and its KV cache) loaded between turns
+
+# Failover and hedging: backup (provider, model) pairs tried in order when the primary
+# returns 429/5xx or is slower than the latency SLO, e.g.
+# AUTOGROQ_FALLBACKS="groq:llama3-70b-8192,openai:gpt-4o-mini"
+FALLBACK_PROVIDERS = [tuple(item.strip().split(":", 1)) for item in os.environ.get('AUTOGROQ_FALLBACKS', '').split(",") if ":" in item]
+LATENCY_SLO_SECONDS = float(os.environ['AUTOGROQ_LATENCY_SLO']) if os.environ.get('AUTOGROQ_LATENCY_SLO') else None
+HEDGE_REQUESTS = os.environ.get('AUTOGROQ_HEDGE', '').lower() in ('1', 'true', 'yes')  # duplicate slow requests to the next backend
+HEDGE_PERCENTILE = 95  # hedge once a call has taken longer than this percentile of the backend's recent latency
+HEDGE_MIN_SAMPLES = 20  # successful calls needed before that percentile is trusted
+ROUTER_MAX_WORKERS = 16
+
+# Automatic model placement for agents with auto-routing switched on: pick the
+# fastest catalog model that meets the agent's capability tier and context size
+CAPABILITY_TIERS = ["basic", "standard", "advanced"]  # lowest to highest
+DEFAULT_CAPABILITY_TIER = "standard"
+# Model metadata: capability tier (used for routing), context window and the
+# most output tokens the model will generate. Models without a tier are never routed to.
+MODEL_CATALOG = {
+    "anthropic": {
+        "claude-3-5-sonnet-20240620": {"tier": "advanced", "context_window": 200000, "max_output": 4096},
+        "claude-3-opus-20240229": {"tier": "advanced", "context_window": 200000, "max_output": 4096},
+        "claude-3-sonnet-20240229": {"tier": "standard", "context_window": 200000, "max_output": 4096},
+        "claude-3-haiku-20240307": {"tier": "basic", "context_window": 200000, "max_output": 4096},
+        "claude-2.1": {"context_window": 200000, "max_output": 4096},
+        "claude-2.0": {"context_window": 100000, "max_output": 4096},
+        "claude-instant-1.2": {"context_window": 100000, "max_output": 4096},
+    },
+    "groq": {
+        "llama3-70b-8192": {"tier": "standard", "context_window": 8192, "max_output": 8192},
+        "mixtral-8x7b-32768": {"tier": "standard", "context_window": 32768, "max_output": 32768},
+        "llama3-8b-8192": {"tier": "basic", "context_window": 8192, "max_output": 8192},
+        "gemma-7b-it": {"tier": "basic", "context_window": 8192, "max_output": 8192},
+    },
+    "openai": {
+        "gpt-4o": {"context_window": 128000, "max_output": 4096, "tokenizer": "o200k_base"},
+        "gpt-4-turbo": {"context_window": 128000, "max_output": 4096, "tokenizer": "cl100k_base"},
+        "gpt-4": {"tier": "advanced", "context_window": 8192, "max_output": 8192, "tokenizer": "cl100k_base"},
+        "gpt-3.5-turbo": {"tier": "basic", "context_window": 16385, "max_output": 4096, "tokenizer": "cl100k_base"},
+    },
+    "ollama": {
+        "llama3": {"tier": "basic", "context_window": 8192, "max_output": 8192},
+    },
+    "lmstudio": {
+        "instructlab/granite-7b-lab-GGUF": {"context_window": 2048, "max_output": 2048},
+        "MaziyarPanahi/Codestral-22B-v0.1-GGUF": {"context_window": 32768, "max_output": 32768},
+    },
+}
+MODEL_ROUTER_WINDOW = 50  # recent calls per model the rolling stats are computed over
+MODEL_ROUTER_MIN_SAMPLES = 5  # calls needed before a model's latency is trusted
+MODEL_ROUTER_MAX_ERROR_RATE = 0.3  # models failing more often than this are routed around
+MODEL_ROUTER_SWITCH_MARGIN = 0.25  # move an agent only if another model is this much faster
+MODEL_ROUTER_EXPLORE_RATE = 0.1  # chance of trying a model that has too few samples
+
+# Token accounting: max_tokens = min(requested, max_output, context_window - prompt_tokens - margin)
+DEFAULT_CONTEXT_WINDOW = 8192  # assumed for models missing from MODEL_CATALOG
+DEFAULT_MAX_OUTPUT = 4096
+TOKEN_SAFETY_MARGIN = 64  # headroom for chat template tokens the estimate does not see
+MIN_COMPLETION_TOKENS = 256  # never ask for less than this, even when the prompt nearly fills the window
+# Characters per token for the heuristic counter (used when tiktoken or the model's encoding is unavailable);
+# refined at runtime from the prompt token counts providers report
+CHARS_PER_TOKEN = {"anthropic": 3.5, "default": 4.0}
+
+# Discussion sent to agents as prior conversation turns
+MAX_DISCUSSION_CHARS = 50000
+DISCUSSION_WINDOW_STEP = 8  # drop old turns this many at a time so the kept history stays byte-stable between turns
+
+# Concurrency settings
+MAX_ROUND_WORKERS = 4  # parallel agent calls in a discussion round
+MAX_AUTO_MODERATION_RUNS = 2  # background auto-moderation runs allowed at once per server
+AUTO_MODERATION_MAX_CYCLES = 10  # default moderator -> agent cycles per run
+
+# Multi-user settings. State that is the same for everyone lives once per process in
+# utils.resource_utils.shared_resources; st.session_state holds only what belongs to one user.
+SHARED_RESOURCE_MAX_ENTRIES = 256
+MODEL_LIST_TTL = 3600  # seconds a provider's model list is reused before it is fetched again
+REFERENCE_PAGE_TTL = 900  # seconds a fetched reference URL is reused across sessions
+WORKFLOW_FRAGMENT_CACHE_SIZE = 512  # per-agent workflow configs kept by utils.workflow_utils
+# Tool results kept by utils.tool_cache_utils for tools marked pure or given a cache_ttl
+TOOL_RESULT_CACHE_SIZE = 256
+TOOL_RESULT_TTL = 600  # seconds an LLM-backed tool's result is reused for the same input
+# Memory one session is expected to stay under (agents, discussion, tool results,
+# export zips); see "Running for several users" in README.md
+SESSION_MEMORY_BUDGET_MB = int(os.environ.get('AUTOGROQ_SESSION_MEMORY_MB', 64))
+SESSION_REFERENCE_MAX_BYTES = 2 * 1024 * 1024  # fetched pages / agents' web content kept per session, truncated beyond this
+SESSION_SPILL_MIN_BYTES = 256 * 1024  # export zips at least this big are moved to disk instead of kept in memory
+SESSION_SPILL_DIR = os.environ.get('AUTOGROQ_SPILL_DIR', os.path.join(tempfile.gettempdir(), 'autogroq_spill'))
+
 # Fallback model configurations (used when API fails)
 FALLBACK_MODEL_TOKEN_LIMITS = {
     "anthropic": {
@@ -81,6 +201,12 @@ FALLBACK_MODEL_TOKEN_LIMITS = {
 # Database path
 FRAMEWORK_DB_PATH = os.environ.get('FRAMEWORK_DB_PATH', default_db_path)
 
+# The app saves projects (request, agents, discussion, deliverables) here as they change so a
+# refresh or restart can pick them up again. Set AUTOGROQ_PROJECT_DB="" to turn this off.
+# Engines built outside the app save only to the store passed in their EngineConfig.
+PROJECT_DB_PATH = os.environ.get('AUTOGROQ_PROJECT_DB', f'{home_dir}/.autogroq/projects.sqlite')
+PROJECT_COMPACT_EVENTS = 200  # fold a project's change log into one snapshot once it has this many entries
+
 SUPPORTED_PROVIDERS = ["anthropic", "groq", "lmstudio", "ollama", "openai"]
 
 BUILT_IN_AGENTS = ["Web Content Retriever", "Code Developer", "Code Tester"]
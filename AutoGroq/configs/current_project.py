@@ -43,6 +43,13 @@ class Current_Project:
                 self.deliverables[index]["done"] = True
                 
 
+    def mark_deliverable_done(self, index):
+        if 0 <= index < len(self.deliverables):
+            for phase in self.implementation_phases:
+                self.deliverables[index]["phase"][phase] = True
+            self.deliverables[index]["done"] = True
+
+
     def mark_deliverable_undone(self, index):
         if 0 <= index < len(self.deliverables):
             self.deliverables[index]["done"] = False
@@ -56,3 +63,22 @@ class Current_Project:
 
     def set_re_engineered_prompt(self, prompt):
         self.re_engineered_prompt = prompt
+
+
+    def to_dict(self):
+        return {
+            "deliverables": self.deliverables,
+            "re_engineered_prompt": self.re_engineered_prompt,
+            "implementation_phases": self.implementation_phases,
+            "current_phase": self.current_phase
+        }
+
+
+    @classmethod
+    def from_dict(cls, data):
+        project = cls()
+        project.deliverables = data.get("deliverables", [])
+        project.re_engineered_prompt = data.get("re_engineered_prompt", "")
+        project.implementation_phases = data.get("implementation_phases", project.implementation_phases)
+        project.current_phase = data.get("current_phase", project.current_phase)
+        return project
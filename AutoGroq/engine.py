@@ -0,0 +1,1028 @@
+# engine.py
+
+import datetime
+import logging
+import os
+import re
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from configs.config import (API_KEY_NAMES, DEFAULT_TEMPERATURE, DISCUSSION_WINDOW_STEP,
+        FALLBACK_PROVIDERS, HEDGE_REQUESTS, LATENCY_SLO_SECONDS, LLM_PROVIDER, MAX_DISCUSSION_CHARS, MAX_RETRIES,
+        MAX_ROUND_WORKERS, RETRY_DELAY, SUPPORTED_PROVIDERS, USE_STRUCTURED_OUTPUT)
+from configs.current_project import Current_Project
+from models.agent_base_model import AgentBaseModel
+from models.project_base_model import ProjectBaseModel
+from models.tool_base_model import ToolBaseModel
+from prompts import (create_project_manager_prompt, get_agents_json_schema, get_agents_prompt, get_moderator_prompt,
+        get_moderator_prompt_prefix, get_rephrased_user_prompt, get_structured_agents_prompt)
+from typing import Any, Dict, List, Optional, Tuple
+from utils.agent_utils import create_agent_data
+from utils.api_utils import ProviderCache, SingleFlight, create_llm_provider, llm_request_flights
+from utils.file_utils import zip_files_in_memory
+from utils.metrics_utils import metrics_registry, timed_tool_run
+from utils.routing_utils import Backend, call_backend, model_router, send_with_failover
+from utils.token_utils import compute_max_tokens
+from utils.tool_cache_utils import run_tool
+from utils.trace_utils import get_current_span, traced, wrap_context
+from utils.persistence_utils import (format_turn, get_project_store, record_agents, record_deliverables, record_project,
+                                     record_turn, start_project)
+from utils.parse_utils import parse_agent_address, parse_numbered_items, repair_json, split_pm_sections
+from utils.workflow_utils import get_workflow_from_agents
+
+logger = logging.getLogger(__name__)
+
+# Moderator markers that advance the project
+COMPLETION_MARKERS = ("PHASE_COMPLETED", "DELIVERABLE_COMPLETED")
+
+_local = threading.local()
+
+_background_executor = None
+_background_executor_lock = threading.Lock()
+
+
+def get_current_engine():
+    """Return the engine running on this thread, if any (used by tools)."""
+    return getattr(_local, "engine", None)
+
+
+def get_background_executor():
+    """Shared pool for work that outlives a single engine call (speculation, prefetch)."""
+    global _background_executor
+    with _background_executor_lock:
+        if _background_executor is None:
+            _background_executor = ThreadPoolExecutor(max_workers=MAX_ROUND_WORKERS, thread_name_prefix="autogroq")
+        return _background_executor
+
+
+def format_moderated_input(next_agent, moderator_response):
+    if next_agent:
+        return f"To {next_agent}: {moderator_response}"
+    return moderator_response
+
+
+class EngineConfig:
+    """
+    Everything the pipeline needs to know about the LLM backend, captured up
+    front so that no call has to reach back into a Streamlit session.
+    """
+    def __init__(
+        self,
+        provider: str = LLM_PROVIDER,
+        model: str = "default",
+        temperature: float = DEFAULT_TEMPERATURE,
+        max_tokens: int = 4096,
+        top_p: float = 1,
+        api_keys: Optional[Dict[str, str]] = None,
+        api_urls: Optional[Dict[str, str]] = None,
+        fallbacks: Optional[List[Tuple[str, str]]] = None,
+        latency_slo: Optional[float] = LATENCY_SLO_SECONDS,
+        hedge: bool = HEDGE_REQUESTS,
+        project_store=None
+    ):
+        self.provider = provider
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.top_p = top_p
+        self.api_keys = api_keys or {}
+        self.api_urls = api_urls or {}
+        # Backup (provider, model) pairs, tried in order; see utils.routing_utils
+        self.fallbacks = list(FALLBACK_PROVIDERS if fallbacks is None else fallbacks)
+        self.latency_slo = latency_slo
+        self.hedge = hedge
+        # Where the project is saved as it changes (utils.persistence_utils.ProjectStore); None saves nothing
+        self.project_store = project_store
+
+    def get_api_key(self, provider=None):
+        provider = provider or self.provider
+        api_key = self.api_keys.get(provider)
+        if api_key is None:
+            api_key = os.environ.get(f"{provider.upper()}_API_KEY")
+        return api_key
+
+    def get_api_url(self, provider=None):
+        return self.api_urls.get(provider or self.provider)
+
+    def get_routable_providers(self):
+        """Providers an agent can be routed to: ones with an API key or URL, plus the session's own."""
+        return {provider for provider in SUPPORTED_PROVIDERS
+                if provider == self.provider or self.get_api_key(provider) or self.get_api_url(provider)}
+
+    @classmethod
+    def from_session(cls, session_state):
+        api_keys = {}
+        api_urls = {}
+        for provider in SUPPORTED_PROVIDERS:
+            key_name = API_KEY_NAMES.get(provider) or f"{provider.upper()}_API_KEY"
+            api_key = os.environ.get(key_name) or session_state.get(key_name)
+            if api_key:
+                api_keys[provider] = api_key
+            api_url = session_state.get(f"{provider.upper()}_API_URL")
+            if api_url:
+                api_urls[provider] = api_url
+        return cls(
+            provider=session_state.get('provider', LLM_PROVIDER),
+            model=session_state.get('model', 'default'),
+            temperature=session_state.get('temperature', DEFAULT_TEMPERATURE),
+            max_tokens=session_state.get('max_tokens', 4096),
+            top_p=session_state.get('top_p', 1),
+            api_keys=api_keys,
+            api_urls=api_urls,
+            fallbacks=session_state.get('fallbacks'),
+            latency_slo=session_state.get('latency_slo', LATENCY_SLO_SECONDS),
+            hedge=session_state.get('hedge_requests', HEDGE_REQUESTS),
+            project_store=get_project_store()
+        )
+
+
+class EngineState:
+    """
+    Plain attribute container holding the mutable pipeline state. It mirrors
+    the subset of st.session_state the pipeline uses, so either one can be
+    handed to AutoGroqEngine.
+    """
+    def __init__(self, **kwargs):
+        self.agents = []
+        self.autogen_zip_buffer = None
+        self.crewai_zip_buffer = None
+        self.current_project = Current_Project()
+        self.discussion_history = ""
+        self.discussion_turns = []
+        self.last_agent = ""
+        self.last_comment = ""
+        self.most_recent_response = ""
+        self.need_rerun = False
+        self.next_agent = None
+        self.project_manager_output = None
+        self.prefetched_turn = None
+        self.project_model = ProjectBaseModel()
+        self.reference_html = {}
+        self.reference_url = ""
+        self.rephrased_request = ""
+        self.tool_functions = {}
+        self.tool_models = []
+        self.tool_result_string = ""
+        self.user_input = ""
+        self.user_request = ""
+        self.workflow = None
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return hasattr(self, key)
+
+
+def create_agents(json_data: List[Dict[str, Any]], provider=None, model=None) -> Tuple[List[AgentBaseModel], List[Dict[str, Any]]]:
+    autogen_agents = []
+    crewai_agents = []
+
+    for agent_data in json_data:
+        if not isinstance(agent_data, dict):
+            logger.warning("Skipping malformed agent entry: %s", agent_data)
+            continue
+        expert_name = agent_data.get('expert_name') or ''
+        description = agent_data.get('description') or ''
+
+        if not expert_name:
+            logger.warning("Missing agent name. Skipping...")
+            continue
+
+        autogen_agent_data, crewai_agent_data = create_agent_data({
+            "name": expert_name,
+            "description": description,
+            "role": agent_data.get('role') or expert_name,
+            "goal": agent_data.get('goal') or f"Assist with tasks related to {description}",
+            "backstory": agent_data.get('backstory') or f"As an AI assistant, I specialize in {description}"
+        }, provider=provider, model=model)
+
+        try:
+            agent_model = AgentBaseModel(
+                name=autogen_agent_data['name'],
+                description=autogen_agent_data['description'],
+                tools=autogen_agent_data.get('tools', []),
+                config=autogen_agent_data.get('config', {}),
+                role=autogen_agent_data['role'],
+                goal=autogen_agent_data['goal'],
+                backstory=autogen_agent_data['backstory'],
+                provider=autogen_agent_data.get('provider', ''),
+                model=autogen_agent_data.get('model', '')
+            )
+            logger.debug("Created agent: %s with description: %s", agent_model.name, agent_model.description)
+            autogen_agents.append(agent_model)
+            crewai_agents.append(crewai_agent_data)
+        except Exception as e:
+            logger.error("Error creating agent %s: %s", expert_name, str(e))
+            logger.debug("Agent data: %s", autogen_agent_data)
+            continue
+
+    return autogen_agents, crewai_agents
+
+
+def parse_json(content: str) -> List[Dict[str, Any]]:
+    json_data = repair_json(content)
+    if json_data is None:
+        logger.error("Error parsing JSON: no JSON document found")
+        logger.debug("Content: %s", content)
+        return []
+    if isinstance(json_data, dict):
+        # Structured output wraps the array in an object, e.g. {"agents": [...]}
+        json_data = next((value for value in json_data.values() if isinstance(value, list)), [json_data])
+    if isinstance(json_data, list):
+        return json_data
+    logger.warning("JSON data is not a list as expected.")
+    return []
+
+
+def build_agent_request_parts(agent, agent_name, description, user_request, user_input, rephrased_request, reference_content, discussion, tool_results):
+    """
+    Return (prefix, rest) of an agent prompt. The prefix holds only what stays
+    the same across the agent's turns (role, request, goal, reference content,
+    tools) so providers can cache it; the discussion, which only grows, and
+    the per-turn input and tool results follow it.
+    """
+    prefix = f"Act as the {agent_name} who {description}."
+    if user_request:
+        prefix += f" Original request was: {user_request}."
+    if rephrased_request:
+        prefix += f" You are helping a team work on satisfying {rephrased_request}."
+    if reference_content:
+        prefix += f" Reference URL content: {reference_content}."
+
+    # Check if agent is an AgentBaseModel instance
+    if isinstance(agent, AgentBaseModel):
+        agent_tools = agent.tools
+    else:
+        agent_tools = agent.get('tools', [])
+
+    if agent_tools:
+        prefix += "\n\nYou have access to the following tools:\n"
+        for tool in agent_tools:
+            if isinstance(tool, ToolBaseModel):
+                prefix += f"{str(tool)}\n"
+            elif isinstance(tool, dict):
+                prefix += f"{tool.get('name', 'Unknown Tool')}: {tool.get('description', 'No description available')}\n"
+        prefix += "\nTo use a tool, include its name and arguments in your response, e.g., 'I will use calculate_compound_interest(1000, 0.05, 10) to determine the future value.'\n\n"
+
+    rest = ""
+    if discussion:
+        rest += f" The discussion so far has been {discussion[-50000:]}."
+    if user_input:
+        rest += f" Additional input: {user_input}."
+    if tool_results:
+        rest += f" tool results: {tool_results}."
+    return prefix, rest
+
+
+def build_agent_request(agent, agent_name, description, user_request, user_input, rephrased_request, reference_content, discussion, tool_results):
+    return "".join(build_agent_request_parts(agent, agent_name, description, user_request, user_input, rephrased_request,
+                                             reference_content, discussion, tool_results))
+
+
+def window_discussion(turns, max_chars=MAX_DISCUSSION_CHARS, step=DISCUSSION_WINDOW_STEP):
+    """
+    The most recent turns that fit in `max_chars`. Old turns are dropped
+    `step` at a time, so the window's first turn (and everything after it)
+    stays the same across several consecutive calls.
+    """
+    total = sum(len(turn["content"]) for turn in turns)
+    start = 0
+    while total > max_chars and start < len(turns):
+        total -= len(turns[start]["content"])
+        start += 1
+    if start:
+        start = min(len(turns), -(-start // step) * step)
+    return turns[start:]
+
+
+def build_agent_messages(agent_name, prefix, turns, rest):
+    """
+    Lay an agent turn out as a conversation: the stable prefix as the system
+    message, earlier turns as the agent's own (assistant) replies or other
+    speakers' (user) messages, and this turn's input last. Messages already
+    sent never change, so providers can reuse their prompt / KV cache.
+    """
+    messages = [{"role": "system", "content": prefix}]
+
+    def add(role, content):
+        # Consecutive messages from the same side are merged so roles alternate
+        if messages[-1]["role"] == role:
+            messages[-1] = {"role": role, "content": f"{messages[-1]['content']}\n\n{content}"}
+        else:
+            messages.append({"role": role, "content": content})
+
+    for turn in window_discussion(turns):
+        if turn["speaker"] == agent_name:
+            add("assistant", turn["content"])
+        else:
+            add("user", f"{turn['speaker']}:\n\n{turn['content']}")
+    add("user", rest.strip() or "Please continue the discussion.")
+    return messages
+
+
+class AutoGroqEngine:
+    """
+    Session-independent AutoGroq pipeline: rephrase -> project manager ->
+    agents -> workflow, plus agent turns and moderation. Streamlit code wraps
+    it (see utils.ui_utils.get_session_engine); everything else can create
+    one directly and run it from any thread.
+
+    User-facing notices are queued on `messages` as (level, text) pairs,
+    where level is one of "success", "warning" or "error".
+    """
+    def __init__(self, config: Optional[EngineConfig] = None, state=None, provider_factory=None):
+        self.config = config or EngineConfig()
+        self.state = state if state is not None else EngineState()
+        self.provider_factory = provider_factory or create_llm_provider
+        self.messages = []
+        self.last_moderation = None
+
+    def notify(self, level, message):
+        self.messages.append((level, message))
+
+    def activate(self):
+        """Context manager that makes this engine visible to tools on this thread."""
+        engine = self
+
+        class _Activation:
+            def __enter__(self):
+                self.previous = get_current_engine()
+                _local.engine = engine
+                return engine
+
+            def __exit__(self, *exc_info):
+                _local.engine = self.previous
+                return False
+
+        return _Activation()
+
+    def get_llm_provider(self, provider=None):
+        provider = provider or self.config.provider
+        return self.provider_factory(
+            provider,
+            api_url=self.config.get_api_url(provider),
+            api_key=self.config.get_api_key(provider)
+        )
+
+    def build_request_data(self, messages, model=None, max_tokens=None, stop="TERMINATE", provider=None, **extra):
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        model = model or self.config.model
+        # max_tokens is an upper bound; the model's output cap and remaining context window can lower it
+        requested = max_tokens if max_tokens is not None else self.config.max_tokens
+        llm_request_data = {
+            "model": model,
+            "temperature": self.config.temperature,
+            "max_tokens": compute_max_tokens(messages, provider or self.config.provider, model, requested=requested),
+            "top_p": self.config.top_p,
+            "messages": messages
+        }
+        if stop is not None:
+            llm_request_data["stop"] = stop
+        for key, value in extra.items():
+            # Passing None drops a default field from the request entirely
+            if value is None:
+                llm_request_data.pop(key, None)
+            else:
+                llm_request_data[key] = value
+        return llm_request_data
+
+    def get_llm_scope(self):
+        """What a request made through complete() with the defaults depends on besides its messages."""
+        config = self.config
+        return (config.provider, config.model, config.temperature, config.max_tokens, config.top_p, config.fallbacks)
+
+    def get_backends(self, provider=None, model=None, llm_provider=None):
+        """The primary backend for a request followed by the configured fallbacks."""
+        provider = provider or self.config.provider
+        model = model or self.config.model
+        if llm_provider is None:
+            llm_provider = self.get_llm_provider(provider)
+        backends = [Backend(provider, model, llm_provider=llm_provider)]
+        for fallback_provider, fallback_model in self.config.fallbacks:
+            if (fallback_provider, fallback_model) != (provider, model):
+                backends.append(Backend(fallback_provider, fallback_model, factory=self.get_llm_provider))
+        return backends
+
+    def complete(self, messages, model=None, max_tokens=None, provider=None, llm_provider=None, **extra):
+        """Send one request and return the stripped reply text, or None on failure."""
+        backends = self.get_backends(provider, model, llm_provider)
+        llm_request_data = self.build_request_data(messages, model=model, max_tokens=max_tokens, provider=provider, **extra)
+        # Concurrent identical requests (other sessions, tabs or threads) share one upstream call
+        provider = backends[0].provider
+        key = SingleFlight.make_key(
+            ProviderCache.make_key(provider, self.config.get_api_url(provider), self.config.get_api_key(provider)),
+            [repr(backend) for backend in backends], llm_request_data, self.config.latency_slo, self.config.hedge
+        )
+        return llm_request_flights.do(key, self.send_request_data, backends, llm_request_data)
+
+    def send_request_data(self, backends, llm_request_data):
+        if len(backends) == 1:
+            response_data, outcome = call_backend(backends[0], llm_request_data)
+            backend = backends[0] if outcome == "ok" else None
+        else:
+            response_data, backend = send_with_failover(backends, llm_request_data, latency_slo=self.config.latency_slo,
+                                                        hedge=self.config.hedge)
+        if not response_data:
+            logger.warning("No backend answered the request (tried %s)", ", ".join(map(repr, backends)))
+            return None
+        if backend is not backends[0]:
+            logger.info("Request served by fallback %s instead of %s", backend, backends[0])
+        content = response_data["choices"][0]["message"]["content"]
+        return content.strip() if content else None
+
+    @traced("engine.rephrase_prompt")
+    def rephrase_prompt(self, user_request, model=None, max_tokens=None, llm_provider=None, provider=None):
+        logger.debug("Executing rephrase_prompt()")
+        model = model or self.config.model
+
+        if llm_provider is None:
+            try:
+                llm_provider = self.get_llm_provider(provider)
+            except Exception as e:
+                logger.error("Error initializing LLM provider: %s", str(e))
+                return None
+
+        return self.complete(get_rephrased_user_prompt(user_request), model=model, max_tokens=max_tokens,
+                             provider=provider, llm_provider=llm_provider)
+
+    @traced("engine.create_project_manager")
+    def create_project_manager(self, rephrased_text):
+        logger.debug("Creating Project Manager")
+        return self.complete(create_project_manager_prompt(rephrased_text))
+
+    @traced("engine.get_agents_from_text")
+    def get_agents_from_text(self, text):
+        logger.debug("Getting agents from text...")
+
+        try:
+            content = None
+            if USE_STRUCTURED_OUTPUT:
+                content = self.complete(
+                    f"{get_structured_agents_prompt()}\n\nTeam of Experts:\n{text}", stop=None, top_p=None,
+                    response_format={"type": "json_object"}, json_schema=get_agents_json_schema()
+                )
+                if not content:
+                    logger.warning("Structured output request failed. Retrying as plain text...")
+            if not content:
+                content = self.complete(f"{get_agents_prompt()}\n\nTeam of Experts:\n{text}", stop=None, top_p=None)
+            if not content:
+                logger.warning("No content extracted from response.")
+                return [], []
+
+            json_data = parse_json(content)
+            if not json_data:
+                logger.error("Failed to parse JSON data.")
+                return [], []
+
+            return create_agents(json_data, provider=self.config.provider, model=self.config.model)
+        except Exception as e:
+            logger.error("Error in get_agents_from_text: %s", e)
+            return [], []
+
+    @traced("engine.build_workflow")
+    def build_workflow(self, agents=None):
+        """Regenerate the workflow dict and both zip buffers for `agents`."""
+        state = self.state
+        agents = agents if agents is not None else state.agents
+        workflow_data, _ = get_workflow_from_agents(agents, model=self.config.model, temperature=self.config.temperature,
+                                                   provider=self.config.provider)
+        workflow_data["created_at"] = datetime.datetime.now().isoformat()
+
+        if workflow_data:
+            autogen_zip_buffer, crewai_zip_buffer = zip_files_in_memory(workflow_data, agents=agents, tool_models=state.get("tool_models") or [])
+            state.autogen_zip_buffer = autogen_zip_buffer
+            state.crewai_zip_buffer = crewai_zip_buffer
+        else:
+            state.autogen_zip_buffer = None
+            state.crewai_zip_buffer = None
+        return workflow_data
+
+    @traced("engine.handle_user_request")
+    def handle_user_request(self, user_request=None):
+        """Run the full request pipeline. Returns True when agents were created."""
+        state = self.state
+        user_request = user_request if user_request is not None else state.user_request
+        if not state.get("project_id"):
+            start_project(self.config.project_store, state, user_request)
+
+        # complete() reports failures by returning None rather than raising, so retry on an empty result
+        for retry in range(MAX_RETRIES):
+            rephrased_text = self.rephrase_prompt(user_request)
+            if rephrased_text:
+                state.rephrased_request = rephrased_text
+                break
+            if retry < MAX_RETRIES - 1:
+                logger.warning("Failed to rephrase the user request. Retrying in %s second(s)...", RETRY_DELAY)
+                metrics_registry.record_retry("user_request")
+                metrics_registry.record_wait("retry", RETRY_DELAY)
+                time.sleep(RETRY_DELAY)
+        else:
+            logger.error("Failed to rephrase the user request after %s attempts.", MAX_RETRIES)
+            self.notify("warning", "Failed to rephrase the user request. Please try again.")
+            return False
+
+        state.project_model.description = user_request
+        rephrased_text = state.rephrased_request
+        state.project_model.set_re_engineered_prompt(rephrased_text)
+
+        if not state.get("project_manager_output"):
+            project_manager_output = self.create_project_manager(rephrased_text)
+
+            if not project_manager_output:
+                logger.error("Failed to create Project Manager.")
+                self.notify("warning", "Failed to create Project Manager. Please try again.")
+                return False
+
+            state.project_manager_output = project_manager_output
+
+            current_project = Current_Project()
+            current_project.set_re_engineered_prompt(rephrased_text)
+
+            deliverables_text = split_pm_sections(project_manager_output).get("deliverables")
+            if deliverables_text:
+                for deliverable in parse_numbered_items(deliverables_text):
+                    current_project.add_deliverable(deliverable)
+                    state.project_model.add_deliverable(deliverable)
+            else:
+                logger.warning("'Deliverables' or 'Key Deliverables' section not found in Project Manager's output.")
+
+            state.current_project = current_project
+            record_project(self.config.project_store, state)
+
+            self.update_discussion("Project Manager", project_manager_output, "")
+        else:
+            project_manager_output = state.project_manager_output
+
+        team_of_experts_text = split_pm_sections(project_manager_output).get("team of experts")
+
+        if not team_of_experts_text:
+            logger.error("'Team of Experts' section not found in Project Manager's output.")
+            self.notify("warning", "Failed to extract the team of experts from the Project Manager's output. Please try again.")
+            return False
+
+        autogen_agents, crewai_agents = self.get_agents_from_text(team_of_experts_text)
+
+        if not autogen_agents:
+            logger.error("No agents created.")
+            self.notify("warning", "Failed to create agents. Please try again.")
+            return False
+
+        state.agents = autogen_agents
+        record_agents(self.config.project_store, state)
+        if state.get("workflow") is not None:
+            state.workflow.agents = state.agents
+
+        workflow_data = self.build_workflow(autogen_agents)
+
+        # Update the project with the workflow data
+        state.project_model.workflows = [workflow_data]
+
+        # Indicate that a rerun is needed
+        state.need_rerun = True
+        return True
+
+    def update_discussion(self, agent_name, response, user_input):
+        state = self.state
+        if state.get("discussion_turns") is None:
+            state.discussion_turns = []
+        turns = []
+        if user_input:
+            turns.append({"speaker": "User", "content": user_input})
+        turns.append({"speaker": agent_name, "content": response})
+
+        state.most_recent_response = format_turn(turns[-1])
+        state.discussion_history += "".join(format_turn(turn) for turn in turns)
+        state.discussion_turns.extend(turns)
+
+        state.last_agent = agent_name
+        state.last_comment = response
+        record_turn(self.config.project_store, state, turns)
+
+    def construct_request(self, agent, agent_name, description, user_request, user_input, rephrased_request, reference_url, tool_results):
+        reference_html = self.state.get("reference_html") or {}
+        return build_agent_request(agent, agent_name, description, user_request, user_input, rephrased_request,
+                                   reference_html.get(reference_url) if reference_url else None,
+                                   self.state.get("discussion"), tool_results)
+
+    def execute_agent_tools(self, agent_tools, tool_input, reference_url="", tool_functions=None):
+        """Run an agent's tools and return {tool name: result} without touching state."""
+        if tool_functions is None:
+            tool_functions = self.state.get("tool_functions") or {}
+        tool_results = {}
+        with self.activate():
+            for tool in agent_tools:
+                try:
+                    logger.debug("Executing tool: %s", tool.name)
+                    if tool.name in tool_functions:
+                        tool_function = tool_functions[tool.name]
+                        argument = reference_url if tool.name == 'fetch_web_content' and reference_url else tool_input
+
+                        def run(argument, tool_name=tool.name, tool_function=tool_function):
+                            with timed_tool_run(tool_name):
+                                return tool_function(argument)
+                        # Pure and idempotent tools reuse earlier results for the same input (and model, for LLM-backed tools)
+                        tool_result = run_tool(tool, run, argument, llm_scope=self.get_llm_scope())
+                    else:
+                        logger.error("Tool function not found for %s", tool.name)
+                        tool_result = f"Error: Tool function not found for {tool.name}"
+                    tool_results[tool.name] = tool_result
+                except Exception as e:
+                    error_message = f"Error executing tool {tool.name}: {str(e)}"
+                    logger.error(error_message, exc_info=True)
+                    tool_results[tool.name] = error_message
+        return tool_results
+
+    def record_tool_results(self, tool_results):
+        for tool_name, tool_result in tool_results.items():
+            tool_result_string = str(tool_result)
+            if not tool_result_string.startswith("Error executing tool"):
+                tool_result_string = tool_result_string[:1000] + "..."  # Limit to first 1000 characters
+            self.state.tool_result_string = tool_result_string
+            self.update_discussion(tool_name, tool_result_string, "")
+
+    def run_agent_tools(self, agent_tools, tool_input, reference_url=""):
+        tool_results = self.execute_agent_tools(agent_tools, tool_input, reference_url)
+        self.record_tool_results(tool_results)
+        return tool_results
+
+    def prepare_agent_turn(self, agent_index):
+        """
+        Snapshot everything an agent turn reads from state. Must run on the
+        thread that owns the state (the Streamlit script thread); the result
+        can then be handed to compute_agent_turn() on any thread.
+        """
+        state = self.state
+        agent = state.agents[agent_index]
+
+        if isinstance(agent, AgentBaseModel):
+            agent_name = agent.name
+            description = agent.description
+            agent_tools = agent.tools
+            if agent.auto_route:
+                current = (agent.provider, agent.model) if agent.provider and agent.model else None
+                route = model_router.choose(agent.capability_tier, agent.min_context,
+                                            providers=self.config.get_routable_providers(), current=current)
+                if route:
+                    agent.provider, agent.model = route
+            provider = agent.provider or self.config.provider
+            model = agent.model or self.config.model
+        else:
+            # Fallback for dictionary-like structure
+            agent_name = agent.get('config', {}).get('name', '')
+            description = agent.get('description', '')
+            agent_tools = agent.get("tools", [])
+            provider = agent.get('provider') or self.config.provider
+            model = agent.get('model') or self.config.model
+
+        reference_url = state.get('reference_url', '')
+        reference_html = state.get("reference_html") or {}
+        return {
+            "agent_index": agent_index,
+            "agent": agent,
+            "agent_name": agent_name,
+            "description": description,
+            "agent_tools": list(agent_tools),
+            "provider": provider,
+            "model": model,
+            "user_request": state.get('user_request', ''),
+            "user_input": state.get('user_input', ''),
+            "rephrased_request": state.get('rephrased_request', ''),
+            "reference_url": reference_url,
+            "reference_content": reference_html.get(reference_url) if reference_url else None,
+            "discussion": state.get("discussion"),
+            "discussion_turns": list(state.get("discussion_turns") or []),
+            "tool_functions": dict(state.get("tool_functions") or {})
+        }
+
+    @traced("engine.compute_agent_turn")
+    def compute_agent_turn(self, turn):
+        """
+        Run tools and the LLM call for a prepared turn without touching state,
+        so several turns can be computed concurrently. Apply the result with
+        apply_agent_turn().
+        """
+        logger.debug("Processing interaction for agent: %s", turn['agent_name'])
+        get_current_span().set_attributes(agent=turn["agent_name"], model=turn["model"])
+        user_request = turn["user_request"]
+        user_input = turn["user_input"]
+        rephrased_request = turn["rephrased_request"]
+
+        tool_results = self.execute_agent_tools(turn["agent_tools"], user_input or user_request or rephrased_request,
+                                                turn["reference_url"], tool_functions=turn["tool_functions"])
+
+        # The earlier turns travel as conversation messages, so the discussion text is left out of the prompt
+        discussion_turns = turn["discussion_turns"]
+        prefix, rest = build_agent_request_parts(turn["agent"], turn["agent_name"], turn["description"], user_request, user_input,
+                                                 rephrased_request, turn["reference_content"],
+                                                 None if discussion_turns else turn["discussion"], tool_results)
+        messages = build_agent_messages(turn["agent_name"], prefix, discussion_turns, rest)
+
+        model = turn["model"]
+        logger.debug("Sending request to %s using model %s", turn['provider'], model)
+        turn["tool_results"] = tool_results
+        turn["content"] = self.complete(messages, model=model, provider=turn["provider"], cache_prefix=prefix)
+        return turn
+
+    def apply_agent_turn(self, turn, user_input):
+        state = self.state
+        self.record_tool_results(turn["tool_results"])
+        if turn["content"]:
+            self.update_discussion(turn["agent_name"], turn["content"], user_input)
+            state['form_agent_name'] = turn["agent_name"]
+            state['form_agent_description'] = turn["description"]
+            state['selected_agent_index'] = turn["agent_index"]
+        else:
+            error_message = "Error: Failed to extract content from response"
+            logger.error(error_message)
+        return turn["content"]
+
+    @traced("engine.process_agent_interaction")
+    def process_agent_interaction(self, agent_index):
+        """Run one agent turn. Returns the agent's reply, or None on failure."""
+        turn = self.take_prefetched_turn(agent_index)
+        if turn is None:
+            turn = self.compute_agent_turn(self.prepare_agent_turn(agent_index))
+        return self.apply_agent_turn(turn, turn["user_input"])
+
+    @traced("engine.run_round")
+    def run_round(self, agent_indices=None, max_workers=MAX_ROUND_WORKERS):
+        """
+        Fan the current prompt out to several agents at once. Every agent sees
+        the same discussion snapshot; replies are appended in agent order once
+        all of them have finished. Returns the list of replies (None for
+        agents whose call failed).
+        """
+        if agent_indices is None:
+            agent_indices = range(len(self.state.agents))
+        agent_indices = list(agent_indices)
+        if not agent_indices:
+            return []
+
+        prepared = [self.prepare_agent_turn(agent_index) for agent_index in agent_indices]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(prepared))) as executor:
+            turns = list(executor.map(wrap_context(self.compute_agent_turn), prepared))
+
+        user_input = prepared[0]["user_input"]
+        replies = []
+        for position, turn in enumerate(turns):
+            # The user's input belongs in the history once, ahead of the first reply
+            replies.append(self.apply_agent_turn(turn, user_input if position == 0 else ""))
+        failed = [turn["agent_name"] for turn in turns if not turn["content"]]
+        if failed:
+            self.notify("warning", f"No response from: {', '.join(failed)}")
+        return replies
+
+    def regenerate_agent_description(self, agent):
+        agent_name = agent.name if hasattr(agent, 'name') else "Unknown Agent"
+        agent_description = agent.description if hasattr(agent, 'description') else ""
+        user_request = self.state.get('user_request', '')
+        discussion_history = self.state.get('discussion_history', '')
+        prompt = f"""
+    You are an AI assistant helping to improve an agent's description. The agent's current details are:
+    Name: {agent_name}
+    Description: {agent_description}
+    The current user request is: {user_request}
+    The discussion history so far is: {discussion_history}
+    Please generate a revised description for this agent that defines it in the best manner possible to address the current user request, taking into account the discussion thus far. Return only the revised description, written in the third-person, without any additional commentary or narrative. It is imperative that you return ONLY the text of the new description written in the third-person. No preamble, no narrative, no superfluous commentary whatsoever. Just the description, written in the third-person, unlabeled, please.  You will have been successful if your reply is thorough, comprehensive, concise, written in the third-person, and adherent to all of these instructions.
+    """
+        return self.complete(prompt)
+
+    def prepare_moderation(self, last_speaker=None, last_comment=None, speculative=False):
+        """
+        Build the moderator prompt from current state. Returns None when there
+        is nothing left to moderate. A speculative preparation never advances
+        the project phase; it simply gives up instead.
+        """
+        state = self.state
+        current_project = state.current_project
+        goal = current_project.re_engineered_prompt
+        if last_speaker is None:
+            last_speaker = state.last_agent
+        if last_comment is None:
+            last_comment = state.last_comment
+        discussion_history = state.discussion_history
+
+        deliverable_index, current_deliverable = current_project.get_next_unchecked_deliverable()
+
+        if current_deliverable is None:
+            if speculative:
+                return None
+            if current_project.current_phase != "Deployment":
+                current_project.move_to_next_phase()
+                record_deliverables(self.config.project_store, state)
+                self.notify("success", f"Moving to {current_project.current_phase} phase!")
+                deliverable_index, current_deliverable = current_project.get_next_unchecked_deliverable()
+                if current_deliverable is None:
+                    return None
+            else:
+                self.notify("success", "All deliverables have been completed and deployed!")
+                return None
+
+        current_phase = current_project.get_next_uncompleted_phase(deliverable_index)
+
+        team_members = []
+        for agent in state.agents:
+            if isinstance(agent, AgentBaseModel):
+                team_members.append(f"{agent.name}: {agent.description}")
+            else:
+                # Fallback for dictionary-like structure
+                agent_name = agent.get('config', {}).get('name', agent.get('name', 'Unknown'))
+                agent_description = agent.get('description', 'No description')
+                team_members.append(f"{agent_name}: {agent_description}")
+        team_members_str = "\n".join(team_members)
+
+        return {
+            "prompt": get_moderator_prompt(discussion_history, goal, last_comment, last_speaker, team_members_str, current_deliverable, current_phase),
+            "prompt_prefix": get_moderator_prompt_prefix(goal, team_members_str),
+            "deliverable_index": deliverable_index,
+            "current_deliverable": current_deliverable,
+            "current_phase": current_phase
+        }
+
+    @traced("engine.request_moderation")
+    def request_moderation(self, moderation, throttle=True):
+        """LLM part of moderation; touches no state, so it may run on any thread."""
+        for attempt in range(MAX_RETRIES):
+            if attempt > 0:
+                metrics_registry.record_retry("moderation")
+            if throttle:
+                metrics_registry.record_wait("throttle", RETRY_DELAY)
+                time.sleep(RETRY_DELAY)
+            content = self.complete(moderation["prompt"], cache_prefix=moderation.get("prompt_prefix"))
+            if content:
+                return content
+
+        logger.error("All retry attempts failed.")
+        return None
+
+    def apply_moderation(self, moderation, content):
+        state = self.state
+        current_project = state.current_project
+        deliverable_index = moderation["deliverable_index"]
+        current_deliverable = moderation["current_deliverable"]
+        current_phase = moderation["current_phase"]
+
+        # Extract the agent name from the content
+        next_agent, addressed_content = parse_agent_address(content)
+        if next_agent:
+            # Check if the extracted name is a valid agent and not a tool
+            if any(agent.name.lower() == next_agent.lower() for agent in state.agents):
+                state.next_agent = next_agent
+                # Remove the "To [Agent Name]:" prefix from the content
+                content = addressed_content
+            else:
+                self.notify("warning", f"'{next_agent}' is not a valid agent. Please select a valid agent.")
+                state.next_agent = None
+        else:
+            state.next_agent = None
+
+        moderation["phase_completed"] = COMPLETION_MARKERS[0] in content
+        moderation["deliverable_completed"] = COMPLETION_MARKERS[1] in content
+        self.last_moderation = moderation
+
+        if moderation["phase_completed"]:
+            current_project.mark_deliverable_phase_done(deliverable_index, current_phase)
+            content = content.replace("PHASE_COMPLETED", "").strip()
+            self.notify("success", f"Phase {current_phase} completed for deliverable: {current_deliverable}")
+
+        if moderation["deliverable_completed"]:
+            current_project.mark_deliverable_done(deliverable_index)
+            content = content.replace("DELIVERABLE_COMPLETED", "").strip()
+            self.notify("success", f"Deliverable completed: {current_deliverable}")
+
+        if moderation["phase_completed"] or moderation["deliverable_completed"]:
+            record_deliverables(self.config.project_store, state)
+        return content.strip()
+
+    @traced("engine.trigger_moderator")
+    def trigger_moderator(self):
+        """Ask the moderator who should speak next. Returns the prompt for that agent."""
+        moderation = self.prepare_moderation()
+        if moderation is None:
+            return None
+        content = self.request_moderation(moderation)
+        if content is None:
+            return None
+        return self.apply_moderation(moderation, content)
+
+    def is_speculation_valid(self, moderation, content, last_speaker, reply):
+        """
+        Check that a moderator reply computed before `last_speaker` finished
+        can stand in for one that has seen `reply`. The moderator never saw
+        the reply, so any completion marker is rejected outright; so is a
+        reply that ends the work or hands over to an agent the speculation
+        did not pick. The project must not have moved on, and the speculation
+        must address a real agent other than the one that just spoke.
+        """
+        if any(marker in content for marker in COMPLETION_MARKERS):
+            return False
+        if any(marker in reply for marker in COMPLETION_MARKERS + ("TERMINATE",)):
+            return False
+
+        current_project = self.state.current_project
+        deliverable_index, _ = current_project.get_next_unchecked_deliverable()
+        if deliverable_index != moderation["deliverable_index"]:
+            return False
+        if current_project.get_next_uncompleted_phase(deliverable_index) != moderation["current_phase"]:
+            return False
+
+        next_agent, _ = parse_agent_address(content)
+        if not next_agent:
+            return False
+        next_agent = next_agent.lower()
+        if next_agent == last_speaker.lower():
+            return False
+        agent_names = [agent.name.lower() for agent in self.state.agents]
+        if next_agent not in agent_names:
+            return False
+
+        # The agent asked for someone else by name; the moderator would have followed that
+        reply_addressee, _ = parse_agent_address(reply)
+        if reply_addressee and reply_addressee.lower() != next_agent:
+            return False
+        mentioned = [name for name in agent_names if name != last_speaker.lower()
+                     and re.search(rf"(?<!\w){re.escape(name)}(?!\w)", reply, re.IGNORECASE)]
+        return not mentioned or next_agent in mentioned
+
+    @traced("engine.run_speculative_turn")
+    def run_speculative_turn(self, agent_index, prefetch_next=False):
+        """
+        Run one agent turn while a moderator call is computed in the
+        background on the context as it stood when the agent started. When
+        the agent finishes the speculative reply is re-validated and, if stale,
+        replaced by a regular moderator call. With `prefetch_next` the
+        predicted next agent's turn is started right away as well.
+
+        Returns (agent reply, moderator response).
+        """
+        turn = self.prepare_agent_turn(agent_index)
+        speculation = self.prepare_moderation(last_speaker=turn["agent_name"], last_comment="(still responding)", speculative=True)
+        moderator_future = None
+        if speculation is not None:
+            moderator_future = get_background_executor().submit(wrap_context(self.request_moderation), speculation, False)
+
+        reply = self.apply_agent_turn(self.compute_agent_turn(turn), turn["user_input"])
+
+        content = moderator_future.result() if moderator_future is not None else None
+        speculation_valid = bool(reply and content and self.is_speculation_valid(speculation, content, turn["agent_name"], reply))
+        if moderator_future is not None:
+            metrics_registry.record_cache("speculative_moderation", speculation_valid)
+        if speculation_valid:
+            logger.debug("Speculative moderation accepted")
+            moderator_response = self.apply_moderation(speculation, content)
+        else:
+            logger.debug("Speculative moderation discarded; asking the moderator again")
+            moderator_response = self.trigger_moderator()
+
+        if prefetch_next and moderator_response and self.state.get("next_agent"):
+            next_index = self.find_agent_index(self.state.next_agent)
+            if next_index is not None:
+                self.prefetch_agent_turn(next_index, format_moderated_input(self.state.next_agent, moderator_response))
+
+        return reply, moderator_response
+
+    def find_agent_index(self, agent_name):
+        for index, agent in enumerate(self.state.agents):
+            if agent.name.lower() == agent_name.lower():
+                return index
+        return None
+
+    def prefetch_agent_turn(self, agent_index, user_input):
+        """Start computing an agent's turn ahead of the user's click."""
+        turn = self.prepare_agent_turn(agent_index)
+        turn["user_input"] = user_input
+        self.state.prefetched_turn = {
+            "agent_index": agent_index,
+            "user_input": user_input,
+            "discussion": turn["discussion"],
+            "discussion_length": len(turn["discussion_turns"]),
+            "future": get_background_executor().submit(wrap_context(self.compute_agent_turn), turn)
+        }
+
+    def take_prefetched_turn(self, agent_index):
+        """Return the prefetched turn for `agent_index` if its inputs still match, else None."""
+        prefetched = self.state.get("prefetched_turn")
+        if not prefetched:
+            return None
+        self.state.prefetched_turn = None
+        if (prefetched["agent_index"] != agent_index
+                or prefetched["user_input"] != self.state.get("user_input", "")
+                or prefetched["discussion"] != self.state.get("discussion")
+                or prefetched["discussion_length"] != len(self.state.get("discussion_turns") or [])):
+            prefetched["future"].cancel()
+            metrics_registry.record_cache("prefetched_turn", False)
+            return None
+        metrics_registry.record_cache("prefetched_turn", True)
+        return prefetched["future"].result()
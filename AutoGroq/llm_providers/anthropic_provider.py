@@ -1,9 +1,16 @@
 # llm_providers/anthropic_provider.py
 
 import anthropic
-import streamlit as st
+import json
+import logging
 
+from configs.config import DEFAULT_TEMPERATURE
 from llm_providers.base_provider import BaseLLMProvider
+from utils.token_utils import get_model_info
+
+logger = logging.getLogger(__name__)
+
+PROMPT_CACHING_BETA = "prompt-caching-2024-07-31"
 
 class AnthropicProvider(BaseLLMProvider):
     def __init__(self, api_url, api_key):
@@ -22,13 +29,62 @@ class AnthropicProvider(BaseLLMProvider):
             "claude-instant-1.2": 100000,
         }
                 
+    def get_usage(self, response):
+        return response.usage.input_tokens, response.usage.output_tokens
+
+    def get_cached_tokens(self, response):
+        return getattr(response.usage, "cache_read_input_tokens", None)
+
+    def build_messages(self, messages, cache_prefix=None):
+        """
+        Split OpenAI-style messages into Anthropic's (system, messages).
+
+        System messages become the `system` parameter; the rest keep their
+        roles, with same-role neighbours merged because Anthropic expects
+        user/assistant alternation starting with a user turn. Anthropic only
+        caches up to explicit cache_control breakpoints, so with a
+        `cache_prefix` the stable system prompt (or the leading part of the
+        first user message) is marked, and so is the last message before the
+        new turn, letting the next call reuse the whole earlier conversation.
+        """
+        cache_control = {"type": "ephemeral"}
+        system = [{"type": "text", "text": message["content"]} for message in messages if message["role"] == "system"]
+        request_messages = []
+        for message in messages:
+            if message["role"] == "system":
+                continue
+            role = "assistant" if message["role"] == "assistant" else "user"
+            if not request_messages and role == "assistant":
+                request_messages.append({"role": "user", "content": [{"type": "text", "text": "(The discussion so far.)"}]})
+            if request_messages and request_messages[-1]["role"] == role:
+                request_messages[-1]["content"].append({"type": "text", "text": message["content"]})
+            else:
+                request_messages.append({"role": role, "content": [{"type": "text", "text": message["content"]}]})
+
+        if cache_prefix:
+            if system and system[-1]["text"].startswith(cache_prefix):
+                system[-1]["cache_control"] = cache_control
+            elif request_messages:
+                blocks = request_messages[0]["content"]
+                text = blocks[0]["text"]
+                if text.startswith(cache_prefix):
+                    blocks[0:1] = [{"type": "text", "text": cache_prefix, "cache_control": cache_control}]
+                    if len(text) > len(cache_prefix):
+                        blocks.insert(1, {"type": "text", "text": text[len(cache_prefix):]})
+            if len(request_messages) > 1:
+                request_messages[-2]["content"][-1]["cache_control"] = cache_control
+        return system, request_messages
+
     def process_response(self, response):
         if response is not None:
+            # A forced tool call carries the structured output as its input
+            tool_use = next((block for block in response.content if block.type == "tool_use"), None)
+            content = json.dumps(tool_use.input) if tool_use is not None else response.content[0].text
             return {
                 "choices": [
                     {
                         "message": {
-                            "content": response.content[0].text
+                            "content": content
                         }
                     }
                 ]
@@ -38,18 +94,31 @@ class AnthropicProvider(BaseLLMProvider):
     def send_request(self, data):
         try:
             model = data['model']
-            max_tokens = min(data.get('max_tokens', 1000), self.get_available_models()[model])
+            max_tokens = min(data.get('max_tokens', 1000), get_model_info("anthropic", model)["max_output"])
             
-            response = self.client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                temperature=data.get('temperature', st.session_state.temperature),
-                messages=[
-                    {"role": "user", "content": message["content"]}
-                    for message in data['messages']
-                ]
-            )
+            request = {
+                "model": model,
+                "max_tokens": max_tokens,
+                "temperature": data.get('temperature', DEFAULT_TEMPERATURE),
+            }
+            system, request["messages"] = self.build_messages(data['messages'], data.get('cache_prefix'))
+            if system:
+                request["system"] = system
+            if data.get('cache_prefix'):
+                request["extra_headers"] = {"anthropic-beta": PROMPT_CACHING_BETA}
+
+            # Anthropic has no JSON mode; force a tool call whose input schema is the requested JSON
+            json_schema = data.get('json_schema')
+            if data.get('response_format', {}).get('type') == "json_object" and json_schema:
+                request["tools"] = [{
+                    "name": json_schema["name"],
+                    "description": json_schema.get("description", ""),
+                    "input_schema": json_schema["schema"]
+                }]
+                request["tool_choice"] = {"type": "tool", "name": json_schema["name"]}
+
+            response = self.client.messages.create(**request)
             return response
         except anthropic.APIError as e:
-            print(f"Anthropic API error: {e}")
+            logger.error("Anthropic API error: %s", e)
             return None
\ No newline at end of file
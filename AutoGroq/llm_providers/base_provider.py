@@ -1,6 +1,26 @@
+# llm_providers/base_provider.py
+
+import requests
+import threading
+
 from abc import ABC, abstractmethod
+from utils.metrics_utils import instrument_send_request
+
+# Request keys the engine adds for providers that can use them (structured output
+# schema, cacheable prompt prefix). Providers that post `data` as-is must drop them.
+ENGINE_REQUEST_KEYS = ("json_schema", "cache_prefix")
+
+_sessions_lock = threading.Lock()
+
 
 class BaseLLMProvider(ABC):
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every concrete send_request is timed and its token usage recorded
+        send_request = cls.__dict__.get("send_request")
+        if send_request is not None and not getattr(send_request, "instrumented", False):
+            cls.send_request = instrument_send_request(send_request)
+
     @abstractmethod
     def __init__(self, api_key, api_url=None):
         pass
@@ -15,4 +35,31 @@ class BaseLLMProvider(ABC):
 
     @abstractmethod
     def get_available_models(self):
-        pass
\ No newline at end of file
+        pass
+
+    @property
+    def session(self):
+        """
+        A requests.Session per provider instance and thread, so HTTP connections
+        are kept alive between calls. Provider instances are shared by every
+        session and worker thread (see utils.api_utils.ProviderCache), and
+        requests.Session is not thread-safe, so each thread gets its own.
+        """
+        sessions = self.__dict__.get("_sessions")
+        if sessions is None:
+            with _sessions_lock:
+                sessions = self.__dict__.setdefault("_sessions", threading.local())
+        session = getattr(sessions, "session", None)
+        if session is None:
+            session = sessions.session = requests.Session()
+        return session
+
+    def get_usage(self, response):
+        """Return (prompt_tokens, completion_tokens) for a successful response of an OpenAI-style API."""
+        usage = response.json().get("usage") or {}
+        return usage.get("prompt_tokens"), usage.get("completion_tokens")
+
+    def get_cached_tokens(self, response):
+        """Prompt tokens served from the provider's prefix cache, or None if it doesn't report them."""
+        usage = response.json().get("usage") or {}
+        return (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
@@ -1,8 +1,7 @@
 
 import json
-import requests
 
-from llm_providers.base_provider import BaseLLMProvider
+from llm_providers.base_provider import ENGINE_REQUEST_KEYS, BaseLLMProvider
 
 
 class FireworksProvider(BaseLLMProvider):
@@ -28,9 +27,12 @@ class FireworksProvider(BaseLLMProvider):
         }
         # Ensure data is a JSON string
         if isinstance(data, dict):
+            # response_format is sent as-is. The API caches repeated prompt prefixes on its own,
+            # so only the engine's hints (json_schema, cache_prefix) are dropped
+            data = {key: value for key, value in data.items() if key not in ENGINE_REQUEST_KEYS}
             json_data = json.dumps(data)
         else:
             json_data = data
-        response = requests.post(self.api_url, data=json_data, headers=headers)
+        response = self.session.post(self.api_url, data=json_data, headers=headers)
         return response
     
\ No newline at end of file
@@ -1,11 +1,10 @@
 
 import json
-import requests
 
-from llm_providers.base_provider import BaseLLMProvider
+from llm_providers.base_provider import ENGINE_REQUEST_KEYS, BaseLLMProvider
 
 
-class GroqProvider:
+class GroqProvider(BaseLLMProvider):
     def __init__(self, api_url, api_key):
         self.api_key = api_key
         self.api_url = api_url or "https://api.groq.com/openai/v1/chat/completions"
@@ -25,15 +24,18 @@ class GroqProvider:
         }
         # Ensure data is a JSON string
         if isinstance(data, dict):
+            # response_format is sent as-is. The API caches repeated prompt prefixes on its own,
+            # so only the engine's hints (json_schema, cache_prefix) are dropped
+            data = {key: value for key, value in data.items() if key not in ENGINE_REQUEST_KEYS}
             json_data = json.dumps(data)
         else:
             json_data = data
-        response = requests.post(self.api_url, data=json_data, headers=headers)
+        response = self.session.post(self.api_url, data=json_data, headers=headers)
         return response
     
 
     def get_available_models(self):
-        response = requests.get("https://api.groq.com/openai/v1/models", headers={
+        response = self.session.get("https://api.groq.com/openai/v1/models", headers={
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         })
@@ -1,13 +1,12 @@
 # llm_providers/lmstudio_provider.py
 
 import json
-import requests
-import streamlit as st
 
+from configs.config import DEFAULT_TEMPERATURE
 from llm_providers.base_provider import BaseLLMProvider
 
 
-class LmstudioProvider:
+class LmstudioProvider(BaseLLMProvider):
     def __init__(self, api_url, api_key):
         self.api_url = api_url or "http://localhost:1234/v1/chat/completions"
 
@@ -49,7 +48,7 @@ class LmstudioProvider:
         lm_studio_request_data = {
             "model": data["model"],
             "messages": data["messages"],
-            "temperature": st.session_state.temperature,
+            "temperature": data.get("temperature", DEFAULT_TEMPERATURE),
             "max_tokens": data.get("max_tokens", 2048),
             "stop": data.get("stop", "TERMINATE"),
         }
@@ -60,6 +59,6 @@ class LmstudioProvider:
         else:
             json_data = lm_studio_request_data
 
-        response = requests.post(self.api_url, data=json_data, headers=headers)
+        response = self.session.post(self.api_url, data=json_data, headers=headers)
         return response
     
\ No newline at end of file
@@ -0,0 +1,138 @@
+# llm_providers/mock_provider.py
+
+import datetime
+import json
+import random
+import re
+import threading
+import time
+
+from llm_providers.base_provider import BaseLLMProvider
+
+
+TEAM_MEMBERS_PATTERN = re.compile(r"team members and their descriptions:\s*\n(.*?)\n\s*\n", re.DOTALL)
+LAST_SPEAKER_PATTERN = re.compile(r"The last speaker was (\w+)")
+TEAM_OF_EXPERTS_ITEM_PATTERN = re.compile(r"^\s*\d+\.\s*(.+?)\s*$", re.MULTILINE)
+
+
+class MockResponse:
+    """Just enough of requests.Response for the providers' callers and the metrics wrapper."""
+    def __init__(self, status_code, payload, elapsed):
+        self.status_code = status_code
+        self._payload = payload
+        self.elapsed = datetime.timedelta(seconds=elapsed)
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return self._payload
+
+
+class MockProvider(BaseLLMProvider):
+    """
+    Deterministic offline provider for benchmarks and local development.
+    Replies are generated from the prompt type (rephrase, project manager,
+    agent JSON, moderator, agent turn) so the whole pipeline runs without
+    network access.
+
+    latency:            seconds before the first byte of every response
+    tokens_per_second:  simulated generation speed (None = instant)
+    failure_rate:       probability of a 500 response
+    rate_limit_rate:    probability of a 429 response
+    team_size / deliverables / reply_tokens: shape of the generated content
+    """
+    def __init__(self, api_url=None, api_key=None, latency=0.0, tokens_per_second=None, failure_rate=0.0,
+                 rate_limit_rate=0.0, team_size=3, deliverables=3, reply_tokens=200, seed=0):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.team_size = team_size
+        self.deliverables = deliverables
+        self.reply_tokens = reply_tokens
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.request_count = 0
+
+    def get_available_models(self):
+        return {
+            "mock-small": 8192,
+            "mock-large": 128000,
+        }
+
+    def process_response(self, response):
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise Exception(f"Request failed with status code {response.status_code}")
+
+    def send_request(self, data):
+        prompt = "\n".join(message["content"] for message in data["messages"])
+        with self._lock:
+            self.request_count += 1
+            roll = self._random.random()
+
+        if roll < self.rate_limit_rate:
+            time.sleep(self.latency)
+            return MockResponse(429, {"error": {"message": "Rate limit reached (mock)"}}, self.latency)
+        if roll < self.rate_limit_rate + self.failure_rate:
+            time.sleep(self.latency)
+            return MockResponse(500, {"error": {"message": "Internal error (mock)"}}, self.latency)
+
+        content = self.generate_content(prompt, data)
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = max(1, len(content) // 4)
+        generation_time = completion_tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+        time.sleep(self.latency + generation_time)
+        return MockResponse(200, {
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+        }, self.latency)
+
+    def generate_content(self, prompt, data):
+        if "Moderator Bot" in prompt:
+            return self._moderator_reply(prompt)
+        if "prompt engineer" in prompt:
+            return "Build a small web service with documentation and tests, delivered in clear incremental steps."
+        if "As a Project Manager" in prompt:
+            return self._project_plan()
+        if "format the JSON" in prompt:
+            return self._agents_json(prompt, data)
+        return self._agent_reply()
+
+    def _project_plan(self):
+        lines = ["Project Outline:", "A concise outline of the work to be done.", "", "Key Deliverables:"]
+        lines += [f"{index}. Deliverable {index}" for index in range(1, self.deliverables + 1)]
+        lines += ["", "Team of Experts:"]
+        lines += [f"{index}. Expert {index}: responsible for area {index}" for index in range(1, self.team_size + 1)]
+        return "\n".join(lines)
+
+    def _agents_json(self, prompt, data):
+        experts = TEAM_OF_EXPERTS_ITEM_PATTERN.findall(prompt.split("Team of Experts:")[-1])
+        agents = [{
+            "expert_name": expert.split(":")[0].strip(),
+            "description": f"Handles {expert}",
+            "role": expert.split(":")[0].strip(),
+            "goal": f"Deliver {expert}",
+            "backstory": "A seasoned specialist."
+        } for expert in experts]
+        if data.get("response_format", {}).get("type") == "json_object":
+            return json.dumps({"agents": agents})
+        return json.dumps(agents)
+
+    def _moderator_reply(self, prompt):
+        members_match = TEAM_MEMBERS_PATTERN.search(prompt)
+        members = [line.split(":")[0].strip() for line in members_match.group(1).splitlines() if line.strip()] if members_match else []
+        if not members:
+            return "To nobody: there is no team yet."
+        speaker_match = LAST_SPEAKER_PATTERN.search(prompt)
+        last_speaker = speaker_match.group(1) if speaker_match else None
+        next_index = (members.index(last_speaker) + 1) % len(members) if last_speaker in members else 0
+        return f"To {members[next_index]}: please continue with the current deliverable."
+
+    def _agent_reply(self):
+        words = ["Here", "is", "the", "next", "step", "of", "the", "implementation."]
+        prose = " ".join(words[index % len(words)] for index in range(self.reply_tokens // 2))
+        code = "\n".join(f"    result_{index} = compute({index})" for index in range(self.reply_tokens // 20))
+        return f"{prose}\n\n```python\ndef step():\n{code}\n    return True\n```"
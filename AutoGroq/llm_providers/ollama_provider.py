@@ -1,15 +1,17 @@
 # llm_providers/ollama_provider.py
 
 import json
-import requests
-import streamlit as st
 
+from configs.config import DEFAULT_TEMPERATURE, OLLAMA_KEEP_ALIVE
 from llm_providers.base_provider import BaseLLMProvider
 
 
-class OllamaProvider:
+class OllamaProvider(BaseLLMProvider):
     def __init__(self, api_url, api_key):
-        self.api_url = api_url or "http://127.0.0.1:11434/api/generate"
+        self.api_url = api_url or "http://127.0.0.1:11434/api/chat"
+        if self.api_url.endswith("/api/generate"):
+            # /api/chat takes the whole conversation, so Ollama can reuse the KV cache of earlier turns
+            self.api_url = self.api_url[:-len("/api/generate")] + "/api/chat"
 
 
     def get_available_models(self):
@@ -22,8 +24,8 @@ class OllamaProvider:
     def process_response(self, response):
         if response.status_code == 200:
             response_data = response.json()
-            if "response" in response_data:
-                content = response_data["response"].strip()
+            if "message" in response_data:
+                content = response_data["message"].get("content", "").strip()
                 if content:
                     return {
                         "choices": [
@@ -37,28 +39,39 @@ class OllamaProvider:
                 else:
                     raise Exception("Empty response received from the Ollama API.")
             else:
-                raise Exception("Unexpected response format. 'response' field missing.")
+                raise Exception("Unexpected response format. 'message' field missing.")
         else:
             raise Exception(f"Request failed with status code {response.status_code}")
 
 
+    def get_usage(self, response):
+        response_data = response.json()
+        return response_data.get("prompt_eval_count"), response_data.get("eval_count")
+
+
     def send_request(self, data):
         headers = {
             "Content-Type": "application/json",
         }
         # Construct the request data in the format expected by the Ollama API
+        stop = data.get("stop", "TERMINATE")
         ollama_request_data = {
             "model": data["model"],
-            "prompt": data["messages"][0]["content"],
-            "temperature": st.session_state.temperature,
-            "max_tokens": data.get("max_tokens", 2048),
-            "stop": data.get("stop", "TERMINATE"),
+            "messages": [{"role": message["role"], "content": message["content"]} for message in data["messages"]],
+            "options": {
+                "temperature": data.get("temperature", DEFAULT_TEMPERATURE),
+                "num_predict": data.get("max_tokens", 2048),
+                "stop": [stop] if isinstance(stop, str) else stop,
+            },
+            "keep_alive": OLLAMA_KEEP_ALIVE,
             "stream": False,
         }
+        if data.get("response_format", {}).get("type") == "json_object":
+            ollama_request_data["format"] = "json"
         # Ensure data is a JSON string
         if isinstance(ollama_request_data, dict):
             json_data = json.dumps(ollama_request_data)
         else:
             json_data = ollama_request_data
-        response = requests.post(self.api_url, data=json_data, headers=headers)
+        response = self.session.post(self.api_url, data=json_data, headers=headers)
         return response
\ No newline at end of file
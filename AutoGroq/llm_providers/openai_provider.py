@@ -1,18 +1,20 @@
 
 import json
+import logging
 import os
-import requests
 
-from llm_providers.base_provider import BaseLLMProvider
+from llm_providers.base_provider import ENGINE_REQUEST_KEYS, BaseLLMProvider
 
-class OpenaiProvider:
+logger = logging.getLogger(__name__)
+
+class OpenaiProvider(BaseLLMProvider):
     def __init__(self, api_url, api_key):
         self.api_key = api_key
         self.api_url = api_url or "https://api.openai.com/v1/chat/completions"
 
 
     def get_available_models(self):
-        response = requests.get("https://api.openai.com/v1/models", headers={
+        response = self.session.get("https://api.openai.com/v1/models", headers={
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         })
@@ -31,7 +33,6 @@ class OpenaiProvider:
 
 
     def send_request(self, data):
-        print("self.api_url: ", self.api_url)
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -39,12 +40,14 @@ class OpenaiProvider:
         
         # Ensure data is a JSON string
         if isinstance(data, dict):
+            # response_format is sent as-is. The API caches repeated prompt prefixes on its own,
+            # so only the engine's hints (json_schema, cache_prefix) are dropped
+            data = {key: value for key, value in data.items() if key not in ENGINE_REQUEST_KEYS}
             json_data = json.dumps(data)
         else:
             json_data = data
         
-        response = requests.post(self.api_url, data=json_data, headers=headers)
-        print("response.status_code: ", response.status_code)
-        print("response.text: ", response.text)
+        response = self.session.post(self.api_url, data=json_data, headers=headers)
+        logger.debug("POST %s -> %s", self.api_url, response.status_code)
         return response
     
\ No newline at end of file
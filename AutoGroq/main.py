@@ -3,29 +3,36 @@
 import streamlit as st 
 
 from agent_management import display_agents
+from configs.config import METRICS_PORT
 from utils.api_utils import fetch_available_models, get_api_key
 from utils.auth_utils import display_api_key_input
 from utils.error_handling import setup_logging
+from utils.memory_utils import enforce_session_limits
+from utils.metrics_utils import start_metrics_server
 from utils.session_utils import initialize_session_variables
 from utils.tool_utils import load_tool_functions
 from utils.ui_utils import (
-    display_reset_and_upload_buttons, 
+    display_bundle_import, display_reset_and_upload_buttons, display_saved_projects,
     display_user_request_input, handle_user_request, 
-    select_model, select_provider, set_css, 
+    restore_project_from_url, select_model, select_provider, set_css, 
     set_temperature, show_interfaces
 )
 
 
 def main():
     setup_logging()
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
     if 'warning_placeholder' not in st.session_state:
         st.session_state.warning_placeholder = st.empty()
     st.title("AutoGroq™")
 
     set_css()
+    restore_project_from_url()
     initialize_session_variables()
     fetch_available_models()
     load_tool_functions()
+    enforce_session_limits(st.session_state)
 
     if st.session_state.get("need_rerun", False):
         st.session_state.need_rerun = False
@@ -55,6 +62,8 @@ def main():
         
     with st.sidebar:
         display_agents()
+        display_saved_projects()
+        display_bundle_import()
          
 
 if __name__ == "__main__":
@@ -2,11 +2,18 @@
 
 import inspect
 
+from models.slotted_model import SlottedModel
 from models.tool_base_model import ToolBaseModel
 from typing import List, Dict, Callable, Optional, Union
 
 
-class AgentBaseModel:
+class AgentBaseModel(SlottedModel):
+    __slots__ = ("id", "name", "description", "tools", "config", "role", "goal", "backstory", "provider", "model",
+                 "auto_route", "capability_tier", "min_context", "created_at", "updated_at", "user_id", "workflows",
+                 "type", "models", "verbose", "allow_delegation", "new_description", "timestamp",
+                 "is_termination_msg", "code_execution_config", "llm", "function_calling_llm", "max_iter", "max_rpm",
+                 "max_execution_time", "step_callback", "cache")
+
     def __init__(
         self,
         name: str,
@@ -18,6 +25,9 @@ class AgentBaseModel:
         backstory: str,
         provider: Optional[str] = None,
         model: Optional[str] = None,
+        auto_route: Optional[bool] = False,
+        capability_tier: Optional[str] = None,
+        min_context: Optional[int] = None,
         id: Optional[int] = None,
         created_at: Optional[str] = None,
         updated_at: Optional[str] = None,
@@ -49,6 +59,10 @@ class AgentBaseModel:
         self.backstory = backstory
         self.provider = provider
         self.model = model
+        # With auto_route the engine picks provider/model per turn; see utils.routing_utils.ModelRouter
+        self.auto_route = auto_route
+        self.capability_tier = capability_tier
+        self.min_context = min_context
         self.created_at = created_at
         self.updated_at = updated_at
         self.user_id = user_id
@@ -76,7 +90,10 @@ class AgentBaseModel:
     def __repr__(self):
         return self.__str__()
 
-    def to_dict(self):
+    def _get_children(self):
+        return [tool for tool in self.tools if isinstance(tool, SlottedModel)]
+
+    def _build_dict(self):
         return {
             "id": self.id,
             "name": self.name,
@@ -84,6 +101,9 @@ class AgentBaseModel:
             'tools': [tool.to_dict() if hasattr(tool, 'to_dict') else tool for tool in self.tools],
             "provider": self.provider,
             "model": self.model,
+            "auto_route": self.auto_route,
+            "capability_tier": self.capability_tier,
+            "min_context": self.min_context,
             "config": self.config,
             "role": self.role,
             "goal": self.goal,
@@ -123,6 +143,9 @@ class AgentBaseModel:
             backstory=data.get("backstory", ""),
             provider=data.get("provider"),
             model=data.get("model"),
+            auto_route=data.get("auto_route", False),
+            capability_tier=data.get("capability_tier"),
+            min_context=data.get("min_context"),
             created_at=data.get("created_at"),
             updated_at=data.get("updated_at"),
             user_id=data.get("user_id"),
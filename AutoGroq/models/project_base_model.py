@@ -1,7 +1,12 @@
 from typing import List, Dict, Optional
 from datetime import datetime
+from models.slotted_model import SlottedModel
+
+class ProjectBaseModel(SlottedModel):
+    __slots__ = ("id", "re_engineered_prompt", "deliverables", "created_at", "updated_at", "user_id", "name",
+                 "description", "status", "due_date", "priority", "tags", "attachments", "notes", "collaborators",
+                 "tools", "workflows")
 
-class ProjectBaseModel:
     def __init__(
         self,
         re_engineered_prompt: str = "",
@@ -43,22 +48,28 @@ class ProjectBaseModel:
 
     def add_deliverable(self, deliverable: str):
         self.deliverables.append({"text": deliverable, "done": False})
+        self.invalidate()
 
 
     def mark_deliverable_done(self, index: int):
         if 0 <= index < len(self.deliverables):
             self.deliverables[index]["done"] = True
+            self.invalidate()
 
 
     def mark_deliverable_undone(self, index: int):
         if 0 <= index < len(self.deliverables):
             self.deliverables[index]["done"] = False
+            self.invalidate()
 
 
     def set_re_engineered_prompt(self, prompt: str):
         self.re_engineered_prompt = prompt
 
-    def to_dict(self):
+    def _get_children(self):
+        return [item for item in self.tools + self.workflows if isinstance(item, SlottedModel)]
+
+    def _build_dict(self):
         return {
             "id": self.id,
             "re_engineered_prompt": self.re_engineered_prompt,
@@ -75,8 +86,8 @@ class ProjectBaseModel:
             "attachments": self.attachments,
             "notes": self.notes,
             "collaborators": self.collaborators,
-            "tools": self.tools,
-            "workflows": self.workflows
+            "tools": [item.to_dict() if isinstance(item, SlottedModel) else item for item in self.tools],
+            "workflows": [item.to_dict() if isinstance(item, SlottedModel) else item for item in self.workflows]
         }
 
     @classmethod
@@ -98,4 +109,4 @@ class ProjectBaseModel:
             notes=data.get("notes"),
             collaborators=data.get("collaborators")
         )
-    
\ No newline at end of file
+    
@@ -0,0 +1,89 @@
+# models/slotted_model.py
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data, indent=False):
+    """
+    JSON text for `data`, written by orjson when it is installed and by the
+    json module otherwise. Values JSON cannot hold (callables, datetimes) are
+    written with str().
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(data, default=str, option=option).decode("utf-8")
+        except TypeError:
+            # e.g. integers wider than 64 bits; the json module copes
+            pass
+    if indent:
+        return json.dumps(data, indent=2, ensure_ascii=False, default=str)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class SlottedModel:
+    """
+    Base for the data models. Attributes live in __slots__ instead of a
+    per-instance __dict__, and to_dict()/to_json() are built once and reused
+    until the model changes. Assigning any attribute invalidates the cache, as
+    does a change in a nested model (an agent's tools, a workflow's agents).
+    Mutating a plain nested value in place, such as an agent's config dict or
+    a deliverable, does not: call invalidate() afterwards.
+
+    to_dict() returns a shallow copy, so callers may add or drop keys; the
+    nested values are shared with the model and must be treated as read-only.
+    """
+    __slots__ = ("_cache",)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name != "_cache":
+            object.__setattr__(self, "_cache", None)
+
+    def invalidate(self):
+        """Drop the cached dict and JSON, e.g. after changing a nested dict in place."""
+        object.__setattr__(self, "_cache", None)
+
+    def _build_dict(self):
+        raise NotImplementedError
+
+    def _get_children(self):
+        """The nested models whose dicts are part of this model's dict."""
+        return ()
+
+    def _is_fresh(self):
+        cache = getattr(self, "_cache", None)
+        if cache is None:
+            return False
+        children = self._get_children()
+        seen = cache[1]
+        if len(children) != len(seen):
+            return False
+        for child, (seen_child, seen_cache) in zip(children, seen):
+            if child is not seen_child or not child._is_fresh() or child._cache is not seen_cache:
+                return False
+        return True
+
+    def _get_cache(self):
+        if not self._is_fresh():
+            data = self._build_dict()
+            # Built after _build_dict so it sees the children's rebuilt caches
+            seen = tuple((child, child._cache) for child in self._get_children())
+            object.__setattr__(self, "_cache", (data, seen, {}))
+        return self._cache
+
+    def to_dict(self):
+        return dict(self._get_cache()[0])
+
+    def to_json(self, indent=False):
+        """to_dict() as JSON text, cached per indent style until the model changes."""
+        data, _, json_cache = self._get_cache()
+        text = json_cache.get(indent)
+        if text is None:
+            text = json_cache[indent] = dumps(data, indent=indent)
+        return text
@@ -1,8 +1,14 @@
 # tool_base_model.py
 
+import hashlib
+
+from models.slotted_model import SlottedModel
 from typing import List, Dict, Optional, Callable
 
-class ToolBaseModel:
+class ToolBaseModel(SlottedModel):
+    __slots__ = ("id", "name", "description", "title", "file_name", "content", "function", "created_at", "updated_at",
+                 "user_id", "secrets", "libraries", "timestamp", "version", "pure", "cache_ttl", "uses_llm")
+
     def __init__(
         self,
         name: str,
@@ -17,7 +23,11 @@ class ToolBaseModel:
         user_id: Optional[str] = None,
         secrets: Optional[Dict] = None,
         libraries: Optional[List[str]] = None,
-        timestamp: Optional[str] = None
+        timestamp: Optional[str] = None,
+        version: Optional[str] = None,
+        pure: bool = False,
+        cache_ttl: Optional[float] = None,
+        uses_llm: bool = False
     ):
         self.id = id
         self.name = name
@@ -32,6 +42,14 @@ class ToolBaseModel:
         self.secrets = secrets if secrets is not None else []
         self.libraries = libraries if libraries is not None else []
         self.timestamp = timestamp
+        self.version = version
+        # A pure tool returns the same result for the same arguments, so its results are reused
+        # indefinitely; cache_ttl reuses results of an idempotent tool for that many seconds.
+        # See utils.tool_cache_utils.
+        self.pure = pure
+        self.cache_ttl = cache_ttl
+        # The result also depends on the provider and model the tool calls, so cached results are kept per model
+        self.uses_llm = uses_llm
 
     def execute(self, *args, **kwargs):
         if self.function:
@@ -42,7 +60,11 @@ class ToolBaseModel:
     def __str__(self):
         return f"{self.name}: {self.description}"
 
-    def to_dict(self):
+    def get_content_hash(self):
+        """Digest of the tool's source, so an edited tool does not reuse its old results."""
+        return hashlib.sha256((self.content or "").encode("utf-8")).hexdigest()
+
+    def _build_dict(self):
         return {
             "name": self.name,
             "description": self.description,
@@ -55,7 +77,10 @@ class ToolBaseModel:
             "user_id": self.user_id,
             "secrets": self.secrets,
             "libraries": self.libraries,
-            "timestamp": self.timestamp
+            "timestamp": self.timestamp,
+            "pure": self.pure,
+            "cache_ttl": self.cache_ttl,
+            "uses_llm": self.uses_llm
         }
 
     @classmethod
@@ -72,7 +97,10 @@ class ToolBaseModel:
             user_id=data.get("user_id"),
             secrets=data.get("secrets"),
             libraries=data.get("libraries"),
-            timestamp=data.get("timestamp")
+            timestamp=data.get("timestamp"),
+            pure=data.get("pure", False),
+            cache_ttl=data.get("cache_ttl"),
+            uses_llm=data.get("uses_llm", False)
         )
     
     def get(self, key, default=None):
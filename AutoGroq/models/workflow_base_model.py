@@ -1,7 +1,10 @@
 from typing import List, Dict, Optional
 from models.agent_base_model import AgentBaseModel
+from models.slotted_model import SlottedModel
+
+class Sender(SlottedModel):
+    __slots__ = ("type", "config", "timestamp", "user_id", "tools")
 
-class Sender:
     def __init__(
         self,
         type: str,
@@ -16,7 +19,7 @@ class Sender:
         self.user_id = user_id
         self.tools = tools
 
-    def to_dict(self):
+    def _build_dict(self):
         return {
             "type": self.type,
             "config": self.config,
@@ -35,7 +38,9 @@ class Sender:
             tools=data["tools"],
         )
 
-class Receiver:
+class Receiver(SlottedModel):
+    __slots__ = ("type", "config", "groupchat_config", "timestamp", "user_id", "tools", "agents")
+
     def __init__(
         self,
         type: str,
@@ -54,7 +59,10 @@ class Receiver:
         self.tools = tools
         self.agents = agents
 
-    def to_dict(self):
+    def _get_children(self):
+        return [agent for agent in self.agents if isinstance(agent, SlottedModel)]
+
+    def _build_dict(self):
         return {
             "type": self.type,
             "config": self.config,
@@ -77,7 +85,10 @@ class Receiver:
             agents=[AgentBaseModel.from_dict(agent) for agent in data.get("agents", [])],
         )
 
-class WorkflowBaseModel:
+class WorkflowBaseModel(SlottedModel):
+    __slots__ = ("id", "name", "description", "agents", "sender", "receiver", "type", "user_id", "timestamp",
+                 "summary_method", "settings", "groupchat_config", "created_at", "updated_at")
+
     def __init__(
         self,
         name: str,
@@ -110,7 +121,10 @@ class WorkflowBaseModel:
         self.created_at = created_at
         self.updated_at = updated_at
 
-    def to_dict(self):
+    def _get_children(self):
+        return [item for item in list(self.agents) + [self.sender, self.receiver] if isinstance(item, SlottedModel)]
+
+    def _build_dict(self):
         return {
             "id": self.id,
             "name": self.name,
@@ -147,4 +161,4 @@ class WorkflowBaseModel:
             groupchat_config=data.get("groupchat_config", {}),
             created_at=data.get("created_at"),
             updated_at=data.get("updated_at"),
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,267 @@
+# orchestrator.py
+
+import copy
+import logging
+import threading
+import time
+import uuid
+
+from configs.config import AUTO_MODERATION_MAX_CYCLES, MAX_AUTO_MODERATION_RUNS
+from engine import AutoGroqEngine, EngineConfig, EngineState, format_moderated_input
+from utils.trace_utils import span
+
+logger = logging.getLogger(__name__)
+
+# Limits how many auto-moderation runs hit the providers at once, server-wide
+_run_slots = threading.BoundedSemaphore(MAX_AUTO_MODERATION_RUNS)
+
+STOP_CONDITIONS = ["phase", "deliverable", "project"]
+
+# Session fields a run reads, and the subset it writes back
+SNAPSHOT_FIELDS = [
+    "agents", "current_project", "discussion", "discussion_history", "discussion_turns", "last_agent", "last_comment",
+    "most_recent_response", "next_agent", "project_id", "project_owner", "project_model", "reference_html",
+    "reference_url", "rephrased_request", "tool_functions", "tool_models", "user_input", "user_request"
+]
+PUBLISHED_FIELDS = [
+    "agents", "current_project", "discussion_history", "discussion_turns", "last_agent", "last_comment",
+    "most_recent_response", "next_agent", "user_input"
+]
+# Fields of the session's own objects the run deep-copies rather than shares
+DEEP_COPIED_FIELDS = ("agents", "current_project")
+# Agent attributes a run changes: the auto-routed provider and model, and fetched web content
+RUN_AGENT_FIELDS = ("provider", "model", "reference_url", "web_content")
+
+
+def detach_state(session_state):
+    """Copy the fields a run needs out of a session so a worker thread can own them."""
+    values = {}
+    for field in SNAPSHOT_FIELDS:
+        value = session_state.get(field)
+        if field in DEEP_COPIED_FIELDS:
+            # The UI keeps reading and editing its own agents and project while the run changes these
+            value = copy.deepcopy(value)
+        elif isinstance(value, (dict, list)):
+            value = copy.copy(value)
+        if value is not None:
+            values[field] = value
+    return EngineState(**values)
+
+
+def merge_agents(session_agents, run_agents):
+    """
+    Copy what a run changed on its agents (RUN_AGENT_FIELDS) onto the
+    session's agents of the same name, leaving edits made in the UI during
+    the run alone. The routed provider and model are taken only for agents
+    that still have auto_route on; agents renamed or removed meanwhile are
+    skipped.
+    """
+    by_name = {agent.name: agent for agent in session_agents or [] if hasattr(agent, "name")}
+    for run_agent in run_agents or []:
+        agent = by_name.get(getattr(run_agent, "name", None))
+        if agent is None:
+            continue
+        for field in RUN_AGENT_FIELDS:
+            if field in ("provider", "model") and not getattr(agent, "auto_route", False):
+                continue
+            if not hasattr(agent, field) or not hasattr(run_agent, field):
+                continue
+            value = getattr(run_agent, field)
+            if getattr(agent, field) != value:
+                setattr(agent, field, value)
+
+
+class AutoModerationRun:
+    """
+    Drives moderator -> agent -> moderator cycles on a background thread
+    until the stop condition or a budget is reached.
+
+    The run owns a detached EngineState; after every cycle it publishes a
+    copy of the fields in PUBLISHED_FIELDS together with progress events,
+    which the UI merges back into the session (see merge_into).
+    """
+    def __init__(self, config: EngineConfig, state: EngineState, max_cycles=AUTO_MODERATION_MAX_CYCLES,
+                 max_seconds=None, stop_on="deliverable", speculative=False, provider_factory=None):
+        if stop_on not in STOP_CONDITIONS:
+            raise ValueError(f"stop_on must be one of {STOP_CONDITIONS}, got '{stop_on}'")
+        self.id = str(uuid.uuid4())
+        self.engine = AutoGroqEngine(config, state=state, provider_factory=provider_factory)
+        self.max_cycles = max_cycles
+        self.max_seconds = max_seconds
+        self.stop_on = stop_on
+        self.speculative = speculative
+        self.status = "pending"
+        self.cycles = 0
+        self.events = []
+        self.snapshot = None
+        self.version = 0
+        self._lock = threading.Lock()
+        self._stop_requested = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_session(cls, session_state, **kwargs):
+        return cls(EngineConfig.from_session(session_state), detach_state(session_state), **kwargs)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"auto-moderation-{self.id[:8]}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_requested.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def is_running(self):
+        return self.status in ("pending", "queued", "running")
+
+    def add_event(self, kind, text):
+        with self._lock:
+            self.events.append((time.time(), kind, text))
+
+    def get_events(self, since=0):
+        with self._lock:
+            return list(self.events[since:])
+
+    def merge_into(self, session_state, last_version=None):
+        """
+        Copy the latest published state into `session_state`. Returns the
+        snapshot version merged, or last_version if nothing newer exists.
+        """
+        with self._lock:
+            snapshot = self.snapshot
+            version = self.version
+        if snapshot is None or version == last_version:
+            return last_version
+        for field, value in snapshot.items():
+            if field == "agents":
+                merge_agents(session_state.get("agents"), value)
+            else:
+                session_state[field] = value
+        return version
+
+    def _publish(self):
+        state = self.engine.state
+        snapshot = {}
+        for field in PUBLISHED_FIELDS:
+            value = state.get(field)
+            if field in DEEP_COPIED_FIELDS:
+                value = copy.deepcopy(value)
+            elif isinstance(value, list):
+                # The run keeps appending to its own list
+                value = list(value)
+            snapshot[field] = value
+        with self._lock:
+            self.snapshot = snapshot
+            self.version += 1
+
+    def _drain_messages(self):
+        for level, message in self.engine.messages:
+            self.add_event(level, message)
+        self.engine.messages = []
+
+    def _stop_condition_met(self):
+        moderation = self.engine.last_moderation
+        if moderation is None:
+            return False
+        if self.stop_on == "phase":
+            return moderation.get("phase_completed", False) or moderation.get("deliverable_completed", False)
+        if self.stop_on == "deliverable":
+            return moderation.get("deliverable_completed", False) or \
+                self.engine.state.current_project.is_deliverable_complete(moderation["deliverable_index"])
+        return False
+
+    def _budget_exhausted(self, started_at):
+        if self.cycles >= self.max_cycles:
+            self.add_event("warning", f"Stopped after {self.cycles} cycles (cycle budget reached).")
+            return True
+        if self.max_seconds is not None and time.time() - started_at >= self.max_seconds:
+            self.add_event("warning", f"Stopped after {int(time.time() - started_at)}s (time budget reached).")
+            return True
+        return False
+
+    def _run(self):
+        self.status = "queued"
+        self.add_event("info", "Waiting for a free auto-moderation slot...")
+        acquired = False
+        while not acquired and not self._stop_requested.is_set():
+            acquired = _run_slots.acquire(timeout=0.5)
+        if not acquired:
+            self.status = "stopped"
+            return
+
+        try:
+            self.status = "running"
+            with span("auto_moderation.run", run_id=self.id, stop_on=self.stop_on, speculative=self.speculative) as run_span:
+                self._run_cycles()
+                run_span.set_attribute("cycles", self.cycles)
+        except Exception as e:
+            logger.error("Auto-moderation run failed: %s", str(e), exc_info=True)
+            self.add_event("error", f"Auto-moderation failed: {str(e)}")
+            self.status = "failed"
+        finally:
+            _run_slots.release()
+            self._publish()
+
+    def _run_cycles(self):
+        engine = self.engine
+        state = engine.state
+        started_at = time.time()
+        moderator_response = None
+
+        while True:
+            if self._stop_requested.is_set():
+                self.add_event("info", "Stopped by user.")
+                self.status = "stopped"
+                return
+            if self._budget_exhausted(started_at):
+                self.status = "completed"
+                return
+
+            if moderator_response is None:
+                self.add_event("info", "Moderator is choosing the next speaker...")
+                moderator_response = engine.trigger_moderator()
+                self._drain_messages()
+                if moderator_response is None:
+                    self.add_event("success", "Nothing left to moderate.")
+                    self.status = "completed"
+                    return
+                if self._stop_condition_met():
+                    self.add_event("success", f"Stop condition '{self.stop_on}' reached.")
+                    self.status = "completed"
+                    return
+
+            next_agent = state.get("next_agent")
+            agent_index = engine.find_agent_index(next_agent) if next_agent else None
+            if agent_index is None:
+                self.add_event("error", "The moderator did not address a valid agent.")
+                self.status = "failed"
+                return
+
+            state.user_input = format_moderated_input(next_agent, moderator_response)
+            self.add_event("info", f"{next_agent} is responding...")
+            if self.speculative:
+                reply, moderator_response = engine.run_speculative_turn(agent_index)
+            else:
+                reply = engine.process_agent_interaction(agent_index)
+                moderator_response = None
+            self._drain_messages()
+            self.cycles += 1
+            self._publish()
+
+            if not reply:
+                self.add_event("error", f"{next_agent} did not respond.")
+                self.status = "failed"
+                return
+            if self.speculative and moderator_response is None:
+                self.add_event("success", "Nothing left to moderate.")
+                self.status = "completed"
+                return
+            if self.speculative and self._stop_condition_met():
+                self.add_event("success", f"Stop condition '{self.stop_on}' reached.")
+                self.status = "completed"
+                return
@@ -70,6 +70,37 @@ def get_agents_prompt():
         }
     ]
     """
+
+
+def get_agents_json_schema():
+    # Used by providers with structured output; the array is wrapped in an
+    # object because JSON modes only guarantee a top-level object.
+    agent_fields = ["expert_name", "description", "role", "goal", "backstory"]
+    return {
+        "name": "team_of_experts",
+        "description": "Record the JSON description of each member of the team of experts.",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "agents": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {field: {"type": "string"} for field in agent_fields},
+                        "required": agent_fields
+                    }
+                }
+            },
+            "required": ["agents"]
+        }
+    }
+
+
+def get_structured_agents_prompt():
+    return get_agents_prompt() + """
+    Wrap the array in a JSON object under the key "agents": {"agents": [ ... ]}
+    """
+
         
 # Contributed by ScruffyNerf
 def get_generate_tool_prompt(rephrased_tool_request):
@@ -127,6 +158,21 @@ def get_generate_tool_prompt(rephrased_tool_request):
 
 
 def get_moderator_prompt(discussion_history, goal, last_comment, last_speaker, team_members_str, current_deliverable, current_phase):
+    # The instructions, goal and team come first and never change between calls, so providers can
+    # cache them; the discussion only grows, and the per-turn details come last.
+    return get_moderator_prompt_prefix(goal, team_members_str) + f"""
+        Here is the current conversational discussion history: {discussion_history}
+
+        The current deliverable they're working on is: {current_deliverable}
+        The current implementation phase is: {current_phase}
+        The last speaker was {last_speaker}, who said: {last_comment}
+
+        Remember, we are now in the {current_phase} phase. The agents should focus on actually implementing, coding, 
+        testing, or deploying the solutions as appropriate for the current phase, not just planning.
+    """
+
+
+def get_moderator_prompt_prefix(goal, team_members_str):
     return f"""
         This agent is our Moderator Bot. Its goal is to mediate the conversation between a team of AI agents 
         in a manner that persuades them to act in the most expeditious and thorough manner to accomplish their goal. 
@@ -136,17 +182,7 @@ def get_moderator_prompt(discussion_history, goal, last_comment, last_speaker, t
         Then draft a prompt directed at that agent that persuades them to act in the most expeditious and thorough manner toward helping this team of agents 
         accomplish their goal.
 
-        Their overall goal is: {goal}.
-        The current deliverable they're working on is: {current_deliverable}
-        The current implementation phase is: {current_phase}
-        The last speaker was {last_speaker}, who said: {last_comment}
-
-        Here is the current conversational discussion history: {discussion_history}
-
-        And here are the team members and their descriptions:
-        {team_members_str}
-
-        IMPORTANT: Your response must start with "To [Agent Name]:", where [Agent Name] is one of the valid team members listed above. Do not address tools or non-existent team members.
+        IMPORTANT: Your response must start with "To [Agent Name]:", where [Agent Name] is one of the valid team members listed below. Do not address tools or non-existent team members.
 
         This agent's response should be JUST the requested prompt addressed to the next agent, and should not contain 
         any introduction, narrative, or any other superfluous text whatsoever.
@@ -155,9 +191,11 @@ def get_moderator_prompt(discussion_history, goal, last_comment, last_speaker, t
         "PHASE_COMPLETED" at the beginning of your response, followed by your usual prompt to the next agent focusing on 
         the next phase or deliverable.
 
-        Remember, we are now in the {current_phase} phase. The agents should focus on actually implementing, coding, 
-        testing, or deploying the solutions as appropriate for the current phase, not just planning.
-    """
+        Their overall goal is: {goal}.
+
+        And here are the team members and their descriptions:
+        {team_members_str}
+"""
 
 
 def get_rephrased_user_prompt(user_request):
@@ -1,17 +1,16 @@
 # tools/code_generator.py
 
 import inspect
-import json
 import logging
+from configs.config import TOOL_RESULT_TTL
+from engine import get_current_engine
 from models.tool_base_model import ToolBaseModel
-from utils.api_utils import get_api_key, get_llm_provider
-import streamlit as st
 
 logger = logging.getLogger(__name__)
 
 def generate_code(request: str, language: str = "Python") -> str:
-    logger.debug(f"Generating code for request: {request}")
-    logger.debug(f"Language: {language}")
+    logger.debug("Generating code for request: %s", request)
+    logger.debug("Language: %s", language)
     
     if not request.strip():
         return "Error: No specific code generation request provided."
@@ -29,44 +28,30 @@ def generate_code(request: str, language: str = "Python") -> str:
     Here is the code:
     """
 
-    api_key = get_api_key()
-    llm_provider = get_llm_provider(api_key=api_key)
-    
-    llm_request_data = {
-        "model": st.session_state.get('model', 'default'),
-        "temperature": st.session_state.get('temperature', 0.7),
-        "max_tokens": st.session_state.get('max_tokens', 2000),
-        "top_p": 1,
-        "frequency_penalty": 0,
-        "presence_penalty": 0,
-        "messages": [
-            {
-                "role": "system",
-                "content": "You are an expert code generator."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-    }
+    engine = get_current_engine()
+    if engine is None:
+        # Called outside an engine run (e.g. directly from the UI)
+        from utils.ui_utils import get_session_engine
+        engine = get_session_engine()
+
+    messages = [
+        {
+            "role": "system",
+            "content": "You are an expert code generator."
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
 
     try:
-        response = llm_provider.send_request(llm_request_data)
-        logger.debug(f"LLM response status code: {response.status_code}")
-        logger.debug(f"LLM response content: {response.text[:500]}...")  # Log first 500 characters of response
-        
-        if response.status_code == 200:
-            response_data = llm_provider.process_response(response)
-            if "choices" in response_data and response_data["choices"]:
-                generated_code = response_data["choices"][0]["message"]["content"]
-                return generated_code.strip()
-            else:
-                return "Error: Unexpected response format from the language model."
-        else:
-            return f"Error: Received status code {response.status_code} from the language model API."
+        generated_code = engine.complete(messages, max_tokens=engine.config.max_tokens or 2000, stop=None, frequency_penalty=0, presence_penalty=0)
+        if generated_code:
+            return generated_code
+        return "Error: Unexpected response format from the language model."
     except Exception as e:
-        logger.error(f"Error generating code: {str(e)}", exc_info=True)
+        logger.error("Error generating code: %s", str(e), exc_info=True)
         return f"Error generating code: {str(e)}"
 
 code_generator_tool = ToolBaseModel(
@@ -76,6 +61,8 @@ code_generator_tool = ToolBaseModel(
     file_name="code_generator.py",
     content=inspect.getsource(generate_code),
     function=generate_code,
+    cache_ttl=TOOL_RESULT_TTL,
+    uses_llm=True,
 )
 
 def get_tool():
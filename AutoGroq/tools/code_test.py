@@ -44,6 +44,7 @@ code_test_tool = ToolBaseModel(
     file_name="code_test.py",
     content=inspect.getsource(test_code),
     function=test_code,
+    pure=True,
 )
 
 def get_tool():
@@ -1,13 +1,9 @@
 # tools/fetch_web_content.py
 
 import inspect
-import json
-import logging
-import requests
 
-from bs4 import BeautifulSoup
+from configs.config import REFERENCE_PAGE_TTL
 from models.tool_base_model import ToolBaseModel
-from urllib.parse import urlparse, urlunparse
 
 
 def fetch_web_content(url: str) -> dict:
@@ -20,9 +16,25 @@ def fetch_web_content(url: str) -> dict:
     Returns:
         dict: A dictionary containing the status, URL, and content (or error message).
     """
+    # Everything the function needs is imported here: its source is exported on its own as a skill
+    import logging
+    import requests
+    from bs4 import BeautifulSoup
+    from urllib.parse import urlparse, urlunparse
+
+    logger = logging.getLogger("tools.fetch_web_content")
+
+    # Reported as-is if cleaning fails
+    cleaned_url = url
+
     try:
-        cleaned_url = clean_url(url)
-        logging.info(f"Fetching content from cleaned URL: {cleaned_url}")
+        # Clean and validate the URL
+        cleaned_url = url.strip().strip("'\"")
+        if not cleaned_url.startswith(('http://', 'https://')):
+            cleaned_url = 'https://' + cleaned_url
+        cleaned_url = urlunparse(urlparse(cleaned_url))
+
+        logger.info("Fetching content from cleaned URL: %s", cleaned_url)
         
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -30,12 +42,13 @@ def fetch_web_content(url: str) -> dict:
         response = requests.get(cleaned_url, headers=headers, timeout=10)
         response.raise_for_status()
         
-        logging.info(f"Response status code: {response.status_code}")
-        logging.info(f"Response headers: {response.headers}")
+        logger.debug("Response status code: %s", response.status_code)
+        logger.debug("Response headers: %s", response.headers)
         
         soup = BeautifulSoup(response.text, "html.parser")
         
-        logging.info(f"Parsed HTML structure: {soup.prettify()[:500]}...")  # Log first 500 characters of prettified HTML
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Parsed HTML structure: %s", soup.prettify()[:500])
         
         # Try to get content from article tags first
         article_content = soup.find('article')
@@ -49,18 +62,17 @@ def fetch_web_content(url: str) -> dict:
             else:
                 raise ValueError("No content found in the webpage")
 
-        logging.info(f"Extracted text content (first 500 chars): {content[:500]}...")
+        logger.debug("Extracted text content: %s", content[:500])
         result = {
             "status": "success",
             "url": cleaned_url,
             "content": content  
         }
-        print(f"DEBUG: fetch_web_content result: {str(result)[:500]}...")  # Debug print
         return result
 
     except requests.RequestException as e:
         error_message = f"Error fetching content from {cleaned_url}: {str(e)}"
-        logging.error(error_message)
+        logger.error(error_message)
         return {
             "status": "error",
             "url": cleaned_url,
@@ -68,7 +80,7 @@ def fetch_web_content(url: str) -> dict:
         }
     except Exception as e:
         error_message = f"Unexpected error while fetching content from {cleaned_url}: {str(e)}"
-        logging.error(error_message)
+        logger.error(error_message)
         return {
             "status": "error",
             "url": cleaned_url,
@@ -83,25 +95,10 @@ fetch_web_content_tool = ToolBaseModel(
     file_name="fetch_web_content.py",
     content=inspect.getsource(fetch_web_content),
     function=fetch_web_content,
+    cache_ttl=REFERENCE_PAGE_TTL,
 )
 
 # Function to get the tool
 def get_tool():
     return fetch_web_content_tool
 
-
-def clean_url(url: str) -> str:
-    """
-    Clean and validate the URL.
-    
-    Args:
-        url (str): The URL to clean.
-    
-    Returns:
-        str: The cleaned URL.
-    """
-    url = url.strip().strip("'\"")
-    if not url.startswith(('http://', 'https://')):
-        url = 'https://' + url
-    parsed = urlparse(url)
-    return urlunparse(parsed)
@@ -8,11 +8,15 @@ from configs.config import LLM_PROVIDER
 from utils.text_utils import normalize_config
 
 
-def create_agent_data(agent):
+def create_agent_data(agent, provider=None, model=None):
     expert_name = agent['name']
     description = agent.get('description', '')
     current_timestamp = datetime.datetime.now().isoformat()
-    provider = agent.get('config', {}).get('provider', st.session_state.get('provider', LLM_PROVIDER))
+    if provider is None:
+        provider = st.session_state.get('provider', LLM_PROVIDER)
+    if model is None:
+        model = st.session_state.get('model', 'default')
+    provider = agent.get('config', {}).get('provider', provider)
 
     # Use normalize_config to get the standardized config
     normalized_config = normalize_config(agent, expert_name)
@@ -26,7 +30,7 @@ def create_agent_data(agent):
         "goal": agent.get('goal', f"Assist with tasks related to {description}"),
         "backstory": agent.get('backstory', f"As an AI assistant, I specialize in {description}"),
         "provider": provider,
-        "model": st.session_state.get('model', 'default')
+        "model": model
     }
 
     crewai_agent_data = {
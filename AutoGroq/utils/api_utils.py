@@ -1,12 +1,23 @@
 # utils/api_utils.py
 
+import hashlib
 import importlib
+import json
+import logging
 import os
 import requests
 import streamlit as st
+import threading
 import time
 
-from configs.config import FALLBACK_MODEL_TOKEN_LIMITS, LLM_PROVIDER, RETRY_DELAY, RETRY_TOKEN_LIMIT
+from collections import OrderedDict
+from configs.config import (FALLBACK_MODEL_TOKEN_LIMITS, LLM_PROVIDER, MODEL_LIST_TTL, PROVIDER_CACHE_SIZE, RETRY_DELAY,
+                            RETRY_TOKEN_LIMIT)
+from utils.metrics_utils import metrics_registry
+from utils.log_utils import truncate
+from utils.resource_utils import shared_resources
+
+logger = logging.getLogger(__name__)
 
 
 def display_api_key_input(provider=None):
@@ -19,6 +30,10 @@ def display_api_key_input(provider=None):
         st.session_state.warning_placeholder.warning(f"{provider.upper()} API Key not found. Please enter your API key, or select a different provider.")
     api_key = st.text_input(f"Enter your {provider.upper()} API Key:", type="password", key=f"api_key_input_{provider}")
     if api_key:
+        old_api_key = st.session_state.get(api_key_env_var)
+        if old_api_key and api_key != old_api_key:
+            # Drop this session's client built with the previous key; other sessions keep theirs
+            provider_cache.evict(provider, st.session_state.get(f'{provider.upper()}_API_URL'), old_api_key)
         st.session_state[api_key_env_var] = api_key
         os.environ[api_key_env_var] = api_key
         # st.success(f"{provider.upper()} API Key entered successfully.")
@@ -32,7 +47,9 @@ def fetch_available_models(provider=None):
     api_key = get_api_key(provider)
     llm_provider = get_llm_provider(api_key=api_key, provider=provider)
     try:
-        models = llm_provider.get_available_models()
+        # Shared by every session using the same credentials; the session only holds a reference
+        key = ProviderCache.make_key(provider, getattr(llm_provider, "api_url", None), api_key)
+        models = shared_resources.get("model_list", llm_provider.get_available_models, *key, ttl=MODEL_LIST_TTL)
         st.session_state.available_models = models
         return models
     except Exception as e:
@@ -50,18 +67,187 @@ def get_api_key(provider=None):
     return api_key
 
 
+class ProviderCache:
+    """
+    Thread-safe LRU of provider instances keyed by (provider, api_url, api key
+    hash), so each client and its connection pool is built once and shared by
+    every session, worker thread and retry that uses the same credentials.
+    """
+    def __init__(self, max_size=PROVIDER_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._providers = OrderedDict()
+        # Concurrent first calls for a key share one build, made outside self._lock
+        self._builds = SingleFlight("llm_provider_build")
+
+    @staticmethod
+    def make_key(provider, api_url=None, api_key=None):
+        key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16] if api_key else None
+        return provider, api_url, key_hash
+
+    def get(self, provider, api_url=None, api_key=None):
+        key = self.make_key(provider, api_url, api_key)
+        with self._lock:
+            instance = self._providers.get(key)
+            hit = instance is not None
+            if hit:
+                self._providers.move_to_end(key)
+        if not hit:
+            instance = self._builds.do(key, self._build, key, provider, api_url, api_key)
+        metrics_registry.record_cache("llm_provider", hit)
+        return instance
+
+    def _build(self, key, provider, api_url, api_key):
+        with self._lock:
+            # A build for this key may have finished since the lookup in get()
+            instance = self._providers.get(key)
+        if instance is not None:
+            return instance
+        instance = build_llm_provider(provider, api_url=api_url, api_key=api_key)
+        with self._lock:
+            self._providers[key] = instance
+            while len(self._providers) > self.max_size:
+                self._providers.popitem(last=False)
+        return instance
+
+    def evict(self, provider=None, api_url=None, api_key=None):
+        """
+        Drop cached instances: all of them, every instance of `provider`, or
+        one exact entry when `api_key` is given. Requests already holding an
+        evicted instance finish normally; the next lookup builds a fresh one.
+        """
+        with self._lock:
+            if provider is None:
+                evicted = len(self._providers)
+                self._providers.clear()
+            elif api_key is not None:
+                evicted = int(self._providers.pop(self.make_key(provider, api_url, api_key), None) is not None)
+            else:
+                stale = [key for key in self._providers if key[0] == provider]
+                for key in stale:
+                    del self._providers[key]
+                evicted = len(stale)
+        if evicted:
+            logger.debug("Evicted %s cached %s provider(s)", evicted, provider or "LLM")
+        return evicted
+
+    def __len__(self):
+        with self._lock:
+            return len(self._providers)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into one: the first caller
+    runs the function, callers that arrive while it is running wait for it
+    and get the same result (or exception). Nothing is kept afterwards, so a
+    call made once the first has finished goes upstream again.
+    """
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    @staticmethod
+    def make_key(*parts):
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+        if not leader:
+            metrics_registry.record_coalesced(self.name)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = func(*args, **kwargs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+            if flight.waiters:
+                logger.debug("%s: %s waiting caller(s) shared one upstream call", self.name, flight.waiters)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._flights)
+
+
+# Identical LLM requests in flight at the same time, from any session
+llm_request_flights = SingleFlight("llm_request")
+
+
+def build_llm_provider(provider, api_url=None, api_key=None):
+    """Construct a new, uncached provider instance."""
+    provider_module = importlib.import_module(f"llm_providers.{provider}_provider")
+    provider_class = getattr(provider_module, f"{provider.capitalize()}Provider")
+    return provider_class(api_url=api_url, api_key=api_key)
+
+
+provider_cache = ProviderCache()
+
+
+def create_llm_provider(provider, api_url=None, api_key=None):
+    # Session-independent and cached; safe to call from worker threads
+    return provider_cache.get(provider, api_url=api_url, api_key=api_key)
+
+
+def extract_content(response):
+    if hasattr(response, 'content') and isinstance(response.content, list):
+        # Anthropic-specific handling
+        return response.content[0].text
+    elif isinstance(response, requests.models.Response):
+        # Groq and potentially other providers using requests.Response
+        try:
+            json_response = response.json()
+            if 'choices' in json_response and json_response['choices']:
+                return json_response['choices'][0]['message']['content']
+        except json.JSONDecodeError:
+            logger.error("Failed to decode JSON from response")
+            return ""
+    elif isinstance(response, dict):
+        if 'choices' in response and response['choices']:
+            return response['choices'][0]['message']['content']
+        elif 'content' in response:
+            return response['content']
+    elif isinstance(response, str):
+        return response
+    logger.warning("Unexpected response format: %s", type(response))
+    return ""
+
+
 def get_llm_provider(api_key=None, api_url=None, provider=None):
     if provider is None:
         provider = st.session_state.get('provider', LLM_PROVIDER)
-    provider_module = importlib.import_module(f"llm_providers.{provider}_provider")
-    provider_class = getattr(provider_module, f"{provider.capitalize()}Provider")
     if api_url is None:
         api_url = st.session_state.get(f'{provider.upper()}_API_URL')
-    return provider_class(api_url=api_url, api_key=api_key)
+    return create_llm_provider(provider, api_url=api_url, api_key=api_key)
 
 
 def make_api_request(url, data, headers, api_key):
-    time.sleep(RETRY_DELAY)  # Throttle the request to ensure at least 2 seconds between calls
+    # Throttle the request to ensure at least 2 seconds between calls; reported like the engine's waits
+    metrics_registry.record_wait("throttle", RETRY_DELAY)
+    time.sleep(RETRY_DELAY)
     try:
         if not api_key:
             llm = LLM_PROVIDER.upper()
@@ -76,10 +262,10 @@ def make_api_request(url, data, headers, api_key):
             st.error(f"Error details: {error_message}")
             return None
         else:
-            print(f"Error: API request failed with status {response.status_code}, response: {response.text}")
+            logger.error("API request failed with status %s, response: %s", response.status_code, response.text)
             return None
     except requests.RequestException as e:
-        print(f"Error: Request failed {e}")
+        logger.error("Request failed %s", e)
         return None
     
 
@@ -91,14 +277,13 @@ def send_request_with_retry(url, data, headers, api_key):
             # Update the token limit in the request data
             data["max_tokens"] = RETRY_TOKEN_LIMIT
             # Retry the request with the decreased token limit
-            print(f"Retrying the request with decreased token limit.")
-            print(f"URL: {url}")
-            print(f"Retry token limit: {RETRY_TOKEN_LIMIT}")
+            logger.warning("Retrying %s with decreased token limit %s", url, RETRY_TOKEN_LIMIT)
+            metrics_registry.record_retry("rate_limit")
             response = make_api_request(url, data, headers, api_key)
             if response is not None:
-                print(f"Retry successful. Response: {response}")
+                logger.debug("Retry successful. Response: %s", truncate(response))
             else:
-                print("Retry failed.")
+                logger.error("Retry failed.")
     return response    
 
 
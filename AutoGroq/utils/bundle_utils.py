@@ -0,0 +1,239 @@
+# utils/bundle_utils.py
+
+import datetime
+import gzip
+import io
+import json
+import logging
+import uuid
+
+from models.agent_base_model import AgentBaseModel
+from models.project_base_model import ProjectBaseModel
+from models.slotted_model import dumps
+from models.tool_base_model import ToolBaseModel
+from utils.persistence_utils import apply_project, record_event, replay_events, snapshot_project
+from utils.workflow_utils import get_workflow_from_agents
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = "autogroq-bundle"
+BUNDLE_VERSION = 1
+BUNDLE_KINDS = ("project", "agent", "tool", "workflow")
+
+# A bundle is JSON Lines, optionally gzipped (".gz"):
+#   {"format": "autogroq-bundle", "version": 1, "created_at": ...}     manifest, always first
+#   {"kind": "project", "project": <key>, "data": {...}}               one record per line
+#   {"kind": "end", "counts": {"project": 1, "agent": 5, ...}}         always last
+# Records sharing a "project" key belong to the same project; agents, tools and
+# workflows with no key are loose. A missing end line means the bundle was cut short.
+
+
+def open_bundle(path, mode="r"):
+    """Open a bundle file for reading ("r") or writing ("w") as text, gzipped if `path` ends in .gz."""
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class BundleWriter:
+    """
+    Streams records to an open text file. Models are written from their
+    cached JSON, so exporting unchanged agents does not serialize them again.
+    Use as a context manager, or call close() to write the end line.
+    """
+    def __init__(self, fp):
+        self.fp = fp
+        self.counts = {kind: 0 for kind in BUNDLE_KINDS}
+        self.fp.write(dumps({"format": BUNDLE_FORMAT, "version": BUNDLE_VERSION,
+                             "created_at": datetime.datetime.now().isoformat()}) + "\n")
+
+    def write(self, kind, data, project=None):
+        if kind not in BUNDLE_KINDS:
+            raise ValueError(f"Unknown bundle record kind: {kind}")
+        data_json = data.to_json() if hasattr(data, "to_json") else dumps(data)
+        self.fp.write(f'{{"kind":{dumps(kind)},"project":{dumps(project)},"data":{data_json}}}\n')
+        self.counts[kind] += 1
+
+    def close(self):
+        self.fp.write(dumps({"kind": "end", "counts": self.counts}) + "\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+def iter_bundle(fp):
+    """
+    Yield (kind, project, data) for each record of an open bundle, one line
+    at a time. Raises ValueError for a file that is not a bundle, a newer
+    bundle version, or a bundle with no end line. Unknown record kinds from
+    newer versions are skipped.
+    """
+    manifest_line = fp.readline()
+    try:
+        manifest = json.loads(manifest_line)
+    except ValueError:
+        raise ValueError("Not an AutoGroq bundle: the first line is not JSON")
+    if not isinstance(manifest, dict) or manifest.get("format") != BUNDLE_FORMAT:
+        raise ValueError("Not an AutoGroq bundle: missing manifest")
+    if manifest.get("version", 0) > BUNDLE_VERSION:
+        raise ValueError(f"Bundle version {manifest.get('version')} is newer than supported version {BUNDLE_VERSION}")
+
+    for line_number, line in enumerate(fp, start=2):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        kind = record.get("kind")
+        if kind == "end":
+            return
+        if kind not in BUNDLE_KINDS:
+            logger.warning("Skipping unknown bundle record %r on line %s", kind, line_number)
+            continue
+        yield kind, record.get("project"), record.get("data")
+    raise ValueError("Bundle is incomplete: no end line")
+
+
+def iter_bundle_projects(fp):
+    """
+    Group a bundle's records by project, for bundles written project by
+    project. Yields (project_key, values, tools, workflows): `values` holds
+    the project's snapshot fields with its agents as dicts; `tools` and
+    `workflows` are lists of dicts. Loose records come with project_key None.
+    """
+    current_key, values, tools, workflows = None, None, [], []
+    for kind, project, data in iter_bundle(fp):
+        if values is not None and project != current_key:
+            yield current_key, values, tools, workflows
+            values, tools, workflows = None, [], []
+        if values is None:
+            current_key, values = project, {"agents": []}
+        if kind == "project":
+            values.update(data)
+        elif kind == "agent":
+            values["agents"].append(data)
+        elif kind == "tool":
+            tools.append(data)
+        else:
+            workflows.append(data)
+    if values is not None:
+        yield current_key, values, tools, workflows
+
+
+def write_project(writer, project_key, values, tools=(), workflows=()):
+    """Write one project: its snapshot fields, then its agents, tools and workflows."""
+    project = {key: value for key, value in values.items() if key != "agents"}
+    writer.write("project", project, project=project_key)
+    for agent in values.get("agents") or []:
+        writer.write("agent", agent, project=project_key)
+    for tool in tools:
+        writer.write("tool", tool, project=project_key)
+    for workflow in workflows:
+        writer.write("workflow", workflow, project=project_key)
+
+
+def write_session_bundle(state, fp):
+    """Write the session's project, agents, tools and generated workflow to an open text file."""
+    agents = state.get("agents") or []
+    workflows = []
+    if agents:
+        workflow_data, _ = get_workflow_from_agents(agents, model=state.get("model"), temperature=state.get("temperature"),
+                                                    provider=state.get("provider"))
+        workflows.append(workflow_data)
+    values = snapshot_project(state)
+    # Every agent, built-in ones included, so the team arrives complete
+    values["agents"] = agents
+    with BundleWriter(fp) as writer:
+        write_project(writer, state.get("project_id") or "session", values, state.get("tool_models") or [], workflows)
+    return writer.counts
+
+
+def export_session_bundle(state):
+    """The session as gzipped bundle bytes, for a download button."""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as gz, io.TextIOWrapper(gz, encoding="utf-8") as fp:
+        write_session_bundle(state, fp)
+    return buffer.getvalue()
+
+
+def write_store_bundle(fp, store, project_ids=None):
+    """
+    Write saved projects (all of them, or `project_ids`) from `store`, one
+    project at a time. Returns the record counts.
+    """
+    if project_ids is None:
+        project_ids = store.list_project_ids()
+    with BundleWriter(fp) as writer:
+        for project_id in project_ids:
+            events = store.load_events(project_id)
+            if not events:
+                logger.warning("Project %s has no saved events; skipping", project_id)
+                continue
+            write_project(writer, project_id, replay_events(events))
+    return writer.counts
+
+
+def import_bundle_to_store(fp, store, owner=None):
+    """
+    Save each project of a bundle to `store` as one snapshot
+    event. A project keeps its id unless that id is already taken. Tools and
+    workflows are not stored: the store keeps projects and their agents, and
+    workflows are regenerated from the agents. The projects belong to `owner`.
+    Returns the new project ids.
+    """
+    project_ids = []
+    for project_key, values, tools, workflows in iter_bundle_projects(fp):
+        if project_key is None and not values["agents"]:
+            continue
+        project_id = project_key if project_key and not store.load_events(project_key) else uuid.uuid4().hex
+        name = (values.get("user_request") or (values.get("project_model") or {}).get("name") or "imported project")[:80]
+        store.append(project_id, "snapshot", values, name=name, owner=owner)
+        project_ids.append(project_id)
+        if tools or workflows:
+            logger.info("Project %s: %s tool(s) and %s workflow(s) not stored", project_id, len(tools), len(workflows))
+    return project_ids
+
+
+def import_bundle(state, fp, store=None):
+    """
+    Load a bundle into the session. The first project replaces the session's
+    project and becomes a new project, saved to `store` if one is given; agents of later projects and
+    loose agents are added, replacing agents with the same name. Tools are
+    added by name without their functions, since running imported code is
+    left to the tools folder. Returns the number of records imported per kind.
+    """
+    counts = {kind: 0 for kind in BUNDLE_KINDS}
+    loaded_project = False
+    tool_models = state.get("tool_models")
+    if tool_models is None:
+        tool_models = state["tool_models"] = []
+    for project_key, values, tools, workflows in iter_bundle_projects(fp):
+        if not loaded_project and any(key != "agents" for key in values):
+            apply_project(state, values, uuid.uuid4().hex)
+            loaded_project = True
+            counts["project"] += 1
+        else:
+            agents = state.get("agents") or []
+            for data in values["agents"]:
+                agent = AgentBaseModel.from_dict(data)
+                agents = [existing for existing in agents if existing.name != agent.name] + [agent]
+            state["agents"] = agents
+        counts["agent"] += len(values["agents"])
+
+        known_tools = {tool.name for tool in tool_models}
+        for data in tools:
+            if data.get("name") not in known_tools:
+                tool_models.append(ToolBaseModel.from_dict(data))
+                known_tools.add(data.get("name"))
+                counts["tool"] += 1
+        if workflows:
+            project_model = state.get("project_model") or ProjectBaseModel()
+            project_model.workflows = project_model.workflows + workflows
+            state["project_model"] = project_model
+            counts["workflow"] += len(workflows)
+
+    if loaded_project:
+        record_event(store, state, "snapshot", snapshot_project(state), name=(state.get("user_request") or "imported project")[:80])
+    return counts
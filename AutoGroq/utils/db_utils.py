@@ -2,6 +2,7 @@
 
 import datetime
 import json
+import logging
 import sqlite3
 import streamlit as st
 import traceback
@@ -9,34 +10,39 @@ import uuid
 
 from configs.config import FRAMEWORK_DB_PATH
 
+from utils.log_utils import lazy
 from utils.text_utils import normalize_config
+from utils.trace_utils import traced
 from utils.workflow_utils import get_workflow_from_agents
 
+logger = logging.getLogger(__name__)
+
 
 def export_to_autogen():
     db_path = FRAMEWORK_DB_PATH
-    print(f"Database path: {db_path}")
+    logger.debug("Database path: %s", db_path)
     if db_path:
         export_data(db_path)
     else:
         st.warning("Please provide a valid database path in config.py.")
 
 
+@traced("export_data")
 def export_data(db_path):
-    print(f"Exporting data to: {db_path}")
+    logger.debug("Exporting data to: %s", db_path)
 
     if db_path:
         try:
             conn = sqlite3.connect(db_path)
             cursor = conn.cursor()
-            print("Connected to the database successfully.")
+            logger.debug("Connected to the database successfully.")
 
             agents = st.session_state.agents
-            print(f"Number of agents: {len(agents)}")
+            logger.debug("Number of agents: %s", len(agents))
 
             for index, agent in enumerate(agents):
                 try:
-                    print(f"Processing agent {index + 1}: {agent.name}")
+                    logger.debug("Processing agent %s: %s", index + 1, agent.name)
                     
                     current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                     
@@ -54,18 +60,18 @@ def export_data(db_path):
                         normalized_config['system_message']  # task_instruction
                     )
                     
-                    print(f"Inserting agent data: {agent_data}")
+                    logger.debug("Inserting agent data: %s", agent_data)
                     
                     cursor.execute("""
                         INSERT INTO agent (id, created_at, updated_at, user_id, version, type, config, task_instruction) 
                         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                     """, agent_data)
                     
-                    print(f"Inserted agent: {agent.name}")
+                    logger.debug("Inserted agent: %s", agent.name)
 
                 except Exception as e:
-                    print(f"Error processing agent {index + 1}: {str(e)}")
-                    print(f"Agent data: {agent.__dict__}")
+                    logger.error("Error processing agent %s: %s", index + 1, str(e))
+                    logger.debug("Agent data: %s", agent.to_dict())
                     traceback.print_exc()
 
             # Handle skills/tools
@@ -88,9 +94,9 @@ def export_data(db_path):
                         INSERT INTO skill (id, created_at, updated_at, user_id, version, name, content, description, secrets, libraries)
                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """, skill_data)
-                    print(f"Inserted skill: {tool.name}")
+                    logger.debug("Inserted skill: %s", tool.name)
                 except Exception as e:
-                    print(f"Error inserting skill {tool.name}: {str(e)}")
+                    logger.error("Error inserting skill %s: %s", tool.name, str(e))
                     traceback.print_exc()
 
             # Handle the workflow
@@ -113,21 +119,21 @@ def export_data(db_path):
                     INSERT INTO workflow (id, created_at, updated_at, user_id, version, name, description, type, summary_method, sample_tasks)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, workflow_insert_data)
-                print("Inserted workflow data.")
+                logger.debug("Inserted workflow data.")
             except Exception as e:
-                print(f"Error inserting workflow: {str(e)}")
+                logger.error("Error inserting workflow: %s", str(e))
                 traceback.print_exc()
 
             conn.commit()
-            print("Changes committed to the database.")
+            logger.debug("Changes committed to the database.")
 
             conn.close()
-            print("Database connection closed.")
+            logger.debug("Database connection closed.")
 
             st.success("Data exported to Autogen successfully!")
         except sqlite3.Error as e:
             st.error(f"Error exporting data to Autogen: {str(e)}")
-            print(f"Error exporting data to Autogen: {str(e)}")
+            logger.error("Error exporting data to Autogen: %s", str(e))
             traceback.print_exc()
 
 
@@ -147,7 +153,7 @@ def insert_or_get_skill(cursor, tool):
     if result:
         return result[0]
     else:
-        print(f"Inserting new skill: {tool}")
+        logger.debug("Inserting new skill: %s", tool)
         
         skill_data = (
             None,  # id is INTEGER PRIMARY KEY, let SQLite auto-increment
@@ -162,7 +168,7 @@ def insert_or_get_skill(cursor, tool):
             json.dumps(tool.libraries if hasattr(tool, 'libraries') else tool.get('libraries', []))
         )
         
-        print(f"Skill data to be inserted: {skill_data}")
+        logger.debug("Skill data to be inserted: %s", skill_data)
         
         try:
             cursor.execute("""
@@ -171,10 +177,8 @@ def insert_or_get_skill(cursor, tool):
             """, skill_data)
             return cursor.lastrowid
         except sqlite3.Error as e:
-            print(f"SQLite error: {e}")
-            print("Data types:")
-            for i, item in enumerate(skill_data):
-                print(f"  {i}: {type(item)}")
+            logger.error("SQLite error: %s", e)
+            logger.debug("Data types: %s", lazy(lambda: [type(item).__name__ for item in skill_data]))
             raise
     
 
@@ -217,7 +221,7 @@ def insert_workflow(cursor, workflow_data):
         workflow_data.get('summary_method', 'last')[:4],  # VARCHAR(4)
         json.dumps(workflow_data.get('sample_tasks', []))
     )
-    print(f"Inserting workflow data: {workflow_insert_data}")
+    logger.debug("Inserting workflow data: %s", workflow_insert_data)
     try:
         cursor.execute("""
             INSERT INTO workflow (id, created_at, updated_at, user_id, version, name, description, type, summary_method, sample_tasks) 
@@ -225,10 +229,8 @@ def insert_workflow(cursor, workflow_data):
         """, workflow_insert_data)
         return cursor.lastrowid
     except sqlite3.Error as e:
-        print(f"SQLite error: {e}")
-        print("Data types:")
-        for i, item in enumerate(workflow_insert_data):
-            print(f"  {i}: {type(item)}")
+        logger.error("SQLite error: %s", e)
+        logger.debug("Data types: %s", lazy(lambda: [type(item).__name__ for item in workflow_insert_data]))
         raise
 
 
@@ -236,22 +238,22 @@ def sql_to_db(sql: str, params: tuple = None):
     try:
         conn = sqlite3.connect(FRAMEWORK_DB_PATH)
         cursor = conn.cursor()
-        print("Connected to the database successfully.")
+        logger.debug("Connected to the database successfully.")
         if params:
             cursor.execute(sql, params)
         else:
             cursor.execute(sql)
         conn.commit()
-        print("SQL executed successfully.")
+        logger.debug("SQL executed successfully.")
     except sqlite3.Error as e:
-        print(f"Error executing SQL: {str(e)}")
-        print(f"SQL: {sql}")
-        print(f"Params: {params}")
+        logger.error("Error executing SQL: %s", str(e))
+        logger.debug("SQL: %s", sql)
+        logger.debug("Params: %s", params)
         raise
     finally:
         if conn:
             conn.close()
-            print("Database connection closed.")
+            logger.debug("Database connection closed.")
             
 
 #FUTURE functions for exporting to new Autogen Studio schema:
@@ -1,10 +1,14 @@
 import logging
 
+from utils.log_utils import configure_logging
+
+logger = logging.getLogger(__name__)
+
 def setup_logging():
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    configure_logging()
 
 def log_error(error_message):
-    logging.error(error_message)
+    logger.error(error_message)
 
 def log_tool_execution(tool_name, args, result):
-    logging.info(f"Executed tool: {tool_name} with args: {args}. Result: {result}")
\ No newline at end of file
+    logger.info("Executed tool: %s with args: %s. Result: %s", tool_name, args, result)
\ No newline at end of file
@@ -1,14 +1,18 @@
 
 import datetime 
 import io
-import json
+import logging
 import streamlit as st
 import zipfile
 
+from models.slotted_model import dumps
 from utils.db_utils import normalize_config
 from utils.text_utils import sanitize_text
+from utils.trace_utils import traced
 from utils.workflow_utils import get_workflow_from_agents
 
+logger = logging.getLogger(__name__)
+
    
 
 def create_workflow_data(workflow):
@@ -38,6 +42,7 @@ def regenerate_json_files_and_zip():
     st.session_state.crewai_zip_buffer = crewai_zip_buffer
 
 
+@traced("regenerate_zip_files")
 def regenerate_zip_files():
     if "agents" in st.session_state:
         workflow_data, _ = get_workflow_from_agents(st.session_state.agents)
@@ -46,34 +51,36 @@ def regenerate_zip_files():
         autogen_zip_buffer, crewai_zip_buffer = zip_files_in_memory(workflow_data)
         st.session_state.autogen_zip_buffer = autogen_zip_buffer
         st.session_state.crewai_zip_buffer = crewai_zip_buffer
-        print("Zip files regenerated.")
+        logger.debug("Zip files regenerated.")
     else:
-        print("No agents found. Skipping zip file regeneration.")
+        logger.debug("No agents found. Skipping zip file regeneration.")
+
 
+@traced("zip_files_in_memory")
+def zip_files_in_memory(workflow_data, agents=None, tool_models=None):
+    if agents is None:
+        agents = st.session_state.agents
+    if tool_models is None:
+        tool_models = st.session_state.tool_models
 
-def zip_files_in_memory(workflow_data):
     autogen_zip_buffer = io.BytesIO()
     crewai_zip_buffer = io.BytesIO()
 
     with zipfile.ZipFile(autogen_zip_buffer, 'w', zipfile.ZIP_DEFLATED) as autogen_zip:
-        for agent in st.session_state.agents:
-            agent_data = agent.to_dict()
-            agent_name = agent_data['name']
-            agent_file_name = f"{agent_name}.json"
-            autogen_zip.writestr(f"agents/{agent_file_name}", json.dumps(agent_data, indent=2))
+        for agent in agents:
+            agent_file_name = f"{agent.name}.json"
+            autogen_zip.writestr(f"agents/{agent_file_name}", agent.to_json(indent=True))
 
         # Add tools to the zip file
-        for tool in st.session_state.tool_models:
-            tool_data = tool.to_dict()
-            tool_name = tool_data['name']
-            tool_file_name = f"{tool_name}.json"
-            autogen_zip.writestr(f"tools/{tool_file_name}", json.dumps(tool_data, indent=2))
+        for tool in tool_models:
+            tool_file_name = f"{tool.name}.json"
+            autogen_zip.writestr(f"tools/{tool_file_name}", tool.to_json(indent=True))
 
         # Add workflow data
-        autogen_zip.writestr("workflow.json", json.dumps(workflow_data, indent=2))
+        autogen_zip.writestr("workflow.json", dumps(workflow_data, indent=True))
 
     with zipfile.ZipFile(crewai_zip_buffer, 'w', zipfile.ZIP_DEFLATED) as crewai_zip:
-        for agent in st.session_state.agents:
+        for agent in agents:
             agent_data = normalize_config(agent.to_dict(), agent.name)
             agent_name = agent_data['name']
             crewai_agent_data = {
@@ -82,7 +89,7 @@ def zip_files_in_memory(workflow_data):
                 "verbose": True,
                 "allow_delegation": True
             }
-            crewai_zip.writestr(f"agents/{agent_name}.json", json.dumps(crewai_agent_data, indent=2))
+            crewai_zip.writestr(f"agents/{agent_name}.json", dumps(crewai_agent_data, indent=True))
 
     autogen_zip_buffer.seek(0)
     crewai_zip_buffer.seek(0)
@@ -0,0 +1,142 @@
+# utils/log_utils.py
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+
+from configs.config import LOG_FORMAT, LOG_LEVEL, LOG_MODULE_LEVELS, LOG_SAMPLE_RATES
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_configure_lock = threading.Lock()
+_listener = None
+
+
+class lazy:
+    """
+    Defers an expensive log argument until a handler actually formats it:
+
+        logger.debug("Parsed HTML: %s", lazy(lambda: soup.prettify()[:500]))
+    """
+    __slots__ = ("func",)
+
+    def __init__(self, func):
+        self.func = func
+
+    def __str__(self):
+        return str(self.func())
+
+    __repr__ = __str__
+
+
+def truncate(value, limit=500):
+    """Lazy, truncated str() of `value` for log arguments."""
+    return lazy(lambda: _truncate(str(value), limit))
+
+
+def _truncate(text, limit):
+    return text if len(text) <= limit else f"{text[:limit]}... ({len(text)} chars)"
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Passes a fraction of records below WARNING, per logger: `rates` maps a
+    logger name to its rate, and a record from "utils.api_utils" uses the
+    rate of the longest matching prefix ("utils.api_utils", then "utils").
+    Warnings, errors and records with no matching name always pass.
+    """
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+
+    def get_rate(self, logger_name):
+        name = logger_name
+        while name:
+            rate = self.rates.get(name)
+            if rate is not None:
+                return rate
+            name = name.rpartition(".")[0]
+        return 1
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.get_rate(record.name)
+        return rate >= 1 or random.random() < rate
+
+
+class TraceContextFilter(logging.Filter):
+    """Stamps records with the active trace/span ids so logs line up with the Debug tab's traces."""
+    def filter(self, record):
+        from utils.trace_utils import get_current_span
+        current = get_current_span()
+        record.trace_id = current.trace_id if current else None
+        record.span_id = current.span_id if current else None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, trace ids and any `extra` fields."""
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level=LOG_LEVEL, log_format=LOG_FORMAT, module_levels=LOG_MODULE_LEVELS, sample_rates=LOG_SAMPLE_RATES):
+    """
+    Route all logging through a queue so callers never block on I/O. The
+    calling thread still merges each record's message and arguments
+    (QueueHandler.prepare), so lazy arguments are evaluated there; a
+    background listener thread applies the configured formatter and does the
+    writing. Sampling is applied at the queue handler to every logger under
+    a configured name. Safe to call on every Streamlit rerun: only the first
+    call configures anything.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        if log_format == "json":
+            stream_handler.setFormatter(JsonFormatter())
+        else:
+            stream_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        if sample_rates:
+            # Handler filters see records from child loggers too, unlike logger filters; dropped
+            # records are never formatted or stamped
+            queue_handler.addFilter(SamplingFilter(sample_rates))
+        queue_handler.addFilter(TraceContextFilter())
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+
+        for name, module_level in module_levels.items():
+            logging.getLogger(name).setLevel(module_level)
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
@@ -0,0 +1,210 @@
+# utils/memory_utils.py
+
+import io
+import logging
+import os
+import sys
+import tempfile
+import types
+import weakref
+
+from collections import deque
+from configs.config import (SESSION_MEMORY_BUDGET_MB, SESSION_REFERENCE_MAX_BYTES, SESSION_SPILL_DIR,
+                            SESSION_SPILL_MIN_BYTES)
+
+logger = logging.getLogger(__name__)
+
+# Session keys holding export zips, which can be moved to disk until downloaded
+ZIP_BUFFER_KEYS = ["autogen_zip_buffer", "crewai_zip_buffer", "bundle_buffer"]
+
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, complex, bool, type(None))
+_SKIPPED_TYPES = (types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType, type)
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class SpilledBuffer:
+    """
+    Bytes moved out of a session into a file under SESSION_SPILL_DIR. The
+    file is deleted when the object is garbage collected, i.e. when the
+    session that held it goes away or replaces it.
+    """
+    def __init__(self, data, directory=SESSION_SPILL_DIR, suffix=""):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=directory, suffix=suffix)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        self.size = len(data)
+        weakref.finalize(self, _remove_file, self.path)
+
+    def getvalue(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def __repr__(self):
+        return f"SpilledBuffer({self.path}, {self.size} bytes)"
+
+
+def load_buffer(buffer):
+    """The bytes of an in-memory or spilled buffer, for download buttons. None passes through."""
+    if buffer is None or isinstance(buffer, (bytes, bytearray)):
+        return buffer
+    return buffer.getvalue()
+
+
+def _get_slots(cls):
+    return [name for klass in cls.__mro__ for name in getattr(klass, "__slots__", ())
+            if name not in ("__dict__", "__weakref__")]
+
+
+def estimate_size(obj, _seen=None):
+    """
+    Approximate bytes held by `obj` and everything it references: strings,
+    containers, in-memory buffers, DataFrames and plain objects. Functions,
+    modules, classes and Streamlit internals are not followed, and an object
+    reachable twice is only counted once.
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, _ATOMIC_TYPES):
+        return sys.getsizeof(obj)
+    if isinstance(obj, _SKIPPED_TYPES) or type(obj).__module__.startswith("streamlit"):
+        return 0
+    if isinstance(obj, SpilledBuffer):
+        return sys.getsizeof(obj)
+    if isinstance(obj, io.BytesIO):
+        # BytesIO reports its buffer in __sizeof__
+        return sys.getsizeof(obj)
+    if hasattr(obj, "memory_usage") and hasattr(obj, "columns"):
+        # pandas DataFrame
+        return int(obj.memory_usage(deep=True).sum())
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(key, seen) + estimate_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(estimate_size(item, seen) for item in obj)
+    else:
+        if hasattr(obj, "__dict__"):
+            size += estimate_size(vars(obj), seen)
+        for name in _get_slots(type(obj)):
+            size += estimate_size(getattr(obj, name, None), seen)
+    return size
+
+
+def _session_items(state):
+    if hasattr(state, "keys"):
+        return [(key, state[key]) for key in list(state.keys())]
+    return list(vars(state).items())
+
+
+def measure_session(state):
+    """[(key, bytes)] for every session entry, largest first."""
+    seen = set()
+    sizes = [(str(key), estimate_size(value, seen)) for key, value in _session_items(state)]
+    return sorted(sizes, key=lambda item: -item[1])
+
+
+def get_process_rss():
+    """Resident set size of this process in bytes, or None if it cannot be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def spill_zip_buffers(state, min_bytes=SESSION_SPILL_MIN_BYTES):
+    """Move in-memory export zips and bundles of at least `min_bytes` to disk. Returns the keys spilled."""
+    spilled = []
+    for key in ZIP_BUFFER_KEYS:
+        buffer = state.get(key)
+        if isinstance(buffer, io.BytesIO) and buffer.getbuffer().nbytes >= min_bytes:
+            state[key] = SpilledBuffer(buffer.getvalue(), suffix=".zip")
+            spilled.append(key)
+    return spilled
+
+
+def _truncate_text(text, limit):
+    """`text` cut to roughly `limit` bytes as measured by estimate_size."""
+    size = estimate_size(text)
+    if size <= limit:
+        return text
+    empty_size = estimate_size(text[:0])
+    per_char = (size - empty_size) / len(text)
+    return text[:max(0, int((limit - empty_size) / per_char))]
+
+
+def trim_reference_content(state, max_bytes=SESSION_REFERENCE_MAX_BYTES):
+    """
+    Keep the session's fetched text (reference_html and the agents' web
+    content) under `max_bytes` by truncating it. reference_html holds only
+    the page for the URL in the current input (see
+    ui_utils.display_user_input), so it is never dropped, only cut down when
+    it alone is over the cap; agents' web content shares what is left, in
+    agent order. Nothing is deleted, since a dropped page would be fetched
+    again on the next turn. Returns the number of texts truncated.
+    """
+    trimmed = 0
+    budget = max_bytes
+    reference_html = state.get("reference_html") or {}
+    for url, page in list(reference_html.items()):
+        content = page.get("content") if isinstance(page, dict) else None
+        size = estimate_size(page)
+        if size > budget and isinstance(content, str):
+            overhead = size - estimate_size(content)
+            # The page dict is shared with other sessions (shared_resources), so it is replaced, not edited
+            page = reference_html[url] = dict(page, content=_truncate_text(content, max(0, budget - overhead)))
+            trimmed += 1
+            size = estimate_size(page)
+        budget = max(0, budget - size)
+
+    for agent in state.get("agents") or []:
+        web_content = getattr(agent, "web_content", None)
+        if not isinstance(web_content, str) or not web_content:
+            continue
+        truncated = _truncate_text(web_content, budget)
+        if truncated is not web_content:
+            agent.web_content = truncated
+            trimmed += 1
+        budget = max(0, budget - estimate_size(truncated))
+    return trimmed
+
+
+def enforce_session_limits(state, budget_mb=SESSION_MEMORY_BUDGET_MB):
+    """
+    Apply the per-session caps: large export zips go to disk, fetched pages
+    are truncated to SESSION_REFERENCE_MAX_BYTES, and a session still over its
+    budget has every zip spilled and a warning logged. Returns the session's
+    estimated size in bytes.
+    """
+    spill_zip_buffers(state)
+    trimmed = trim_reference_content(state)
+    if trimmed:
+        logger.debug("Truncated %s fetched page(s) in the session", trimmed)
+
+    sizes = measure_session(state)
+    total = sum(size for _, size in sizes)
+    budget = budget_mb * 1024 * 1024
+    if total > budget:
+        if spill_zip_buffers(state, min_bytes=0):
+            sizes = measure_session(state)
+            total = sum(size for _, size in sizes)
+        if total > budget:
+            largest = ", ".join(f"{key}={size / 1024 / 1024:.1f}MB" for key, size in sizes[:3])
+            logger.warning("Session uses %.1f MB, over its %s MB budget (largest: %s)", total / 1024 / 1024, budget_mb, largest)
+    return total
@@ -0,0 +1,335 @@
+# utils/metrics_utils.py
+
+import functools
+import json
+import logging
+import threading
+import time
+
+from collections import deque
+from configs.config import METRICS_HISTORY_SIZE
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.token_utils import token_counter
+from utils.trace_utils import span
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+
+class MetricsRegistry:
+    """
+    Process-wide store of LLM call and tool run measurements. Keeps running
+    totals per label set plus the most recent records for percentiles and
+    the metrics panel. All methods are thread-safe.
+    """
+    def __init__(self, history_size=METRICS_HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self.history_size = history_size
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.records = deque(maxlen=self.history_size)
+            self.counters = {}
+            self.histograms = {}
+            self.started_at = time.time()
+
+    def _increment(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def _observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                histogram["buckets"][index] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+    def record_llm_call(self, provider, model, wall_time, status, ttfb=None, prompt_tokens=None, completion_tokens=None, error=None):
+        labels = {"provider": provider, "model": model or ""}
+        with self._lock:
+            self.records.append({
+                "kind": "llm", "name": provider, "model": model, "started_at": time.time() - wall_time,
+                "wall_time": wall_time, "ttfb": ttfb, "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens, "status": status, "error": error
+            })
+            self._increment("llm_requests_total", {**labels, "status": status})
+            self._observe("llm_request_seconds", labels, wall_time)
+            if ttfb is not None:
+                self._observe("llm_ttfb_seconds", labels, ttfb)
+            if prompt_tokens:
+                self._increment("llm_tokens_total", {**labels, "type": "prompt"}, prompt_tokens)
+            if completion_tokens:
+                self._increment("llm_tokens_total", {**labels, "type": "completion"}, completion_tokens)
+            if status == "429":
+                self._increment("llm_rate_limited_total", {"provider": provider})
+
+    def record_tool_run(self, tool_name, wall_time, status, error=None):
+        with self._lock:
+            self.records.append({
+                "kind": "tool", "name": tool_name, "model": None, "started_at": time.time() - wall_time,
+                "wall_time": wall_time, "ttfb": None, "prompt_tokens": None, "completion_tokens": None,
+                "status": status, "error": error
+            })
+            self._increment("tool_runs_total", {"tool": tool_name, "status": status})
+            self._observe("tool_run_seconds", {"tool": tool_name}, wall_time)
+
+    def record_retry(self, operation):
+        with self._lock:
+            self._increment("retries_total", {"operation": operation})
+
+    def record_wait(self, reason, seconds):
+        with self._lock:
+            self._increment("wait_seconds_total", {"reason": reason}, seconds)
+
+    def record_failover(self, from_provider, to_provider, reason):
+        with self._lock:
+            self._increment("llm_failovers_total", {"from": from_provider, "to": to_provider, "reason": reason})
+
+    def record_coalesced(self, name):
+        """A call that waited for an identical in-flight call instead of going upstream."""
+        with self._lock:
+            self._increment("coalesced_requests_total", {"flight": name})
+
+    def record_hedge(self, winner):
+        """`winner` is "primary" or "backup": which of a hedged pair answered first."""
+        with self._lock:
+            self._increment("llm_hedges_total", {"winner": winner})
+
+    def get_latencies(self, provider, model=None):
+        """Sorted wall times of the recent successful calls to `provider` (and `model`)."""
+        return sorted(record["wall_time"] for record in self.get_records("llm")
+                      if record["name"] == provider and record["status"] == "ok" and (model is None or record["model"] == model))
+
+    def record_cache(self, cache, hit):
+        with self._lock:
+            self._increment("cache_requests_total", {"cache": cache, "result": "hit" if hit else "miss"})
+
+    def get_records(self, kind=None):
+        with self._lock:
+            records = list(self.records)
+        return [record for record in records if kind is None or record["kind"] == kind]
+
+    def get_counter(self, name, **labels):
+        """Sum of a counter over every label set that matches `labels`."""
+        with self._lock:
+            return sum(value for (counter, key), value in self.counters.items()
+                       if counter == name and all(item in key for item in labels.items()))
+
+    def summary(self):
+        llm_records = self.get_records("llm")
+        durations = sorted(record["wall_time"] for record in llm_records)
+        ttfbs = sorted(record["ttfb"] for record in llm_records if record["ttfb"] is not None)
+        cache_hits = self.get_counter("cache_requests_total", result="hit")
+        cache_total = cache_hits + self.get_counter("cache_requests_total", result="miss")
+        return {
+            "llm_calls": self.get_counter("llm_requests_total"),
+            "llm_errors": self.get_counter("llm_requests_total") - self.get_counter("llm_requests_total", status="ok"),
+            "latency_p50": percentile(durations, 50),
+            "latency_p95": percentile(durations, 95),
+            "ttfb_p50": percentile(ttfbs, 50),
+            "prompt_tokens": self.get_counter("llm_tokens_total", type="prompt"),
+            "completion_tokens": self.get_counter("llm_tokens_total", type="completion"),
+            "retries": self.get_counter("retries_total"),
+            "failovers": self.get_counter("llm_failovers_total"),
+            "hedges_won_by_backup": self.get_counter("llm_hedges_total", winner="backup"),
+            "coalesced": self.get_counter("coalesced_requests_total"),
+            "rate_limited": self.get_counter("llm_rate_limited_total"),
+            "wait_seconds": self.get_counter("wait_seconds_total"),
+            "tool_runs": self.get_counter("tool_runs_total"),
+            "cache_hit_rate": cache_hits / cache_total if cache_total else None
+        }
+
+    def to_dict(self):
+        with self._lock:
+            counters = [{"name": name, "labels": dict(key), "value": value} for (name, key), value in self.counters.items()]
+            histograms = [{"name": name, "labels": dict(key), "sum": histogram["sum"], "count": histogram["count"],
+                           "buckets": dict(zip(LATENCY_BUCKETS, histogram["buckets"]))}
+                          for (name, key), histogram in self.histograms.items()]
+        return {
+            "started_at": self.started_at,
+            "summary": self.summary(),
+            "counters": counters,
+            "histograms": histograms,
+            "records": self.get_records()
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, default=str)
+
+    def to_prometheus(self, prefix="autogroq_"):
+        """Render counters and histograms in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, dict(value, buckets=list(value["buckets"]))) for key, value in self.histograms.items())
+
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                lines.append(f"# TYPE {prefix}{name} counter")
+                declared.add(name)
+            lines.append(f"{prefix}{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), histogram in histograms:
+            if name not in declared:
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                declared.add(name)
+            for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+                lines.append(f"{prefix}{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {count}")
+            lines.append(f"{prefix}{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+            lines.append(f"{prefix}{name}_sum{_format_labels(labels)} {histogram['sum']}")
+            lines.append(f"{prefix}{name}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (f'{key}="{_escape_label_value(value)}"' for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+metrics_registry = MetricsRegistry()
+
+
+def get_metrics_registry():
+    return metrics_registry
+
+
+def _response_status(response):
+    if response is None:
+        return "error"
+    status_code = getattr(response, "status_code", None)
+    if status_code is None or status_code == 200:
+        return "ok"
+    return str(status_code)
+
+
+def instrument_send_request(send_request):
+    """
+    Wrap a provider's send_request so every call records wall time,
+    time-to-first-byte (requests' `elapsed`, when the response has one),
+    token usage and status in the metrics registry.
+    """
+    @functools.wraps(send_request)
+    def wrapper(self, data, *args, **kwargs):
+        provider = type(self).__name__.replace("Provider", "").lower()
+        model = data.get("model") if isinstance(data, dict) else None
+        started_at = time.perf_counter()
+        response = None
+        error = None
+        call_span = span("provider.send_request", provider=provider, model=model)
+        current = call_span.__enter__()
+        try:
+            response = send_request(self, data, *args, **kwargs)
+            return response
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            wall_time = time.perf_counter() - started_at
+            status = "error" if error else _response_status(response)
+            elapsed = getattr(response, "elapsed", None)
+            ttfb = elapsed.total_seconds() if hasattr(elapsed, "total_seconds") else None
+            prompt_tokens = completion_tokens = None
+            if status == "ok":
+                try:
+                    prompt_tokens, completion_tokens = self.get_usage(response)
+                except Exception as e:
+                    logger.debug("Could not read token usage from %s response: %s", provider, e)
+                if prompt_tokens and isinstance(data, dict) and data.get("messages"):
+                    token_counter.calibrate(provider, model, data["messages"], prompt_tokens)
+                if isinstance(data, dict) and data.get("cache_prefix"):
+                    try:
+                        cached_tokens = self.get_cached_tokens(response)
+                    except Exception:
+                        cached_tokens = None
+                    if cached_tokens is not None:
+                        metrics_registry.record_cache("prompt_prefix", cached_tokens > 0)
+                        current.set_attribute("cached_tokens", cached_tokens)
+            metrics_registry.record_llm_call(provider, model, wall_time, status, ttfb=ttfb, prompt_tokens=prompt_tokens,
+                                             completion_tokens=completion_tokens, error=error)
+            current.set_attributes(status=status, ttfb=ttfb, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+            if status != "ok":
+                current.status = "error"
+                current.error = error or f"status {status}"
+            call_span.__exit__(None, None, None)
+    wrapper.instrumented = True
+    return wrapper
+
+
+class timed_tool_run:
+    """Context manager that records one tool execution: `with timed_tool_run(name): ...`"""
+    def __init__(self, tool_name):
+        self.tool_name = tool_name
+
+    def __enter__(self):
+        self.span = span("tool.run", tool=self.tool_name)
+        self.span.__enter__()
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        status = "ok" if exc_type is None else "error"
+        metrics_registry.record_tool_run(self.tool_name, time.perf_counter() - self.started_at, status,
+                                         error=str(exc_value) if exc_value else None)
+        self.span.__exit__(exc_type, exc_value, traceback)
+        return False
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            body, content_type = metrics_registry.to_prometheus(), "text/plain; version=0.0.4"
+        elif self.path.rstrip("/") == "/metrics.json":
+            body, content_type = metrics_registry.to_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug("Metrics endpoint: %s", format % args)
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics (Prometheus text) and /metrics.json once per process."""
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is not None:
+            return _metrics_server
+        try:
+            _metrics_server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+        except OSError as e:
+            logger.error("Could not start metrics endpoint on %s:%s: %s", host, port, e)
+            return None
+        threading.Thread(target=_metrics_server.serve_forever, name="autogroq-metrics", daemon=True).start()
+        logger.info("Metrics endpoint listening on http://%s:%s/metrics", host, port)
+        return _metrics_server
@@ -0,0 +1,248 @@
+# utils/parse_utils.py
+
+import json
+import logging
+import re
+
+from typing import Dict, List, Optional, Tuple
+from utils.log_utils import truncate
+
+logger = logging.getLogger(__name__)
+
+
+# Section headers the Project Manager prompt asks for (see prompts.create_project_manager_prompt).
+# A header sits on its own line and may be numbered ("2. ", "4) "), wrapped in markdown bold or
+# prefixed with '#'.
+PM_SECTION_PATTERN = re.compile(
+    r"^[ \t]*(?:\d+[.)][ \t]*)?(?:#+[ \t]*)?(?:\*\*)?(?:\d+[.)][ \t]*)?"
+    r"(Project Outline|Key Deliverables|Deliverables|Timeline|Team of Experts)"
+    r"(?:\*\*)?[ \t]*:[ \t]*(?:\*\*)?[ \t]*$",
+    re.MULTILINE | re.IGNORECASE
+)
+
+NUMBERED_ITEM_PATTERN = re.compile(r"\d+\.\s*(.*)")
+
+AGENT_ADDRESS_PATTERN = re.compile(r"To (\w+( \w+)*):")
+AGENT_ADDRESS_PREFIX_PATTERN = re.compile(r"^To \w+( \w+)*:\s*")
+
+URL_PATTERN = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+
+CODE_BLOCK_PATTERNS = [
+    re.compile(r"```(.*?)```", re.DOTALL),
+    re.compile(r"<html.*?>.*?</html>", re.DOTALL | re.IGNORECASE),
+    re.compile(r"<script.*?>.*?</script>", re.DOTALL | re.IGNORECASE),
+    re.compile(r"<style.*?>.*?</style>", re.DOTALL | re.IGNORECASE)
+]
+
+FUNCTION_NAME_PATTERN = re.compile(r"def\s+(\w+)\(")
+DOCSTRING_PATTERN = re.compile(r'"""(.*?)"""', re.DOTALL)
+IMPORT_PATTERN = re.compile(r"import\s+(\w+)")
+SECRET_PATTERN = re.compile(r"([A-Z_]+_API_KEY|[A-Z_]+_SECRET)")
+
+# Inside a JSON value only strings and braces matter; a string token swallows
+# any braces (and escaped quotes) it contains.
+JSON_TOKEN_PATTERN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}]', re.DOTALL)
+
+_json_decoder = json.JSONDecoder()
+
+
+def split_pm_sections(text: str) -> Dict[str, str]:
+    """
+    Split Project Manager output into its sections in a single pass.
+    Keys are lower-cased header names ("key deliverables" is folded into
+    "deliverables"); values are the stripped text up to the next header.
+    The first occurrence of a header wins.
+    """
+    sections = {}
+    matches = list(PM_SECTION_PATTERN.finditer(text))
+    for i, match in enumerate(matches):
+        name = match.group(1).lower()
+        if name == "key deliverables":
+            name = "deliverables"
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        if name not in sections:
+            sections[name] = text[match.end():end].strip()
+    return sections
+
+
+def parse_numbered_items(text: str) -> List[str]:
+    return [item.strip() for item in NUMBERED_ITEM_PATTERN.findall(text)]
+
+
+def parse_agent_address(content: str) -> Tuple[Optional[str], str]:
+    """
+    Split a moderator reply of the form "To <Agent Name>: ..." into the
+    addressed name and the remaining text. Returns (None, content) when the
+    reply does not start with an address.
+    """
+    match = AGENT_ADDRESS_PATTERN.match(content)
+    if not match:
+        return None, content
+    return match.group(1), AGENT_ADDRESS_PREFIX_PATTERN.sub("", content, count=1).strip()
+
+
+def find_url(text: str) -> Optional[str]:
+    match = URL_PATTERN.search(text)
+    return match.group() if match else None
+
+
+def extract_code_blocks(response: str) -> List[str]:
+    blocks = []
+    for pattern in CODE_BLOCK_PATTERNS:
+        blocks.extend(pattern.findall(response))
+    # Drop duplicates but keep the order they appeared in
+    return list(dict.fromkeys(blocks))
+
+
+def parse_function_name(python_code: str) -> Optional[str]:
+    match = FUNCTION_NAME_PATTERN.search(python_code)
+    return match.group(1) if match else None
+
+
+def parse_docstring(python_code: str) -> Optional[str]:
+    match = DOCSTRING_PATTERN.search(python_code)
+    return match.group(1).strip() if match else None
+
+
+def parse_imports(python_code: str) -> List[str]:
+    return IMPORT_PATTERN.findall(python_code)
+
+
+def parse_secrets(python_code: str) -> List[str]:
+    return SECRET_PATTERN.findall(python_code)
+
+
+def find_json_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    Return (start, end) offsets of every top-level {...} block in `text`.
+    Braces inside JSON strings are ignored. Outside an object the text is
+    skipped with str.find, so prose quotes never confuse the scanner.
+    Well-formed objects are measured by the C decoder; only malformed ones
+    fall back to the token scan. An unterminated object ends the scan.
+    """
+    spans = []
+    start = text.find("{")
+    while start != -1:
+        try:
+            _, end = _json_decoder.raw_decode(text, start)
+            spans.append((start, end))
+            start = text.find("{", end)
+            continue
+        except json.JSONDecodeError:
+            pass
+        depth = 0
+        end = None
+        for match in JSON_TOKEN_PATTERN.finditer(text, start):
+            token = match.group()
+            if token == "{":
+                depth += 1
+            elif token == "}":
+                depth -= 1
+                if depth == 0:
+                    end = match.end()
+                    break
+        if end is None:
+            break
+        spans.append((start, end))
+        start = text.find("{", end)
+    return spans
+
+
+def extract_json_objects(text: str) -> List[Dict]:
+    parsed_objects = []
+    for start, end in find_json_spans(text):
+        obj_str = text[start:end]
+        try:
+            parsed_objects.append(json.loads(obj_str))
+        except json.JSONDecodeError as e:
+            logger.error("Error parsing JSON object: %s", e)
+            logger.debug("JSON string: %s", truncate(obj_str))
+    return parsed_objects
+
+
+CODE_FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*(.*?)\s*```", re.DOTALL)
+
+_JSON_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _close_json(text: str) -> List[str]:
+    """
+    Walk `text` once, dropping trailing commas and stray closers, and return
+    candidate documents: the text with every open string and container
+    closed, then the text cut back to each earlier comma (newest first) so
+    a truncated last element can be discarded.
+    """
+    out = []
+    stack = []
+    cut_points = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in _JSON_CLOSERS:
+            stack.append(char)
+        elif char in "}]":
+            if not stack or _JSON_CLOSERS[stack[-1]] != char:
+                continue
+            stack.pop()
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            out.append(char)
+            if not stack:
+                return ["".join(out)]
+            continue
+        elif char == ",":
+            cut_points.append((len(out), list(stack)))
+        out.append(char)
+
+    def closed(chars, open_stack, open_string):
+        document = "".join(chars) + ('"' if open_string else "")
+        document = document.rstrip().rstrip(",").rstrip()
+        if document.endswith(":"):
+            document += " null"
+        return document + "".join(_JSON_CLOSERS[opener] for opener in reversed(open_stack))
+
+    candidates = [closed(out, stack, in_string)]
+    for position, open_stack in reversed(cut_points):
+        candidates.append(closed(out[:position], open_stack, False))
+    return candidates
+
+
+def repair_json(text: str):
+    """
+    Best-effort parse of model output that should be JSON. Handles code
+    fences, prose around the document, trailing commas and output truncated
+    by max_tokens. Returns the parsed value, or None if nothing usable is found.
+    """
+    if not text:
+        return None
+    fence_match = CODE_FENCE_PATTERN.search(text)
+    if fence_match:
+        text = fence_match.group(1)
+    starts = [index for index in (text.find("["), text.find("{")) if index != -1]
+    if not starts:
+        return None
+    start = min(starts)
+    try:
+        value, _ = _json_decoder.raw_decode(text, start)
+        return value
+    except json.JSONDecodeError:
+        pass
+    for candidate in _close_json(text[start:]):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
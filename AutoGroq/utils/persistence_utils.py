@@ -0,0 +1,343 @@
+# utils/persistence_utils.py
+
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+
+from configs.config import PROJECT_COMPACT_EVENTS, PROJECT_DB_PATH
+from configs.current_project import Current_Project
+from models.agent_base_model import AgentBaseModel
+from models.project_base_model import ProjectBaseModel
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS project (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    owner TEXT
+);
+CREATE TABLE IF NOT EXISTS project_event (
+    project_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at TEXT,
+    PRIMARY KEY (project_id, seq)
+);
+"""
+
+# Session fields a snapshot event carries; the other event kinds each carry a subset
+SNAPSHOT_KEYS = [
+    "user_request", "rephrased_request", "project_manager_output", "project_model", "current_project", "agents",
+    "discussion_turns", "whiteboard_content"
+]
+# Session fields rebuilt from discussion_turns on restore rather than saved (see derive_discussion)
+DISCUSSION_KEYS = ["discussion_history", "last_agent", "last_comment", "most_recent_response"]
+
+
+class ProjectStore:
+    """
+    Append-only change log of projects in SQLite. Each change to a project
+    (the request, a discussion turn, the agents, a deliverable, the
+    whiteboard) is one small event; a project is restored by replaying its
+    events in order. Once a project has `compact_events` events, the next
+    append folds them into one snapshot event, so the log stays short and a
+    restore never replays more than that. One connection is shared by all
+    sessions and threads.
+
+    Each project belongs to the owner token it was created with. The app
+    lists and restores only the projects of the browser's own token; projects
+    saved without one (older stores, command-line imports without --owner)
+    are reachable only from the command line.
+    """
+    def __init__(self, path, compact_events=PROJECT_COMPACT_EVENTS):
+        self.path = os.path.expanduser(path)
+        self.compact_events = compact_events
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(project)")}
+            if "owner" not in columns:
+                # Stores created before projects had owners
+                self._conn.execute("ALTER TABLE project ADD COLUMN owner TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS project_owner ON project (owner, updated_at)")
+        return self._conn
+
+    def append(self, project_id, kind, payload, name=None, owner=None):
+        """Add an event to `project_id`, creating the project for `owner` if it is new."""
+        now = datetime.datetime.now().isoformat()
+        data = json.dumps(payload, default=str)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("INSERT OR IGNORE INTO project (id, name, created_at, updated_at, owner) VALUES (?, ?, ?, ?, ?)",
+                             (project_id, name, now, now, owner))
+                conn.execute("UPDATE project SET updated_at = ?, name = COALESCE(?, name) WHERE id = ?", (now, name, project_id))
+                conn.execute(
+                    "INSERT INTO project_event (project_id, seq, kind, payload, created_at) VALUES "
+                    "(?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM project_event WHERE project_id = ?), ?, ?, ?)",
+                    (project_id, project_id, kind, data, now)
+                )
+                (seq,) = conn.execute("SELECT MAX(seq) FROM project_event WHERE project_id = ?", (project_id,)).fetchone()
+                if self.compact_events and seq >= self.compact_events:
+                    rows = conn.execute("SELECT kind, payload FROM project_event WHERE project_id = ? ORDER BY seq",
+                                        (project_id,)).fetchall()
+                    snapshot = replay_events((kind, json.loads(payload)) for kind, payload in rows)
+                    self._replace_events(conn, project_id, snapshot, now)
+                    logger.debug("Compacted %s saved changes of project %s", seq, project_id)
+
+    def load_events(self, project_id):
+        """[(kind, payload)] for `project_id`, oldest first."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT kind, payload FROM project_event WHERE project_id = ? ORDER BY seq", (project_id,)
+            ).fetchall()
+        return [(kind, json.loads(payload)) for kind, payload in rows]
+
+    @staticmethod
+    def _replace_events(conn, project_id, snapshot, now):
+        conn.execute("DELETE FROM project_event WHERE project_id = ?", (project_id,))
+        conn.execute("INSERT INTO project_event (project_id, seq, kind, payload, created_at) VALUES (?, 1, 'snapshot', ?, ?)",
+                     (project_id, json.dumps(snapshot, default=str), now))
+
+    def compact(self, project_id, snapshot):
+        """Replace a project's events with one snapshot event."""
+        now = datetime.datetime.now().isoformat()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                self._replace_events(conn, project_id, snapshot, now)
+
+    def get_owner(self, project_id):
+        """The owner token of `project_id`, or None if it has none or does not exist."""
+        with self._lock:
+            row = self._connect().execute("SELECT owner FROM project WHERE id = ?", (project_id,)).fetchone()
+        return row[0] if row else None
+
+    def list_projects(self, owner, limit=20):
+        """The projects of `owner`, most recently updated first; `limit` None lists them all."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, name, updated_at FROM project WHERE owner = ? ORDER BY updated_at DESC LIMIT ?",
+                (owner, -1 if limit is None else limit)
+            ).fetchall()
+        return [{"id": project_id, "name": name, "updated_at": updated_at} for project_id, name, updated_at in rows]
+
+    def list_project_ids(self):
+        """Every project id in the store, whatever its owner, for command-line bulk export."""
+        with self._lock:
+            rows = self._connect().execute("SELECT id FROM project ORDER BY updated_at DESC").fetchall()
+        return [project_id for project_id, in rows]
+
+    def delete(self, project_id):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM project_event WHERE project_id = ?", (project_id,))
+                conn.execute("DELETE FROM project WHERE id = ?", (project_id,))
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_project_store():
+    """
+    The app's store at PROJECT_DB_PATH, opened on first use, or None when
+    persistence is turned off. Engines only save to the store their
+    EngineConfig is given, so library, benchmark and test runs save nothing
+    unless they pass one.
+    """
+    global _default_store
+    if not PROJECT_DB_PATH:
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ProjectStore(PROJECT_DB_PATH)
+        return _default_store
+
+
+def serialize_agents(agents):
+    # Built-in agents are recreated by every session, so only generated and edited agents are kept
+    return [agent.to_dict() for agent in agents or [] if type(agent) is AgentBaseModel]
+
+
+def serialize_project_model(project_model):
+    # tools and workflows are rebuilt from the tools folder and the agents
+    data = project_model.to_dict()
+    data.pop("tools", None)
+    data.pop("workflows", None)
+    return data
+
+
+def snapshot_project(state):
+    """Everything needed to restore the session's project, as plain JSON-able data."""
+    snapshot = {key: state.get(key) for key in SNAPSHOT_KEYS}
+    snapshot["agents"] = serialize_agents(state.get("agents"))
+    snapshot["project_model"] = serialize_project_model(state.get("project_model") or ProjectBaseModel())
+    snapshot["current_project"] = (state.get("current_project") or Current_Project()).to_dict()
+    if not snapshot["discussion_turns"]:
+        # Nothing to derive the discussion from, so keep it as it is
+        snapshot.update({key: state.get(key) for key in DISCUSSION_KEYS})
+    return snapshot
+
+
+def record_event(store, state, kind, payload, name=None):
+    """
+    Append a change to the session's project in `store`, if the session has
+    a project and `store` is not None. Failures are logged, never raised:
+    losing a save must not break the discussion.
+    """
+    project_id = state.get("project_id")
+    if store is None or not project_id:
+        return
+    try:
+        store.append(project_id, kind, payload, name=name, owner=state.get("project_owner"))
+    except sqlite3.Error as e:
+        logger.error("Could not save %s event for project %s: %s", kind, project_id, str(e))
+
+
+def start_project(store, state, user_request):
+    """Give the session a new project id and save the request it starts from."""
+    state.project_id = uuid.uuid4().hex
+    record_event(store, state, "request", {"user_request": user_request}, name=(user_request or "project")[:80])
+    return state.project_id
+
+
+def record_project(store, state):
+    """Save the rephrased request, the project manager's plan and the deliverables it produced."""
+    record_event(store, state, "project", {
+        "rephrased_request": state.get("rephrased_request"),
+        "project_manager_output": state.get("project_manager_output"),
+        "project_model": serialize_project_model(state.get("project_model") or ProjectBaseModel()),
+        "current_project": (state.get("current_project") or Current_Project()).to_dict()
+    })
+
+
+def record_deliverables(store, state):
+    """Save deliverable and phase progress."""
+    record_event(store, state, "deliverables", {"current_project": (state.get("current_project") or Current_Project()).to_dict()})
+
+
+def record_agents(store, state):
+    record_event(store, state, "agents", {"agents": serialize_agents(state.get("agents"))})
+
+
+def record_agent(store, state, agent, previous_name=None):
+    """Save one edited agent; `previous_name` is its name before a rename."""
+    if type(agent) is AgentBaseModel:
+        record_event(store, state, "agent", {"name": previous_name or agent.name, "agent": agent.to_dict()})
+
+
+def format_turn(turn):
+    """A discussion turn as it reads in discussion_history."""
+    if turn["speaker"] == "User":
+        return f"\n\nUser: {turn['content']}\n\n"
+    return f"{turn['speaker']}:\n\n{turn['content']}\n\n"
+
+
+def derive_discussion(values):
+    """
+    Fill in discussion_history, last_agent, last_comment and
+    most_recent_response from the discussion turns in `values`. Values
+    without turns (e.g. from older bundles) are left as they are.
+    """
+    turns = values.get("discussion_turns")
+    if not turns:
+        return values
+    values["discussion_history"] = "".join(format_turn(turn) for turn in turns)
+    last_reply = next((turn for turn in reversed(turns) if turn["speaker"] != "User"), None)
+    if last_reply is not None:
+        values["last_agent"] = last_reply["speaker"]
+        values["last_comment"] = last_reply["content"]
+        values["most_recent_response"] = format_turn(last_reply)
+    return values
+
+
+def record_turn(store, state, turns):
+    """Save one discussion update, the new turns; the text they add to the discussion is derived on restore."""
+    record_event(store, state, "turn", {"turns": turns})
+
+
+def record_whiteboard(store, state):
+    record_event(store, state, "whiteboard", {"whiteboard_content": state.get("whiteboard_content")})
+
+
+def _apply_event(values, kind, payload):
+    if kind == "snapshot":
+        values.update(payload)
+    elif kind == "agent":
+        agents = values.setdefault("agents", [])
+        index = next((i for i, agent in enumerate(agents) if agent.get("name") == payload["name"]), None)
+        if index is None:
+            agents.append(payload["agent"])
+        else:
+            agents[index] = payload["agent"]
+    elif kind == "agents":
+        values["agents"] = list(payload["agents"])
+    elif kind == "turn":
+        # Older turn events also carry the derived history and last_* fields; the turns are enough
+        values.setdefault("discussion_turns", []).extend(payload["turns"])
+    else:
+        # request, project, deliverables, whiteboard: plain field updates
+        values.update(payload)
+
+
+def replay_events(events):
+    """
+    The project fields described by `events`, (kind, payload) pairs oldest
+    first, as plain data. The discussion is held as turns only; see
+    derive_discussion.
+    """
+    values = {}
+    for kind, payload in events:
+        _apply_event(values, kind, payload)
+    return values
+
+
+def apply_project(state, values, project_id):
+    """Set the session's project fields from plain `values` (a snapshot or replayed events)."""
+    values = derive_discussion(dict(values))
+    for key in ("user_request", "rephrased_request", "discussion_history", "last_agent", "last_comment",
+                "most_recent_response", "whiteboard_content"):
+        state[key] = values.get(key) or ""
+    state["project_manager_output"] = values.get("project_manager_output")
+    state["discussion_turns"] = values.get("discussion_turns") or []
+    state["agents"] = [AgentBaseModel.from_dict(agent) for agent in values.get("agents") or []]
+    if values.get("project_model"):
+        state["project_model"] = ProjectBaseModel.from_dict(values["project_model"])
+    if values.get("current_project"):
+        state["current_project"] = Current_Project.from_dict(values["current_project"])
+    state["project_id"] = project_id
+
+
+def restore_project(store, state, project_id, owner):
+    """
+    Load `project_id` from `store` into `state` by replaying its events, one
+    pass over the log. Returns False if the project has no saved events or
+    does not belong to `owner`.
+    """
+    if store is None or not owner or store.get_owner(project_id) != owner:
+        return False
+    events = store.load_events(project_id)
+    if not events:
+        return False
+
+    apply_project(state, replay_events(events), project_id)
+    logger.info("Restored project %s from %s saved changes", project_id, len(events))
+    return True
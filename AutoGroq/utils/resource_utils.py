@@ -0,0 +1,107 @@
+# utils/resource_utils.py
+
+import logging
+import threading
+import time
+
+from collections import OrderedDict
+from configs.config import SHARED_RESOURCE_MAX_ENTRIES
+from utils.metrics_utils import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    def __init__(self, value, ttl):
+        self.value = value
+        self.created_at = time.time()
+        self.expires_at = self.created_at + ttl if ttl else None
+        self.hits = 0
+
+
+class SharedResources:
+    """
+    Process-wide registry for state that is the same for every session: the
+    tool registry, provider model lists, fetched reference pages. A value is
+    built once, then handed to every session by reference, so callers must
+    treat it as read-only. Entries can expire after `ttl` seconds and the
+    least recently used ones are dropped past `max_entries`. Concurrent
+    misses on the same key build the value once.
+    """
+    def __init__(self, max_entries=SHARED_RESOURCE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._build_locks = {}
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at is not None and entry.expires_at < time.time():
+                del self._entries[key]
+                return None
+            entry.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+    def get(self, name, factory, *key, ttl=None):
+        """
+        The shared value for (name, *key), calling `factory()` to build it on
+        a miss. Falsy results are returned but not kept, so a failed fetch is
+        retried by the next caller.
+        """
+        full_key = (name,) + key
+        entry = self._lookup(full_key)
+        if entry is None:
+            with self._lock:
+                build_lock = self._build_locks.setdefault(full_key, threading.Lock())
+            with build_lock:
+                # Another session may have built it while we waited
+                entry = self._lookup(full_key)
+                if entry is None:
+                    try:
+                        value = factory()
+                        metrics_registry.record_cache(f"shared:{name}", False)
+                        if not value:
+                            return value
+                        with self._lock:
+                            entry = self._entries[full_key] = _Entry(value, ttl)
+                            while len(self._entries) > self.max_entries:
+                                self._entries.popitem(last=False)
+                    finally:
+                        # Also when factory() raises, or failing keys would each leave a lock behind
+                        with self._lock:
+                            self._build_locks.pop(full_key, None)
+                    logger.debug("Built shared resource %s", name)
+                    return value
+        metrics_registry.record_cache(f"shared:{name}", True)
+        return entry.value
+
+    def invalidate(self, name=None, *key):
+        """Drop every entry, every entry of `name`, or the one entry for (name, *key)."""
+        with self._lock:
+            if name is None:
+                stale = list(self._entries)
+            elif key:
+                stale = [(name,) + key] if (name,) + key in self._entries else []
+            else:
+                stale = [entry_key for entry_key in self._entries if entry_key[0] == name]
+            for entry_key in stale:
+                del self._entries[entry_key]
+        return len(stale)
+
+    def stats(self):
+        """One row per entry, for the Debug tab."""
+        now = time.time()
+        with self._lock:
+            return [{"name": key[0], "key": "/".join(str(part) for part in key[1:]), "age_s": now - entry.created_at,
+                     "hits": entry.hits} for key, entry in self._entries.items()]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+shared_resources = SharedResources()
@@ -0,0 +1,255 @@
+# utils/routing_utils.py
+
+import logging
+import random
+import threading
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from configs.config import (CAPABILITY_TIERS, DEFAULT_CAPABILITY_TIER, HEDGE_MIN_SAMPLES, HEDGE_PERCENTILE, MODEL_CATALOG,
+                            MODEL_ROUTER_EXPLORE_RATE, MODEL_ROUTER_MAX_ERROR_RATE, MODEL_ROUTER_MIN_SAMPLES,
+                            MODEL_ROUTER_SWITCH_MARGIN, MODEL_ROUTER_WINDOW, ROUTER_MAX_WORKERS)
+from utils.metrics_utils import metrics_registry, percentile
+from utils.token_utils import compute_max_tokens
+from utils.trace_utils import get_current_span, wrap_context
+
+logger = logging.getLogger(__name__)
+
+_router_executor = None
+_router_executor_lock = threading.Lock()
+
+
+def get_router_executor():
+    """Pool that runs backend calls when a request may be hedged or time out."""
+    global _router_executor
+    with _router_executor_lock:
+        if _router_executor is None:
+            _router_executor = ThreadPoolExecutor(max_workers=ROUTER_MAX_WORKERS, thread_name_prefix="autogroq-router")
+        return _router_executor
+
+
+class Backend:
+    """One provider/model a request can be sent to. The provider instance is built on first use."""
+    def __init__(self, provider, model, llm_provider=None, factory=None):
+        self.provider = provider
+        self.model = model
+        self._llm_provider = llm_provider
+        self._factory = factory
+
+    @property
+    def llm_provider(self):
+        if self._llm_provider is None:
+            self._llm_provider = self._factory(self.provider)
+        return self._llm_provider
+
+    def __repr__(self):
+        return f"{self.provider}/{self.model}"
+
+
+def call_backend(backend, data):
+    """
+    Send `data` to one backend. Returns (response_data, outcome) where outcome
+    is "ok", "retryable" (no response, connection error, 429 or 5xx: worth
+    trying another backend) or "failed".
+    """
+    if backend.model and data.get("model") != backend.model:
+        data = dict(data, model=backend.model)
+        if data.get("max_tokens") and data.get("messages"):
+            # A fallback model may have a smaller window or output cap than the primary
+            data["max_tokens"] = compute_max_tokens(data["messages"], backend.provider, backend.model, requested=data["max_tokens"])
+    try:
+        llm_provider = backend.llm_provider
+        response = llm_provider.send_request(data)
+    except Exception as e:
+        logger.warning("LLM request to %s failed: %s", backend, str(e))
+        return None, "retryable"
+    if response is None:
+        logger.warning("No response received from %s", backend)
+        return None, "retryable"
+    status_code = getattr(response, "status_code", None)
+    if status_code is not None and (status_code == 429 or status_code >= 500):
+        logger.warning("%s returned status %s", backend, status_code)
+        return None, "retryable"
+    try:
+        response_data = llm_provider.process_response(response)
+    except Exception as e:
+        logger.error("LLM request to %s failed: %s", backend, str(e))
+        return None, "failed"
+    if response_data and response_data.get("choices"):
+        return response_data, "ok"
+    logger.error("Unexpected response format from %s. 'choices' field missing or empty.", backend)
+    return None, "failed"
+
+
+def get_launch_delay(backend, latency_slo=None, hedge=False):
+    """
+    How long to wait on `backend` before also starting the next backend: the
+    latency SLO, or with hedging the backend's recent p95 if that is sooner.
+    None means wait for the backend to finish.
+    """
+    delay = latency_slo
+    if hedge:
+        latencies = metrics_registry.get_latencies(backend.provider, backend.model)
+        if len(latencies) >= HEDGE_MIN_SAMPLES:
+            hedge_delay = percentile(latencies, HEDGE_PERCENTILE)
+            delay = hedge_delay if delay is None else min(delay, hedge_delay)
+    return delay
+
+
+def send_with_failover(backends, data, latency_slo=None, hedge=False):
+    """
+    Send `data` to the first backend and fall back to the next one when it
+    returns 429/5xx or no response. With a latency SLO or hedging, a backend
+    that is still running after its launch delay gets company: the next
+    backend is started too, and whichever answers successfully first wins.
+    Returns (response_data, backend), or (None, None) if every backend failed.
+    """
+    if latency_slo is None and not hedge:
+        return _send_sequential(backends, data)
+    return _send_concurrent(backends, data, latency_slo, hedge)
+
+
+def _send_sequential(backends, data):
+    for index, backend in enumerate(backends):
+        if index > 0:
+            metrics_registry.record_failover(backends[0].provider, backend.provider, "error")
+        response_data, outcome = call_backend(backend, data)
+        if outcome == "ok":
+            return response_data, backend
+        if outcome == "failed":
+            break
+    return None, None
+
+
+def _send_concurrent(backends, data, latency_slo, hedge):
+    executor = get_router_executor()
+    pending = {}
+    launched = []
+    raced = False
+
+    def launch(reason):
+        backend = backends[len(launched)]
+        if launched:
+            metrics_registry.record_failover(backends[0].provider, backend.provider, reason)
+            logger.info("Starting %s alongside %s (%s)", backend, launched[-1], reason)
+        launched.append(backend)
+        pending[executor.submit(wrap_context(call_backend), backend, data)] = backend
+
+    launch(None)
+    while pending:
+        delay = get_launch_delay(launched[-1], latency_slo, hedge) if len(launched) < len(backends) else None
+        done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+        if not done:
+            launch("hedge" if hedge else "slo")
+            raced = True
+            continue
+        for future in done:
+            backend = pending.pop(future)
+            response_data, outcome = future.result()
+            if outcome == "ok":
+                if raced:
+                    metrics_registry.record_hedge("primary" if backend is backends[0] else "backup")
+                current = get_current_span()
+                if current is not None:
+                    current.set_attributes(backend=repr(backend), backends_tried=len(launched))
+                for other in pending:
+                    other.cancel()
+                return response_data, backend
+            if outcome == "retryable" and not pending and len(launched) < len(backends):
+                launch("error")
+    return None, None
+
+
+class ModelRouter:
+    """
+    Places agents on models. Rolling latency, throughput and error stats per
+    (provider, model) come from the recent LLM calls in the metrics registry;
+    choose() picks the fastest catalog model that meets an agent's capability
+    tier and context requirement, and keeps an agent where it is unless its
+    model degrades or another one is clearly faster.
+    """
+    def __init__(self, catalog=None, registry=None, window=MODEL_ROUTER_WINDOW, min_samples=MODEL_ROUTER_MIN_SAMPLES,
+                 max_error_rate=MODEL_ROUTER_MAX_ERROR_RATE, switch_margin=MODEL_ROUTER_SWITCH_MARGIN,
+                 explore_rate=MODEL_ROUTER_EXPLORE_RATE, rng=None):
+        self.catalog = MODEL_CATALOG if catalog is None else catalog
+        self.registry = registry or metrics_registry
+        self.window = window
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.switch_margin = switch_margin
+        self.explore_rate = explore_rate
+        self.rng = rng or random.Random()
+
+    def get_stats(self):
+        """{(provider, model): {"calls", "error_rate", "latency_p50", "latency_p95", "tokens_per_second"}}"""
+        recent = {}
+        for record in self.registry.get_records("llm"):
+            recent.setdefault((record["name"], record["model"]), []).append(record)
+        stats = {}
+        for key, records in recent.items():
+            records = records[-self.window:]
+            ok = [record for record in records if record["status"] == "ok"]
+            latencies = sorted(record["wall_time"] for record in ok)
+            tokens = sum(record["completion_tokens"] or 0 for record in ok)
+            busy = sum(record["wall_time"] for record in ok)
+            stats[key] = {
+                "calls": len(records),
+                "error_rate": 1 - len(ok) / len(records),
+                "latency_p50": percentile(latencies, 50),
+                "latency_p95": percentile(latencies, 95),
+                "tokens_per_second": tokens / busy if tokens and busy else None
+            }
+        return stats
+
+    def get_candidates(self, tier=None, min_context=None, providers=None):
+        """Catalog models at or above `tier` with at least `min_context` tokens, least capable first."""
+        tier = tier if tier in CAPABILITY_TIERS else DEFAULT_CAPABILITY_TIER
+        rank = CAPABILITY_TIERS.index(tier)
+        candidates = []
+        for provider, models in self.catalog.items():
+            if providers is not None and provider not in providers:
+                continue
+            for model, info in models.items():
+                if info.get("tier") not in CAPABILITY_TIERS:
+                    continue
+                model_rank = CAPABILITY_TIERS.index(info["tier"])
+                if model_rank >= rank and (not min_context or info.get("context_window", 0) >= min_context):
+                    candidates.append((model_rank, provider, model))
+        return [(provider, model) for _, provider, model in sorted(candidates, key=lambda item: item[0])]
+
+    def is_healthy(self, stats):
+        return stats is None or stats["calls"] < self.min_samples or stats["error_rate"] <= self.max_error_rate
+
+    def choose(self, tier=None, min_context=None, providers=None, current=None):
+        """
+        Return the (provider, model) an agent should use next, or `current` if
+        no catalog model qualifies. `providers` limits the choice to backends
+        the session can reach.
+        """
+        candidates = self.get_candidates(tier, min_context, providers)
+        if not candidates:
+            return current
+        stats = self.get_stats()
+        healthy = [key for key in candidates if self.is_healthy(stats.get(key))]
+        if not healthy:
+            # Everything is degraded: go with whatever fails least
+            return min(candidates, key=lambda key: stats[key]["error_rate"])
+
+        unmeasured = [key for key in healthy if stats.get(key, {}).get("calls", 0) < self.min_samples]
+        if unmeasured and self.rng.random() < self.explore_rate:
+            return self.rng.choice(unmeasured)
+        measured = [key for key in healthy if key not in unmeasured and stats[key]["latency_p50"] is not None]
+        if not measured:
+            return current if current in healthy else healthy[0]
+
+        best = min(measured, key=lambda key: stats[key]["latency_p50"])
+        if current in healthy:
+            current_latency = stats.get(current, {}).get("latency_p50")
+            if current_latency is None or current_latency <= stats[best]["latency_p50"] * (1 + self.switch_margin):
+                return current
+        if current is not None and current != best:
+            logger.info("Moving agent from %s to %s (%s)", "/".join(current), "/".join(best),
+                        "degraded" if current in candidates and current not in healthy else "faster")
+        return best
+
+
+model_router = ModelRouter()
@@ -60,6 +60,9 @@ def initialize_session_variables():
     if "discussion_history" not in st.session_state:
         st.session_state.discussion_history = ""
 
+    if "discussion_turns" not in st.session_state:
+        st.session_state.discussion_turns = []
+
     if "last_agent" not in st.session_state:
         st.session_state.last_agent = ""
 
@@ -0,0 +1,131 @@
+# utils/token_utils.py
+
+import functools
+import logging
+import threading
+
+from configs.config import (CHARS_PER_TOKEN, DEFAULT_CONTEXT_WINDOW, DEFAULT_MAX_OUTPUT, MIN_COMPLETION_TOKENS,
+                            MODEL_CATALOG, TOKEN_SAFETY_MARGIN)
+
+logger = logging.getLogger(__name__)
+
+# Tokens a chat message costs on top of its content (role, separators), and per request
+MESSAGE_OVERHEAD_TOKENS = 4
+REQUEST_OVERHEAD_TOKENS = 3
+
+
+def get_model_info(provider, model):
+    """
+    Metadata for `model` from MODEL_CATALOG: exact match first, then the
+    longest catalog name the model starts with (so dated or suffixed variants
+    inherit their family's limits). `provider` None searches every provider.
+    Unknown models get DEFAULT_CONTEXT_WINDOW / DEFAULT_MAX_OUTPUT.
+    """
+    catalogs = [MODEL_CATALOG.get(provider, {})] if provider else list(MODEL_CATALOG.values())
+    info = None
+    for models in catalogs:
+        if model in models:
+            info = models[model]
+            break
+    if info is None and model:
+        prefixes = [name for models in catalogs for name in models if model.startswith(name)]
+        if prefixes:
+            longest = max(prefixes, key=len)
+            info = next(models[longest] for models in catalogs if longest in models)
+    info = info or {}
+    return {
+        "context_window": info.get("context_window", DEFAULT_CONTEXT_WINDOW),
+        "max_output": info.get("max_output", DEFAULT_MAX_OUTPUT),
+        "tokenizer": info.get("tokenizer")
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding(name):
+    """The tiktoken encoding `name`, or None if tiktoken or its encoding file is unavailable."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        # Missing package or no network to fetch the BPE file: fall back to the heuristic for good
+        logger.info("tiktoken encoding %s unavailable, estimating tokens instead: %s", name, e)
+        return None
+
+
+class TokenCounter:
+    """
+    Counts tokens per model: exactly with tiktoken for models whose encoding
+    is known, otherwise from a characters-per-token ratio that starts at
+    CHARS_PER_TOKEN and is calibrated against the prompt token counts that
+    providers report back.
+    """
+    def __init__(self, chars_per_token=None):
+        self._lock = threading.Lock()
+        self.defaults = dict(CHARS_PER_TOKEN if chars_per_token is None else chars_per_token)
+        self.ratios = {}
+
+    def get_encoding(self, provider, model):
+        tokenizer = get_model_info(provider, model)["tokenizer"]
+        return _get_encoding(tokenizer) if tokenizer else None
+
+    def get_ratio(self, provider, model):
+        with self._lock:
+            ratio = self.ratios.get((provider, model))
+        if ratio is None:
+            ratio = self.defaults.get(provider, self.defaults.get("default", 4.0))
+        return ratio
+
+    def count(self, text, provider=None, model=None):
+        if not text:
+            return 0
+        encoding = self.get_encoding(provider, model)
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return int(len(text) / self.get_ratio(provider, model)) + 1
+
+    def count_messages(self, messages, provider=None, model=None):
+        return REQUEST_OVERHEAD_TOKENS + sum(
+            MESSAGE_OVERHEAD_TOKENS + self.count(message.get("content") or "", provider, model) for message in messages
+        )
+
+    def calibrate(self, provider, model, messages, prompt_tokens):
+        """Fold a provider-reported prompt token count into the model's chars-per-token ratio."""
+        if not prompt_tokens or self.get_encoding(provider, model) is not None:
+            return
+        content_tokens = prompt_tokens - REQUEST_OVERHEAD_TOKENS - MESSAGE_OVERHEAD_TOKENS * len(messages)
+        chars = sum(len(message.get("content") or "") for message in messages)
+        if content_tokens <= 0 or chars == 0:
+            return
+        observed = chars / content_tokens
+        key = (provider, model)
+        with self._lock:
+            previous = self.ratios.get(key)
+            # Moving average, so one odd request does not swing the estimate
+            self.ratios[key] = observed if previous is None else 0.8 * previous + 0.2 * observed
+
+
+token_counter = TokenCounter()
+
+
+def count_tokens(text, provider=None, model=None):
+    return token_counter.count(text, provider, model)
+
+
+def count_message_tokens(messages, provider=None, model=None):
+    return token_counter.count_messages(messages, provider, model)
+
+
+def compute_max_tokens(messages, provider=None, model=None, requested=None):
+    """
+    The completion budget for a request: min(requested, the model's output
+    cap, context window - prompt tokens - TOKEN_SAFETY_MARGIN). The window
+    term never drops below MIN_COMPLETION_TOKENS. Asking for more than the
+    model can produce gets requests rejected (400) or queued behind larger
+    reservations.
+    """
+    info = get_model_info(provider, model)
+    available = info["context_window"] - count_message_tokens(messages, provider, model) - TOKEN_SAFETY_MARGIN
+    max_tokens = min(info["max_output"], max(available, MIN_COMPLETION_TOKENS))
+    if requested:
+        max_tokens = min(max_tokens, requested)
+    return max_tokens
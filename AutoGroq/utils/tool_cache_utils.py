@@ -0,0 +1,70 @@
+# utils/tool_cache_utils.py
+
+import hashlib
+import json
+import logging
+
+from configs.config import TOOL_RESULT_CACHE_SIZE
+from utils.resource_utils import SharedResources
+
+logger = logging.getLogger(__name__)
+
+# Results of pure and idempotent tools, shared by all sessions and keyed on
+# (tool name, tool source digest, normalized arguments[, LLM scope])
+tool_result_cache = SharedResources(max_entries=TOOL_RESULT_CACHE_SIZE)
+
+
+def is_cacheable(tool):
+    return bool(getattr(tool, "pure", False) or getattr(tool, "cache_ttl", None))
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    return value
+
+
+def normalize_args(args, kwargs):
+    """
+    Digest of a call's arguments. Surrounding whitespace on strings and the
+    order of keyword arguments do not change it.
+    """
+    payload = json.dumps([_normalize(list(args)), _normalize(kwargs)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_error_result(result):
+    """Tools report failures as "Error..." strings or {"status": "error"} dicts; those are never reused."""
+    if isinstance(result, str):
+        return result.startswith("Error")
+    if isinstance(result, dict):
+        return result.get("status") == "error"
+    return False
+
+
+def run_tool(tool, function, *args, llm_scope=None, **kwargs):
+    """
+    Call `function`, the implementation of `tool`, with the given arguments.
+    For a pure tool, or one with a cache_ttl, an earlier result for the same
+    tool source and arguments is returned instead of running it again; pure
+    results are kept until evicted, the others for cache_ttl seconds.
+    Concurrent identical calls run the tool once. Errors are not kept.
+
+    A tool with uses_llm set answers through the caller's LLM, so its results
+    are also keyed on `llm_scope` (the provider, model and generation
+    settings it will use); without one it is not cached.
+    """
+    if not is_cacheable(tool) or (getattr(tool, "uses_llm", False) and llm_scope is None):
+        return function(*args, **kwargs)
+    name = f"tool:{tool.name}"
+    key = (tool.get_content_hash(), normalize_args(args, kwargs))
+    if getattr(tool, "uses_llm", False):
+        key += (normalize_args(llm_scope, {}),)
+    result = tool_result_cache.get(name, lambda: function(*args, **kwargs), *key, ttl=tool.cache_ttl)
+    if is_error_result(result):
+        tool_result_cache.invalidate(name, *key)
+    return result
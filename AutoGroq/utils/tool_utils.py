@@ -2,8 +2,8 @@
 import datetime
 import importlib
 import json
+import logging
 import os
-import re
 import sqlite3
 import streamlit as st
 import uuid
@@ -13,23 +13,19 @@ from prompts import get_generate_tool_prompt
 from utils.api_utils import get_api_key
 from utils.db_utils import sql_to_db
 from utils.file_utils import regenerate_zip_files
+from utils.parse_utils import parse_docstring, parse_function_name, parse_imports, parse_secrets
+from utils.resource_utils import shared_resources
 from utils.ui_utils import get_llm_provider
 
+logger = logging.getLogger(__name__)
+
 
 def create_tool_data(python_code):
     # Extract the function name from the Python code
-    function_name_match = re.search(r"def\s+(\w+)\(", python_code)
-    if function_name_match:
-        function_name = function_name_match.group(1)    
-    else:
-        function_name = "unnamed_function"
+    function_name = parse_function_name(python_code) or "unnamed_function"
 
     # Extract the tool description from the docstring
-    docstring_match = re.search(r'"""(.*?)"""', python_code, re.DOTALL)
-    if docstring_match:
-        tool_description = docstring_match.group(1).strip()
-    else:
-        tool_description = "No description available"
+    tool_description = parse_docstring(python_code) or "No description available"
 
     # Get the current timestamp
     current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -50,22 +46,20 @@ def create_tool_data(python_code):
     libraries = []
     
     # Simple regex to find import statements
-    import_pattern = r'import\s+(\w+)'
-    libraries = re.findall(import_pattern, python_code)
+    libraries = parse_imports(python_code)
     
     # Simple regex to find potential API keys or secrets
-    secret_pattern = r'([A-Z_]+_API_KEY|[A-Z_]+_SECRET)'
-    secrets = re.findall(secret_pattern, python_code)
+    secrets = parse_secrets(python_code)
     
     st.session_state.tool_model.secrets = [{"secret": s, "value": None} for s in secrets]
     st.session_state.tool_model.libraries = libraries
 
 
 def export_tool_as_skill(tool_name: str, edited_skill: str):
-    print(f"Exporting skill '{tool_name}'...")
+    logger.debug("Exporting skill '%s'...", tool_name)
     try:
         create_tool_data(edited_skill)
-        print(f"Skill data: {st.session_state.tool_model.to_dict()}")
+        logger.debug("Skill data: %s", st.session_state.tool_model.to_dict())
         current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         skill_tuple = (
             str(uuid.uuid4()),  # id (TEXT)
@@ -79,7 +73,7 @@ def export_tool_as_skill(tool_name: str, edited_skill: str):
             json.dumps(st.session_state.tool_model.secrets),  # secrets (TEXT)
             json.dumps(st.session_state.tool_model.libraries)  # libraries (TEXT)
         )
-        print(f"Inserting skill data: {skill_tuple}")
+        logger.debug("Inserting skill data: %s", skill_tuple)
         sql = """
         INSERT INTO skill (id, created_at, updated_at, user_id, version, name, content, description, secrets, libraries) 
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
@@ -88,8 +82,8 @@ def export_tool_as_skill(tool_name: str, edited_skill: str):
         st.success(f"Skill '{tool_name}' exported to Autogen successfully!")
     except sqlite3.Error as e:
         st.error(f"Error exporting skill: {str(e)}")
-        print(f"Error exporting skill: {str(e)}")
-        print(f"Skill tuple: {skill_tuple}")  
+        logger.error("Error exporting skill: %s", str(e))
+        logger.debug("Skill tuple: %s", skill_tuple)
 
 
 def generate_tool(rephrased_tool_request):  
@@ -114,34 +108,30 @@ def generate_tool(rephrased_tool_request):
     response = llm_provider.send_request(llm_request_data)
     if response.status_code == 200:
         response_data = llm_provider.process_response(response)
-        print(f"Response data: {response_data}")
+        logger.debug("Response data: %s", response_data)
         if "choices" in response_data and response_data["choices"]:
             proposed_tool = response_data["choices"][0]["message"]["content"].strip()
-            match = re.search(r"def\s+(\w+)\(", proposed_tool)
-            if match:
-                tool_name = match.group(1)
+            tool_name = parse_function_name(proposed_tool)
+            if tool_name:
                 
                 # Update the st.session_state.tool_model with the proposed tool data
                 create_tool_data(proposed_tool)
                 
                 return proposed_tool, tool_name
             else:
-                print("Error: Failed to extract tool name from the proposed tool.")
+                logger.error("Failed to extract tool name from the proposed tool.")
                 return None, None
     return None, None
 
 
 def extract_tool_description(proposed_tool):
-    docstring_match = re.search(r'"""(.*?)"""', proposed_tool, re.DOTALL)
-    if docstring_match:
-        return docstring_match.group(1).strip()
-    else:
-        return "No description available"
+    return parse_docstring(proposed_tool) or "No description available"
 
 
-def load_tool_functions():
-    st.session_state.tool_functions = {}
-    st.session_state.tool_models = []
+def discover_tools():
+    """Import every module in tools/ and collect the ToolBaseModel its get_tool() returns."""
+    tool_models = []
+    tool_functions = {}
 
     parent_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     tools_folder_path = os.path.join(parent_directory, 'tools')
@@ -155,23 +145,32 @@ def load_tool_functions():
             if hasattr(tool_module, 'get_tool'):
                 tool = tool_module.get_tool()
                 if isinstance(tool, ToolBaseModel):
-                    st.session_state.tool_models.append(tool)
-                    st.session_state.tool_functions[tool.name] = tool.function
-                    print(f"Loaded tool: {tool.name}")
+                    tool_models.append(tool)
+                    tool_functions[tool.name] = tool.function
+                    logger.debug("Loaded tool: %s", tool.name)
                 else:
-                    print(f"Warning: get_tool() in {tool_file} did not return a ToolBaseModel instance")
+                    logger.warning("get_tool() in %s did not return a ToolBaseModel instance", tool_file)
             else:
-                print(f"Warning: {tool_file} does not have a get_tool() function")
+                logger.warning("%s does not have a get_tool() function", tool_file)
         except Exception as e:
-            print(f"Error loading tool from {tool_file}: {str(e)}")
+            logger.error("Error loading tool from %s: %s", tool_file, str(e))
 
-    print(f"Loaded {len(st.session_state.tool_models)} tools.")
+    logger.debug("Loaded %s tools.", len(tool_models))
     
     # Debug: Print loaded tools
-    for tool in st.session_state.tool_models:
-        print(f"Loaded tool model: {tool.name}")
-    for tool_name, tool_function in st.session_state.tool_functions.items():
-        print(f"Loaded tool function: {tool_name} -> {tool_function}")
+    for tool in tool_models:
+        logger.debug("Loaded tool model: %s", tool.name)
+    for tool_name, tool_function in tool_functions.items():
+        logger.debug("Loaded tool function: %s -> %s", tool_name, tool_function)
+    return tuple(tool_models), tool_functions
+
+
+def load_tool_functions():
+    # The tools folder is scanned once per process and shared by every session
+    tool_models, tool_functions = shared_resources.get("tools", discover_tools)
+    st.session_state.tool_functions = tool_functions
+    # Per-session list, since users can add generated tools to it
+    st.session_state.tool_models = list(tool_models)
         
 
 def populate_tool_models():
@@ -213,9 +212,8 @@ def process_tool_request():
         if rephrased_tool_request:
             proposed_tool, tool_name = generate_tool(rephrased_tool_request)
             if proposed_tool:
-                match = re.search(r"def\s+(\w+(?:_\w+)*)\(", proposed_tool)
-                if match:
-                    tool_name = match.group(1)
+                tool_name = parse_function_name(proposed_tool)
+                if tool_name:
                     st.write(f"Proposed tool: {tool_name}")
                     st.code(proposed_tool)
 
@@ -253,7 +251,7 @@ def process_tool_request():
 
 
 def rephrase_tool(tool_request):
-    print("Debug: Rephrasing tool: ", tool_request)
+    logger.debug("Rephrasing tool: %s", tool_request)
     temperature_value = st.session_state.get('temperature', 0.1)
     llm_request_data = {
         "model": st.session_state.model,
@@ -281,7 +279,7 @@ def rephrase_tool(tool_request):
         response_data = llm_provider.process_response(response)
         if "choices" in response_data and response_data["choices"]:
             rephrased = response_data["choices"][0]["message"]["content"].strip()
-            print(f"Debug: Rephrased tool: {rephrased}")
+            logger.debug("Rephrased tool: %s", rephrased)
             return rephrased
     return None                
 
@@ -0,0 +1,223 @@
+# utils/trace_utils.py
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from collections import OrderedDict
+from configs.config import TRACE_EXPORT_PATH, TRACE_HISTORY_SIZE
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar("autogroq_current_span", default=None)
+
+
+class Span:
+    """One timed unit of work. Spans nest through a context variable, so a
+    span opened while another is active becomes its child."""
+    def __init__(self, name, trace_id=None, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.end = None
+        self.status = "ok"
+        self.error = None
+        self.thread = threading.current_thread().name
+
+    @property
+    def duration(self):
+        return (self.end or time.time()) - self.start
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end,
+            "duration": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "thread": self.thread,
+            "attributes": self.attributes
+        }
+
+
+class JsonlSpanExporter:
+    """Appends each finished span as one JSON line to `path`."""
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class Tracer:
+    """
+    Keeps the spans of the most recent traces in memory for the Debug tab
+    and hands every finished span to the configured exporters.
+    """
+    def __init__(self, history_size=TRACE_HISTORY_SIZE, exporters=None):
+        self._lock = threading.Lock()
+        self.history_size = history_size
+        self.exporters = list(exporters or [])
+        self.traces = OrderedDict()
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def on_end(self, span):
+        with self._lock:
+            spans = self.traces.get(span.trace_id)
+            if spans is None:
+                spans = self.traces[span.trace_id] = []
+                while len(self.traces) > self.history_size:
+                    self.traces.popitem(last=False)
+            spans.append(span)
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.error("Span export failed: %s", str(e))
+
+    def get_traces(self):
+        """Return [(root span, [spans])] for finished traces, newest first."""
+        with self._lock:
+            traces = [(trace_id, list(spans)) for trace_id, spans in self.traces.items()]
+        result = []
+        for trace_id, spans in reversed(traces):
+            root = next((span for span in spans if span.parent_id is None), None)
+            if root is not None:
+                result.append((root, spans))
+        return result
+
+    def clear(self):
+        with self._lock:
+            self.traces.clear()
+
+    def to_jsonl(self):
+        with self._lock:
+            spans = [span for trace in self.traces.values() for span in trace]
+        return "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+
+
+tracer = Tracer(exporters=[JsonlSpanExporter(TRACE_EXPORT_PATH)] if TRACE_EXPORT_PATH else None)
+
+
+def get_tracer():
+    return tracer
+
+
+def get_current_span():
+    return _current_span.get()
+
+
+class span:
+    """
+    Context manager that opens a child of the current span (or a new trace):
+
+        with span("export_data", agents=len(agents)) as current:
+            current.set_attribute("rows", rows)
+    """
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.span = Span(self.name, trace_id=parent.trace_id if parent else None,
+                         parent_id=parent.span_id if parent else None, attributes=self.attributes)
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.span.end = time.time()
+        if exc_type is not None:
+            self.span.status = "error"
+            self.span.error = str(exc_value)
+        _current_span.reset(self._token)
+        tracer.on_end(self.span)
+        return False
+
+
+def traced(name=None):
+    """Decorator form of span(); the span is named after the function by default."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def wrap_context(func):
+    """
+    Bind `func` to a copy of the caller's context so spans opened on a
+    worker thread (executor.submit / map) attach to the caller's span.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # A Context can only be entered by one thread at a time
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+
+def build_flame_rows(spans):
+    """
+    Lay a trace out for a flame-style chart: one row per span with its
+    offset from the trace start, duration and depth in the call tree.
+    """
+    if not spans:
+        return []
+    children = {}
+    for current in spans:
+        children.setdefault(current.parent_id, []).append(current)
+    trace_start = min(current.start for current in spans)
+    rows = []
+
+    def visit(current, depth):
+        rows.append({
+            "name": current.name,
+            "depth": depth,
+            "start": current.start - trace_start,
+            "end": (current.end or current.start) - trace_start,
+            "duration": current.duration,
+            "status": current.status,
+            "thread": current.thread,
+            "attributes": json.dumps(current.attributes, default=str)
+        })
+        for child in sorted(children.get(current.span_id, []), key=lambda child: child.start):
+            visit(child, depth + 1)
+
+    span_ids = {current.span_id for current in spans}
+    roots = [current for current in spans if current.parent_id is None or current.parent_id not in span_ids]
+    for root in sorted(roots, key=lambda root: root.start):
+        visit(root, 0)
+    return rows
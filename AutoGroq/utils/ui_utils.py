@@ -1,106 +1,212 @@
-import datetime
-import json
+import gzip
+import io
 import os
-import pandas as pd
-import re
-import requests
+import secrets
 import streamlit as st
 import time
 
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-from configs.config import (DEBUG, LLM_PROVIDER, MAX_RETRIES, 
-        FALLBACK_MODEL_TOKEN_LIMITS, RETRY_DELAY, SUPPORTED_PROVIDERS)
+from configs.config import (AUTO_MODERATION_MAX_CYCLES, DEBUG, LLM_PROVIDER, MAX_RETRIES, 
+        FALLBACK_MODEL_TOKEN_LIMITS, REFERENCE_PAGE_TTL, RETRY_DELAY, SESSION_MEMORY_BUDGET_MB, SUPPORTED_PROVIDERS)
 
-from anthropic.types import Message
-from configs.current_project import Current_Project
+from engine import AutoGroqEngine, EngineConfig, create_agents, format_moderated_input, parse_json
 from models.agent_base_model import AgentBaseModel
 from models.workflow_base_model import WorkflowBaseModel
-from prompts import create_project_manager_prompt, get_agents_prompt, get_rephrased_user_prompt, get_moderator_prompt  
+from orchestrator import STOP_CONDITIONS, AutoModerationRun
 from tools.fetch_web_content import fetch_web_content
 from typing import Any, List, Dict, Tuple
-from utils.agent_utils import create_agent_data
-from utils.api_utils import fetch_available_models, get_api_key, get_llm_provider
+from utils.api_utils import extract_content, fetch_available_models, get_api_key, get_llm_provider
 from utils.auth_utils import display_api_key_input
+from utils.bundle_utils import export_session_bundle, import_bundle
 from utils.db_utils import export_to_autogen
-from utils.file_utils import zip_files_in_memory
-from utils.workflow_utils import get_workflow_from_agents
+from utils.memory_utils import get_process_rss, load_buffer, measure_session
+from utils.metrics_utils import metrics_registry
+from utils.resource_utils import shared_resources
+from utils.routing_utils import model_router
+from utils.tool_cache_utils import tool_result_cache
+from utils.trace_utils import build_flame_rows, tracer
+from utils.persistence_utils import get_project_store, record_deliverables, record_whiteboard, restore_project
+from utils.parse_utils import extract_code_blocks, extract_json_objects, find_url
     
 
-def create_agents(json_data: List[Dict[str, Any]]) -> Tuple[List[AgentBaseModel], List[Dict[str, Any]]]:
-    autogen_agents = []
-    crewai_agents = []
-    
-    for agent_data in json_data:
-        expert_name = agent_data.get('expert_name', '')
-        description = agent_data.get('description', '')
-        
-        if not expert_name:
-            print("Missing agent name. Skipping...")
-            continue
-
-        autogen_agent_data, crewai_agent_data = create_agent_data({
-            "name": expert_name,
-            "description": description,
-            "role": agent_data.get('role', expert_name),
-            "goal": agent_data.get('goal', f"Assist with tasks related to {description}"),
-            "backstory": agent_data.get('backstory', f"As an AI assistant, I specialize in {description}")
-        })
-        
-        try:
-            agent_model = AgentBaseModel(
-                name=autogen_agent_data['name'],
-                description=autogen_agent_data['description'],
-                tools=autogen_agent_data.get('tools', []),
-                config=autogen_agent_data.get('config', {}),
-                role=autogen_agent_data['role'],
-                goal=autogen_agent_data['goal'],
-                backstory=autogen_agent_data['backstory'],
-                provider=autogen_agent_data.get('provider', ''),
-                model=autogen_agent_data.get('model', '')
-            )
-            print(f"Created agent: {agent_model.name} with description: {agent_model.description}")
-            autogen_agents.append(agent_model)
-            crewai_agents.append(crewai_agent_data)
-        except Exception as e:
-            print(f"Error creating agent {expert_name}: {str(e)}")
-            print(f"Agent data: {autogen_agent_data}")
-            continue
+def create_project_manager(rephrased_text):
+    return get_session_engine().create_project_manager(rephrased_text)
 
-    return autogen_agents, crewai_agents
 
+def display_auto_moderation_controls():
+    auto_moderation_run = st.session_state.get("auto_moderation_run")
+    with st.expander("Autonomous run"):
+        if auto_moderation_run is not None and auto_moderation_run.is_running:
+            st.button("Stop", key="stop_auto_moderation_button", on_click=auto_moderation_run.stop)
+            return
+        max_cycles = st.number_input("Max cycles", min_value=1, max_value=100, value=AUTO_MODERATION_MAX_CYCLES, key="auto_moderation_max_cycles")
+        stop_on = st.selectbox("Stop when", options=STOP_CONDITIONS, index=STOP_CONDITIONS.index("deliverable"),
+                               format_func=lambda condition: f"{condition} is completed", key="auto_moderation_stop_on")
+        speculative = st.checkbox("Overlap moderator with agent turns", key="auto_moderation_speculative")
+        st.button("Start", key="start_auto_moderation_button", on_click=start_auto_moderation, args=(int(max_cycles), stop_on, speculative))
 
-def create_project_manager(rephrased_text):
-    print(f"Creating Project Manager")
-    temperature_value = st.session_state.get('temperature', 0.1)
-    llm_request_data = {
-        "model": st.session_state.model,
-        "temperature": st.session_state.temperature,
-        "max_tokens": st.session_state.max_tokens,
-        "top_p": 1,
-        "stop": "TERMINATE",
-        "messages": [
-            {
-                "role": "user",
-                "content": create_project_manager_prompt(rephrased_text)    
-            }
-        ]
-    }
 
-    api_key = get_api_key()
-    llm_provider = get_llm_provider(api_key=api_key)
-    response = llm_provider.send_request(llm_request_data)
-    
-    if response is not None:
-        response_data = llm_provider.process_response(response)
-        if "choices" in response_data and response_data["choices"]:
-            content = response_data["choices"][0]["message"]["content"]
-            return content.strip()
-    
-    return None
+@st.experimental_fragment(run_every=2)
+def display_auto_moderation_progress():
+    auto_moderation_run = st.session_state.get("auto_moderation_run")
+    if auto_moderation_run is None:
+        return
+    st.session_state.auto_moderation_version = auto_moderation_run.merge_into(
+        st.session_state, st.session_state.get("auto_moderation_version"))
+
+    st.caption(f"Autonomous run: {auto_moderation_run.status} ({auto_moderation_run.cycles}/{auto_moderation_run.max_cycles} cycles)")
+    for _, kind, text in auto_moderation_run.get_events()[-6:]:
+        st.text(f"[{kind}] {text}")
+
+    if not auto_moderation_run.is_running and st.session_state.get("auto_moderation_finished") != auto_moderation_run.id:
+        # One full rerun so the discussion, deliverables and sidebar pick up the final state
+        st.session_state.auto_moderation_finished = auto_moderation_run.id
+        st.rerun()
+
+
+def display_debug_details():
+    if "project_model" in st.session_state:
+        project_model = st.session_state.project_model
+        with st.expander("Project Details"):
+            st.write("ID:", project_model.id)
+            st.write("Re-engineered Prompt:", project_model.re_engineered_prompt)
+            st.write("Deliverables:", project_model.deliverables)
+            st.write("Created At:", project_model.created_at)
+            st.write("Updated At:", project_model.updated_at)
+            st.write("User ID:", project_model.user_id)
+            st.write("Name:", project_model.name)
+            st.write("Description:", project_model.description)
+            st.write("Status:", project_model.status)
+            st.write("Due Date:", project_model.due_date)
+            st.write("Priority:", project_model.priority)
+            st.write("Tags:", project_model.tags)
+            st.write("Attachments:", project_model.attachments)
+            st.write("Notes:", project_model.notes)
+            st.write("Collaborators:", project_model.collaborators)
+            st.write("Workflows:", project_model.workflows)
+            if project_model.tools:
+                st.write("Tools:")
+                for tool in project_model.tools:
+                    substring = "init"
+                    if not substring in tool.name:
+                        st.write(f"- {tool.name}")
+                        st.code(tool.content, language="python")
+            else:
+                st.write("Tools: []")
+
+
+    if "project_model" in st.session_state and st.session_state.project_model.workflows:
+        workflow_data = st.session_state.project_model.workflows[0]
+        workflow = WorkflowBaseModel.from_dict({**workflow_data, 'settings': workflow_data.get('settings', {})})
+        with st.expander("Workflow Details"):
+            st.write("ID:", workflow.id)
+            st.write("Name:", workflow.name)
+            st.write("Description:", workflow.description)
+
+            # Display the agents in the workflow
+            st.write("Agents:")
+            for agent in workflow.receiver.groupchat_config["agents"]:
+                st.write(f"- {agent['config']['name']}")
+
+            st.write("Settings:", workflow.settings)    
+            st.write("Created At:", workflow.created_at)
+            st.write("Updated At:", workflow.updated_at)
+            st.write("User ID:", workflow.user_id)
+            st.write("Type:", workflow.type)
+            st.write("Summary Method:", workflow.summary_method)
+
+            # Display sender details
+            st.write("Sender:")
+            st.write("- Type:", workflow.sender.type)
+            st.write("- Config:", workflow.sender.config)
+            st.write("- Timestamp:", workflow.sender.timestamp)
+            st.write("- User ID:", workflow.sender.user_id)
+            st.write("- Tools:", workflow.sender.tools)
+
+            # Display receiver details
+            st.write("Receiver:")
+            st.write("- Type:", workflow.receiver.type)
+            st.write("- Config:", workflow.receiver.config)
+            st.write("- Groupchat Config:", workflow.receiver.groupchat_config)
+            st.write("- Timestamp:", workflow.receiver.timestamp)
+            st.write("- User ID:", workflow.receiver.user_id)
+            st.write("- Tools:", workflow.receiver.tools)
+            st.write("- Agents:", [agent.to_dict() for agent in workflow.receiver.agents])
+
+            st.write("Timestamp:", workflow.timestamp)
+    else:
+        st.warning("No workflow data available.")
+
+
+    if "agents" in st.session_state:
+        with st.expander("Agent Details"):
+            agent_names = ["Select one..."] + [agent.get('name', f"Agent {index + 1}") for index, agent in enumerate(st.session_state.agents)]
+            selected_agent = st.selectbox("Select an agent:", agent_names)
+
+            if selected_agent != "Select one...":
+                agent_index = agent_names.index(selected_agent) - 1
+                agent = st.session_state.agents[agent_index]
+
+                st.subheader(selected_agent)
+                st.write("ID:", agent.get('id'))
+                st.write("Name:", agent.get('name'))
+                st.write("Description:", agent.get('description'))
+
+                # Display the selected tools for the agent
+                st.write("Tools:", ", ".join(agent.get('tools', [])))
+
+                st.write("Config:", agent.get('config'))
+                st.write("Created At:", agent.get('created_at'))
+                st.write("Updated At:", agent.get('updated_at'))
+                st.write("User ID:", agent.get('user_id'))
+                st.write("Workflows:", agent.get('workflows'))
+                st.write("Type:", agent.get('type'))
+                st.write("Models:", agent.get('models'))
+                st.write("Verbose:", agent.get('verbose'))
+                st.write("Allow Delegation:", agent.get('allow_delegation'))
+                st.write("New Description:", agent.get('new_description'))
+                st.write("Timestamp:", agent.get('timestamp'))
+    else:
+        st.warning("No agent data available.")
+
+    if len(st.session_state.tool_models) > 0:
+        with st.expander("Tool Details"):
+            tool_names = ["Select one..."] + [tool.name for tool in st.session_state.tool_models]
+            selected_tool = st.selectbox("Select a tool:", tool_names)
+
+            if selected_tool != "Select one...":
+                tool_index = tool_names.index(selected_tool) - 1
+                tool = st.session_state.tool_models[tool_index]
+
+                st.subheader(selected_tool)
+
+                # Display tool details in a more visually appealing way
+                col1, col2 = st.columns(RETRY_DELAY)
+
+                with col1:
+                    st.markdown(f"**ID:** {tool.id}")
+                    st.markdown(f"**Name:** {tool.name}")
+                    st.markdown(f"**Created At:** {tool.created_at}")
+                    st.markdown(f"**Updated At:** {tool.updated_at}")
+                    st.markdown(f"**User ID:** {tool.user_id}")
+
+                with col2:
+                    st.markdown(f"**Secrets:** {tool.secrets}")
+                    st.markdown(f"**Libraries:** {tool.libraries}")
+                    st.markdown(f"**File Name:** {tool.file_name}")
+                    st.markdown(f"**Timestamp:** {tool.timestamp}")
+                    st.markdown(f"**Title:** {tool.title}")
+
+                st.markdown(f"**Description:** {tool.description}")
+
+                # Display the tool's content in a code block
+                st.markdown("**Content:**")
+                st.code(tool.content, language="python")
+    else:
+        st.warning("No tool data available.")
 
 
 def display_discussion_and_whiteboard():
@@ -124,6 +230,7 @@ def display_discussion_and_whiteboard():
         # Update the whiteboard content in the session state if it has changed
         if new_whiteboard_content != st.session_state.get('whiteboard_content', ''):
             st.session_state.whiteboard_content = new_whiteboard_content
+            record_whiteboard(get_project_store(), st.session_state)
 
     with tabs[2]:
         st.write(discussion_history)
@@ -149,157 +256,21 @@ def display_discussion_and_whiteboard():
                             current_project.deliverables[index]["done"] = False
                             for phase in current_project.implementation_phases:
                                 current_project.deliverables[index]["phase"][phase] = False
+                        record_deliverables(get_project_store(), st.session_state)
 
 
     with tabs[4]:
         display_download_button() 
         if st.button("Export to Autogen"):
             export_to_autogen()
+        display_bundle_download_button()
 
     with tabs[5]:
+        display_metrics_panel()
+        display_memory_panel()
+        display_trace_panel()
         if DEBUG:
-            if "project_model" in st.session_state:
-                project_model = st.session_state.project_model
-                with st.expander("Project Details"):
-                    st.write("ID:", project_model.id)
-                    st.write("Re-engineered Prompt:", project_model.re_engineered_prompt)
-                    st.write("Deliverables:", project_model.deliverables)
-                    st.write("Created At:", project_model.created_at)
-                    st.write("Updated At:", project_model.updated_at)
-                    st.write("User ID:", project_model.user_id)
-                    st.write("Name:", project_model.name)
-                    st.write("Description:", project_model.description)
-                    st.write("Status:", project_model.status)
-                    st.write("Due Date:", project_model.due_date)
-                    st.write("Priority:", project_model.priority)
-                    st.write("Tags:", project_model.tags)
-                    st.write("Attachments:", project_model.attachments)
-                    st.write("Notes:", project_model.notes)
-                    st.write("Collaborators:", project_model.collaborators)
-                    st.write("Workflows:", project_model.workflows)
-                    if project_model.tools:
-                        st.write("Tools:")
-                        for tool in project_model.tools:
-                            substring = "init"
-                            if not substring in tool.name:
-                                st.write(f"- {tool.name}")
-                                st.code(tool.content, language="python")
-                    else:
-                        st.write("Tools: []")
-                    
-
-            if "project_model" in st.session_state and st.session_state.project_model.workflows:
-                workflow_data = st.session_state.project_model.workflows[0]
-                workflow = WorkflowBaseModel.from_dict({**workflow_data, 'settings': workflow_data.get('settings', {})})
-                with st.expander("Workflow Details"):
-                    st.write("ID:", workflow.id)
-                    st.write("Name:", workflow.name)
-                    st.write("Description:", workflow.description)
-                    
-                    # Display the agents in the workflow
-                    st.write("Agents:")
-                    for agent in workflow.receiver.groupchat_config["agents"]:
-                        st.write(f"- {agent['config']['name']}")
-                    
-                    st.write("Settings:", workflow.settings)    
-                    st.write("Created At:", workflow.created_at)
-                    st.write("Updated At:", workflow.updated_at)
-                    st.write("User ID:", workflow.user_id)
-                    st.write("Type:", workflow.type)
-                    st.write("Summary Method:", workflow.summary_method)
-                    
-                    # Display sender details
-                    st.write("Sender:")
-                    st.write("- Type:", workflow.sender.type)
-                    st.write("- Config:", workflow.sender.config)
-                    st.write("- Timestamp:", workflow.sender.timestamp)
-                    st.write("- User ID:", workflow.sender.user_id)
-                    st.write("- Tools:", workflow.sender.tools)
-                    
-                    # Display receiver details
-                    st.write("Receiver:")
-                    st.write("- Type:", workflow.receiver.type)
-                    st.write("- Config:", workflow.receiver.config)
-                    st.write("- Groupchat Config:", workflow.receiver.groupchat_config)
-                    st.write("- Timestamp:", workflow.receiver.timestamp)
-                    st.write("- User ID:", workflow.receiver.user_id)
-                    st.write("- Tools:", workflow.receiver.tools)
-                    st.write("- Agents:", [agent.to_dict() for agent in workflow.receiver.agents])
-                    
-                    st.write("Timestamp:", workflow.timestamp)
-            else:
-                st.warning("No workflow data available.")
-            
-
-            if "agents" in st.session_state:
-                with st.expander("Agent Details"):
-                    agent_names = ["Select one..."] + [agent.get('name', f"Agent {index + 1}") for index, agent in enumerate(st.session_state.agents)]
-                    selected_agent = st.selectbox("Select an agent:", agent_names)
-
-                    if selected_agent != "Select one...":
-                        agent_index = agent_names.index(selected_agent) - 1
-                        agent = st.session_state.agents[agent_index]
-
-                        st.subheader(selected_agent)
-                        st.write("ID:", agent.get('id'))
-                        st.write("Name:", agent.get('name'))
-                        st.write("Description:", agent.get('description'))
-                        
-                        # Display the selected tools for the agent
-                        st.write("Tools:", ", ".join(agent.get('tools', [])))
-                        
-                        st.write("Config:", agent.get('config'))
-                        st.write("Created At:", agent.get('created_at'))
-                        st.write("Updated At:", agent.get('updated_at'))
-                        st.write("User ID:", agent.get('user_id'))
-                        st.write("Workflows:", agent.get('workflows'))
-                        st.write("Type:", agent.get('type'))
-                        st.write("Models:", agent.get('models'))
-                        st.write("Verbose:", agent.get('verbose'))
-                        st.write("Allow Delegation:", agent.get('allow_delegation'))
-                        st.write("New Description:", agent.get('new_description'))
-                        st.write("Timestamp:", agent.get('timestamp'))
-            else:
-                st.warning("No agent data available.")
-
-            if len(st.session_state.tool_models) > 0:
-                with st.expander("Tool Details"):
-                    tool_names = ["Select one..."] + [tool.name for tool in st.session_state.tool_models]
-                    selected_tool = st.selectbox("Select a tool:", tool_names)
-
-                    if selected_tool != "Select one...":
-                        tool_index = tool_names.index(selected_tool) - 1
-                        tool = st.session_state.tool_models[tool_index]
-                        
-                        st.subheader(selected_tool)
-                        
-                        # Display tool details in a more visually appealing way
-                        col1, col2 = st.columns(RETRY_DELAY)
-                        
-                        with col1:
-                            st.markdown(f"**ID:** {tool.id}")
-                            st.markdown(f"**Name:** {tool.name}")
-                            st.markdown(f"**Created At:** {tool.created_at}")
-                            st.markdown(f"**Updated At:** {tool.updated_at}")
-                            st.markdown(f"**User ID:** {tool.user_id}")
-                        
-                        with col2:
-                            st.markdown(f"**Secrets:** {tool.secrets}")
-                            st.markdown(f"**Libraries:** {tool.libraries}")
-                            st.markdown(f"**File Name:** {tool.file_name}")
-                            st.markdown(f"**Timestamp:** {tool.timestamp}")
-                            st.markdown(f"**Title:** {tool.title}")
-
-                        st.markdown(f"**Description:** {tool.description}")
-                        
-                        # Display the tool's content in a code block
-                        st.markdown("**Content:**")
-                        st.code(tool.content, language="python")
-            else:
-                st.warning("No tool data available.")
-
-        else:
-            st.warning("Debugging disabled.")   
+            display_debug_details()
                                     
 
 def display_download_button():
@@ -309,7 +280,7 @@ def display_download_button():
         if st.session_state.get('autogen_zip_buffer') is not None:
             st.download_button(
                 label="Download Autogen Files",
-                data=st.session_state.autogen_zip_buffer,
+                data=load_buffer(st.session_state.autogen_zip_buffer),
                 file_name="autogen_files.zip",
                 mime="application/zip",
                 key=f"autogen_download_button_{int(time.time())}"
@@ -321,7 +292,7 @@ def display_download_button():
         if st.session_state.get('crewai_zip_buffer') is not None:
             st.download_button(
                 label="Download CrewAI Files",
-                data=st.session_state.crewai_zip_buffer,
+                data=load_buffer(st.session_state.crewai_zip_buffer),
                 file_name="crewai_files.zip",
                 mime="application/zip",
                 key=f"crewai_download_button_{int(time.time())}"
@@ -330,6 +301,58 @@ def display_download_button():
             st.warning("CrewAI files are not available for download.")
 
 
+def get_bundle_fingerprint(state):
+    # Agents' JSON is cached, so this is cheap; a new turn or an edited agent makes the prepared bundle stale
+    return (state.get("project_id"), len(state.get("discussion_turns") or []),
+            tuple(agent.to_json() for agent in state.get("agents") or []))
+
+
+def display_bundle_download_button():
+    """
+    The bundle is built only when asked for, not on every rerun, and kept
+    until the project changes.
+    """
+    if not st.session_state.get("agents"):
+        return
+    fingerprint = get_bundle_fingerprint(st.session_state)
+    if st.session_state.get("bundle_fingerprint") != fingerprint:
+        st.session_state.bundle_buffer = None
+    if st.session_state.get("bundle_buffer") is None:
+        if st.button("Prepare Bundle", key="prepare_bundle_button",
+                     help="Collect the project, agents, tools and workflow into one file for download"):
+            st.session_state.bundle_buffer = io.BytesIO(export_session_bundle(st.session_state))
+            st.session_state.bundle_fingerprint = fingerprint
+        else:
+            return
+    st.download_button(
+        label="Download Bundle",
+        data=load_buffer(st.session_state.bundle_buffer),
+        file_name="autogroq_bundle.jsonl.gz",
+        mime="application/gzip",
+        help="The project, agents, tools and workflow in one file that can be imported from the sidebar or with cli/bundle.py",
+        key="bundle_download_button"
+    )
+
+
+def display_bundle_import():
+    with st.sidebar.expander("Import bundle"):
+        uploaded_file = st.file_uploader("AutoGroq bundle", type=["jsonl", "gz"], key="bundle_upload")
+        if uploaded_file is not None and st.button("Import", key="import_bundle_button"):
+            # gzip.BadGzipFile is an OSError and a truncated .gz raises EOFError; bad JSON or text raise ValueError
+            try:
+                data = uploaded_file.getvalue()
+                if uploaded_file.name.endswith(".gz"):
+                    data = gzip.decompress(data)
+                counts = import_bundle(st.session_state, io.StringIO(data.decode("utf-8")), get_project_store())
+            except (ValueError, OSError, EOFError) as e:
+                st.error(f"Could not import bundle: {e}")
+                return
+            if st.session_state.get("project_id"):
+                st.query_params["project"] = st.session_state.project_id
+            logger.info("Imported bundle %s: %s", uploaded_file.name, counts)
+            st.experimental_rerun()
+
+
 def display_download_and_export_buttons():
     display_download_button() 
     if st.button("Export to Autogen"):
@@ -343,22 +366,142 @@ def display_goal():
             st.expander("Goal").markdown(f"**OUR CURRENT GOAL:**\n\r {current_project.re_engineered_prompt}")
 
 
+def display_metrics_panel():
+    summary = metrics_registry.summary()
+
+    def format_seconds(value):
+        return f"{value:.2f}s" if value is not None else "-"
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("LLM calls", summary["llm_calls"], delta=f"{summary['llm_errors']} errors" if summary["llm_errors"] else None, delta_color="inverse")
+    col2.metric("Latency p50 / p95", f"{format_seconds(summary['latency_p50'])} / {format_seconds(summary['latency_p95'])}")
+    col3.metric("Time to first byte p50", format_seconds(summary["ttfb_p50"]))
+    col4.metric("Tokens in / out", f"{summary['prompt_tokens']} / {summary['completion_tokens']}")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Retries / failovers", f"{summary['retries']} / {summary['failovers']}")
+    col2.metric("Rate limited (429)", summary["rate_limited"])
+    col3.metric("Waiting", format_seconds(summary["wait_seconds"]))
+    col4.metric("Cache hit rate", f"{summary['cache_hit_rate']:.0%}" if summary["cache_hit_rate"] is not None else "-",
+                delta=f"{summary['coalesced']} coalesced" if summary["coalesced"] else None, delta_color="off")
+
+    records = metrics_registry.get_records()
+    if records:
+        # pandas is only needed once there is something to tabulate
+        import pandas as pd
+        calls = pd.DataFrame(records)
+        calls["started_at"] = pd.to_datetime(calls["started_at"], unit="s")
+        with st.expander("Per provider / model", expanded=True):
+            llm_calls = calls[calls["kind"] == "llm"]
+            if not llm_calls.empty:
+                st.dataframe(llm_calls.groupby(["name", "model"]).agg(
+                    calls=("wall_time", "size"), mean_s=("wall_time", "mean"), max_s=("wall_time", "max"),
+                    prompt_tokens=("prompt_tokens", "sum"), completion_tokens=("completion_tokens", "sum")
+                ))
+            tool_runs = calls[calls["kind"] == "tool"]
+            if not tool_runs.empty:
+                st.dataframe(tool_runs.groupby("name").agg(runs=("wall_time", "size"), mean_s=("wall_time", "mean"), max_s=("wall_time", "max")))
+        with st.expander("Model routing"):
+            router_stats = model_router.get_stats()
+            if router_stats:
+                placed = {}
+                for agent in st.session_state.get("agents", []):
+                    if getattr(agent, "auto_route", False):
+                        placed.setdefault((agent.provider, agent.model), []).append(agent.name)
+                st.dataframe(pd.DataFrame([
+                    {"provider": provider, "model": model, **stats,
+                     "healthy": model_router.is_healthy(stats), "auto-routed agents": ", ".join(placed.get((provider, model), []))}
+                    for (provider, model), stats in router_stats.items()
+                ]), hide_index=True)
+        with st.expander("Recent calls"):
+            st.dataframe(calls.iloc[::-1], hide_index=True)
+    else:
+        st.info("No LLM calls recorded yet.")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("Download Prometheus metrics", data=metrics_registry.to_prometheus(), file_name="autogroq_metrics.prom", mime="text/plain")
+    with col2:
+        st.download_button("Download JSON metrics", data=metrics_registry.to_json(), file_name="autogroq_metrics.json", mime="application/json")
+    with col3:
+        st.button("Reset metrics", on_click=metrics_registry.reset)
+
+
+def display_memory_panel():
+    st.subheader("Memory")
+    sizes = measure_session(st.session_state)
+    total = sum(size for _, size in sizes)
+    budget = SESSION_MEMORY_BUDGET_MB * 1024 * 1024
+    rss = get_process_rss()
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("This session", f"{total / 1024 / 1024:.1f} MB", delta=f"budget {SESSION_MEMORY_BUDGET_MB} MB", delta_color="off")
+    col2.metric("Server process (RSS)", f"{rss / 1024 / 1024:.0f} MB" if rss else "-")
+    col3.metric("Shared resources", len(shared_resources) + len(tool_result_cache))
+    st.progress(min(total / budget, 1.0))
+
+    with st.expander("Session objects"):
+        st.dataframe([{"key": key, "KB": round(size / 1024, 1)} for key, size in sizes if size >= 1024][:25], hide_index=True)
+    with st.expander("Shared resources"):
+        shared = shared_resources.stats() + tool_result_cache.stats()
+        if shared:
+            st.dataframe(shared, hide_index=True)
+        else:
+            st.info("Nothing shared yet.")
+
+
+def display_trace_panel():
+    traces = tracer.get_traces()
+    st.subheader("Traces")
+    if not traces:
+        st.info("No traces recorded yet.")
+        return
+
+    labels = [f"{time.strftime('%H:%M:%S', time.localtime(root.start))}  {root.name}  ({root.duration:.2f}s, {len(spans)} spans)"
+              for root, spans in traces]
+    selected = st.selectbox("Trace:", range(len(traces)), format_func=lambda index: labels[index], key="selected_trace")
+    root, spans = traces[selected]
+
+    import altair as alt
+    import pandas as pd
+
+    rows = build_flame_rows(spans)
+    chart_data = pd.DataFrame(rows)
+    # Depth grows downwards like a flame graph turned upside down (an icicle chart)
+    chart = alt.Chart(chart_data).mark_bar(stroke="white").encode(
+        x=alt.X("start:Q", title="seconds since trace start"),
+        x2="end:Q",
+        y=alt.Y("depth:O", title=None, axis=None),
+        color=alt.Color("name:N", legend=alt.Legend(title="Span")),
+        tooltip=["name", alt.Tooltip("duration:Q", format=".3f"), "status", "thread", "attributes"]
+    ).properties(height=max(120, 28 * (chart_data["depth"].max() + 1)))
+    st.altair_chart(chart, use_container_width=True)
+
+    slowest = sorted(rows, key=lambda row: row["duration"], reverse=True)[:10]
+    with st.expander("Slowest spans"):
+        for row in slowest:
+            st.text(f"{row['duration']:8.3f}s  {'  ' * row['depth']}{row['name']}  [{row['status']}]")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Download traces (JSONL)", data=tracer.to_jsonl(), file_name="autogroq_traces.jsonl", mime="application/x-ndjson")
+    with col2:
+        st.button("Clear traces", on_click=tracer.clear)
+
+
 def display_user_input():
     user_input = st.text_area("Additional Input:", value=st.session_state.get("user_input", ""), key="user_input_widget", height=100, on_change=update_user_input)
     reference_url = st.text_input("URL:", key="reference_url_widget")
 
     if user_input:
-        url_pattern = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
-        url_match = url_pattern.search(user_input)
-        if url_match:
-            url = url_match.group()
-            if "reference_html" not in st.session_state or url not in st.session_state.reference_html:
-                html_content = fetch_web_content(url)
-                if html_content:
-                    st.session_state.reference_html[url] = html_content
-                else:
-                    st.warning("Failed to fetch HTML content.")
+        url = find_url(user_input)
+        if url:
+            # Pages are fetched once per server; the session keeps only the page it is using
+            html_content = shared_resources.get("reference_page", lambda: fetch_reference_page(url), url, ttl=REFERENCE_PAGE_TTL)
+            if html_content:
+                st.session_state.reference_html = {url: html_content}
             else:
+                st.warning("Failed to fetch HTML content.")
                 st.session_state.reference_html = {}
         else:
             st.session_state.reference_html = {}
@@ -368,6 +511,54 @@ def display_user_input():
     return user_input, reference_url
 
 
+def fetch_reference_page(url):
+    result = fetch_web_content(url)
+    return result if result.get("status") == "success" else None
+
+
+def get_project_owner():
+    """
+    The browser's owner token. Saved projects are listed and restored only
+    for the token they were created with, so ?project=<id> alone loads
+    nothing. The token travels in the ?owner= query parameter so a refresh or
+    bookmark keeps it; anyone given the full URL shares the projects.
+    """
+    owner = st.session_state.get("project_owner")
+    if not owner:
+        owner = st.query_params.get("owner") or secrets.token_urlsafe(16)
+        st.session_state.project_owner = owner
+    if st.query_params.get("owner") != owner:
+        st.query_params["owner"] = owner
+    return owner
+
+
+def restore_project_from_url():
+    """Reload the project named in the ?project= query parameter into a fresh session (e.g. after a refresh)."""
+    owner = get_project_owner()
+    project_id = st.query_params.get("project")
+    store = get_project_store()
+    if not project_id or st.session_state.get("project_id") == project_id or store is None:
+        return
+    if not restore_project(store, st.session_state, project_id, owner):
+        st.query_params.pop("project", None)
+
+
+def display_saved_projects():
+    store = get_project_store()
+    if store is None:
+        return
+    projects = store.list_projects(get_project_owner())
+    if not projects:
+        return
+    with st.sidebar.expander("Saved projects"):
+        labels = {project["id"]: f"{project['name'] or 'project'} ({project['updated_at'][:16].replace('T', ' ')})" for project in projects}
+        project_id = st.selectbox("Project", options=list(labels), format_func=labels.get, key="saved_project_select")
+        if st.button("Restore", key="restore_project_button"):
+            st.query_params["project"] = project_id
+            st.session_state.pop("project_id", None)
+            st.experimental_rerun()
+
+
 def display_reset_and_upload_buttons():
     col1, col2 = st.columns(RETRY_DELAY)  
     with col1:
@@ -376,13 +567,15 @@ def display_reset_and_upload_buttons():
             keys_to_reset = [
                 "rephrased_request", "discussion", "whiteboard", "user_request",
                 "user_input", "agents", "zip_buffer", "crewai_zip_buffer",
-                "autogen_zip_buffer", "uploaded_file_content", "discussion_history",
-                "last_comment", "user_api_key", "reference_url"
+                "autogen_zip_buffer", "bundle_buffer", "uploaded_file_content", "discussion_history", "discussion_turns",
+                "last_comment", "user_api_key", "reference_url", "project_id"
             ]
             # Reset each specified key
             for key in keys_to_reset:
                 if key in st.session_state:
                     del st.session_state[key]
+            # The saved project stays in the store; a new request starts a new one
+            st.query_params.pop("project", None)
             # Additionally, explicitly reset user_input to an empty string
             st.session_state.user_input = ""
             st.session_state.show_begin_button = True
@@ -392,6 +585,7 @@ def display_reset_and_upload_buttons():
         uploaded_file = st.file_uploader("Upload a sample .csv of your data (optional)", type="csv")
         
         if uploaded_file is not None:
+            import pandas as pd
             try:
                 # Attempt to read the uploaded file as a DataFrame
                 df = pd.read_csv(uploaded_file).head(5)
@@ -406,6 +600,19 @@ def display_reset_and_upload_buttons():
                 st.error(f"Error reading the file: {e}")                
 
 
+def display_round_controls():
+    agent_names = [agent.name for agent in st.session_state.agents]
+    selected_agents = st.multiselect("Round participants:", options=agent_names, default=agent_names, key="round_agents")
+    st.button(
+        "Run Round",
+        key="run_round_button",
+        help="Ask all selected agents at once; replies are added in the order listed",
+        on_click=run_agent_round,
+        args=(selected_agents,),
+        disabled=not selected_agents
+    )
+
+
 def display_user_request_input():
     if st.session_state.show_request_input:
         if st.session_state.get("previous_user_request") != st.session_state.get("user_request", ""):
@@ -419,116 +626,20 @@ def display_user_request_input():
 
 
 def extract_code_from_response(response):
-    code_pattern = r"```(.*?)```"
-    code_blocks = re.findall(code_pattern, response, re.DOTALL)
-
-    html_pattern = r"<html.*?>.*?</html>"
-    html_blocks = re.findall(html_pattern, response, re.DOTALL | re.IGNORECASE)
-
-    js_pattern = r"<script.*?>.*?</script>"
-    js_blocks = re.findall(js_pattern, response, re.DOTALL | re.IGNORECASE)
-
-    css_pattern = r"<style.*?>.*?</style>"
-    css_blocks = re.findall(css_pattern, response, re.DOTALL | re.IGNORECASE)
-
-    all_code_blocks = code_blocks + html_blocks + js_blocks + css_blocks
-    unique_code_blocks = list(set(all_code_blocks))
-
-    return "\n\n".join(unique_code_blocks) 
-
-
-def extract_content(response: Any) -> str:
-    if hasattr(response, 'content') and isinstance(response.content, list):
-        # Anthropic-specific handling
-        return response.content[0].text
-    elif isinstance(response, requests.models.Response):
-        # Groq and potentially other providers using requests.Response
-        try:
-            json_response = response.json()
-            if 'choices' in json_response and json_response['choices']:
-                return json_response['choices'][0]['message']['content']
-        except json.JSONDecodeError:
-            print("Failed to decode JSON from response")
-            return ""
-    elif isinstance(response, dict):
-        if 'choices' in response and response['choices']:
-            return response['choices'][0]['message']['content']
-        elif 'content' in response:
-            return response['content']
-    elif isinstance(response, str):
-        return response
-    print(f"Unexpected response format: {type(response)}")
-    return ""
- 
-
-def extract_json_objects(text: str) -> List[Dict]:
-    objects = []
-    stack = []
-    start_index = 0
-    for i, char in enumerate(text):
-        if char == "{":
-            if not stack:
-                start_index = i
-            stack.append(char)
-        elif char == "}":
-            if stack:
-                stack.pop()
-                if not stack:
-                    objects.append(text[start_index:i+1])
-    parsed_objects = []
-    for obj_str in objects:
-        try:
-            parsed_obj = json.loads(obj_str)
-            parsed_objects.append(parsed_obj)
-        except json.JSONDecodeError as e:
-            print(f"Error parsing JSON object: {e}")
-            print(f"JSON string: {obj_str}")
-    return parsed_objects
+    return "\n\n".join(extract_code_blocks(response))
 
 
 def get_agents_from_text(text: str) -> Tuple[List[AgentBaseModel], List[Dict[str, Any]]]:
-    print("Getting agents from text...")
-    
-    instructions = get_agents_prompt()
-    combined_content = f"{instructions}\n\nTeam of Experts:\n{text}"
+    return get_session_engine().get_agents_from_text(text)
     
-    llm_request_data = {
-        "model": st.session_state.model,
-        "temperature": st.session_state.temperature,
-        "max_tokens": st.session_state.max_tokens,
-        "messages": [
-            {"role": "user", "content": combined_content}
-        ]
-    }
-    
-    api_key = get_api_key()
-    llm_provider = get_llm_provider(api_key=api_key)
-    
-    try:
-        response = llm_provider.send_request(llm_request_data)
-        print(f"Response type: {type(response)}")
-        print(f"Response: {response}")
-
-        content = extract_content(response)
-        
-        if not content:
-            print("No content extracted from response.")
-            return [], []
 
-        print(f"Extracted content: {content}")
+def get_session_engine(session_state=None):
+    # Thin Streamlit adapter: the engine reads its config from the session and
+    # mutates the session state object directly.
+    if session_state is None:
+        session_state = st.session_state
+    return AutoGroqEngine(EngineConfig.from_session(session_state), state=session_state)
 
-        json_data = parse_json(content)
-        
-        if not json_data:
-            print("Failed to parse JSON data.")
-            return [], []
-
-        return create_agents(json_data)
-    
-    except Exception as e:
-        print(f"Error in get_agents_from_text: {e}")
-        return [], []
-    
 
 def get_discussion_history():
     return st.session_state.discussion_history
@@ -542,132 +653,12 @@ def get_provider_models(provider=None):
 
 
 def handle_user_request(session_state):
-    print("Debug: Handling user request for session state: ", session_state)
-    user_request = session_state.user_request
-    max_retries = MAX_RETRIES
-    retry_delay = RETRY_DELAY
-
-    for retry in range(max_retries):
-        try:
-            print("Debug: Sending request to rephrase_prompt")
-            model = session_state.model
-            print(f"Debug: Model: {model}")
-            rephrased_text = rephrase_prompt(user_request, model)
-            print(f"Debug: Rephrased text: {rephrased_text}")
-            if rephrased_text:
-                session_state.rephrased_request = rephrased_text
-                break
-            else:
-                print("Error: Failed to rephrase the user request.")
-                st.warning("Failed to rephrase the user request. Please try again.")
-                return
-        except Exception as e:
-            print(f"Error occurred in handle_user_request: {str(e)}")
-            if retry < max_retries - 1:
-                print(f"Retrying in {retry_delay} second(s)...")
-                time.sleep(retry_delay)
-            else:
-                print("Max retries exceeded.")
-                st.warning("An error occurred. Please try again.")
-                return
-
-    if "rephrased_request" not in session_state:
-        st.warning("Failed to rephrase the user request. Please try again.")
-        return
-
-    session_state.project_model.description = session_state.user_request
-    rephrased_text = session_state.rephrased_request
-    session_state.project_model.set_re_engineered_prompt(rephrased_text)
-
-    if "project_manager_output" not in session_state:
-        project_manager_output = create_project_manager(rephrased_text)
-
-        if not project_manager_output:
-            print("Error: Failed to create Project Manager.")
-            st.warning("Failed to create Project Manager. Please try again.")
-            return
-
-        session_state.project_manager_output = project_manager_output
-
-        current_project = Current_Project()
-        current_project.set_re_engineered_prompt(rephrased_text)
-
-        deliverables_patterns = [
-            r"(?:Deliverables|Key Deliverables):\n(.*?)(?=Timeline|Team of Experts|$)",
-            r"\*\*(?:Deliverables|Key Deliverables):\*\*\n(.*?)(?=\*\*Timeline|\*\*Team of Experts|$)"
-        ]
-
-        deliverables_text = None
-        for pattern in deliverables_patterns:
-            match = re.search(pattern, project_manager_output, re.DOTALL)
-            if match:
-                deliverables_text = match.group(1).strip()
-                break
-
-        if deliverables_text:
-            deliverables = re.findall(r'\d+\.\s*(.*)', deliverables_text)
-            for deliverable in deliverables:
-                current_project.add_deliverable(deliverable.strip())
-                session_state.project_model.add_deliverable(deliverable.strip())
-        else:
-            print("Warning: 'Deliverables' or 'Key Deliverables' section not found in Project Manager's output.")
-
-        session_state.current_project = current_project
-
-        update_discussion_and_whiteboard("Project Manager", project_manager_output, "")
-    else:
-        project_manager_output = session_state.project_manager_output
-
-    team_of_experts_patterns = [
-        r"\*\*Team of Experts:\*\*\n(.*)",
-        r"Team of Experts:\n(.*)"
-    ]
-
-    team_of_experts_text = None
-    for pattern in team_of_experts_patterns:
-        match = re.search(pattern, project_manager_output, re.DOTALL)
-        if match:
-            team_of_experts_text = match.group(1).strip()
-            break
-
-    if team_of_experts_text:
-        autogen_agents, crewai_agents = get_agents_from_text(team_of_experts_text)
-
-        if not autogen_agents:
-            print("Error: No agents created.")
-            st.warning("Failed to create agents. Please try again.")
-            return
-
-        session_state.agents = autogen_agents
-        session_state.workflow.agents = session_state.agents
-
-        # Generate the workflow data
-        workflow_data, _ = get_workflow_from_agents(autogen_agents)
-        workflow_data["created_at"] = datetime.datetime.now().isoformat()
-        print(f"Debug: Workflow data: {workflow_data}")
-        print(f"Debug: CrewAI agents: {crewai_agents}")
-
-        if workflow_data:
-            autogen_zip_buffer, crewai_zip_buffer = zip_files_in_memory(workflow_data)
-            session_state.autogen_zip_buffer = autogen_zip_buffer
-            session_state.crewai_zip_buffer = crewai_zip_buffer
-        else:
-            session_state.autogen_zip_buffer = None
-            session_state.crewai_zip_buffer = None
-
-        # Update the project session state with the workflow data
-        session_state.project_model.workflows = [workflow_data]
-
-        print("Debug: Agents in session state project workflow:")
-        for agent in workflow_data["receiver"]["groupchat_config"]["agents"]:
-            print(agent)
-
-        # Indicate that a rerun is needed
-        session_state.need_rerun = True
-    else:
-        print("Error: 'Team of Experts' section not found in Project Manager's output.")
-        st.warning("Failed to extract the team of experts from the Project Manager's output. Please try again.")
-        return
+    engine = get_session_engine(session_state)
+    engine.handle_user_request(session_state.user_request)
+    show_engine_messages(engine)
+    if session_state.get("project_id"):
+        # Lets a refresh of this page restore the project
+        st.query_params["project"] = session_state.project_id
     
 
 def key_prompt():
@@ -679,78 +670,16 @@ def key_prompt():
         return
 
 
-def parse_json(content: str) -> List[Dict[str, Any]]:
-    try:
-        json_data = json.loads(content)
-        if isinstance(json_data, list):
-            return json_data
-        else:
-            print("JSON data is not a list as expected.")
-            return []
-    except json.JSONDecodeError as e:
-        print(f"Error parsing JSON: {e}")
-        print(f"Content: {content}")
-        return []
-
-
 def rephrase_prompt(user_request, model, max_tokens=None, llm_provider=None, provider=None):
-    print("Executing rephrase_prompt()")
-
-    refactoring_prompt = get_rephrased_user_prompt(user_request)
-
-    if llm_provider is None:
-        api_key = get_api_key()
-        try:
-            llm_provider = get_llm_provider(api_key=api_key, provider=provider)
-        except Exception as e:
-            print(f"Error initializing LLM provider: {str(e)}")
-            return None
-
-    if max_tokens is None:
-        max_tokens = llm_provider.get_available_models().get(model, 4096)
-
-    llm_request_data = {
-        "model": model,
-        "temperature": st.session_state.temperature,
-        "max_tokens": max_tokens,
-        "top_p": 1,
-        "stop": "TERMINATE",
-        "messages": [
-            {
-                "role": "user",
-                "content": refactoring_prompt,
-            },
-        ],
-    }
-
-    try:
-        print("Sending request to LLM API...")
-        print(f"Request Details:")
-        print(f"Provider: {provider}")
-        print(f"llm_provider: {llm_provider}")
-        print(f" Model: {model}")
-        print(f" Max Tokens: {max_tokens}")
-        print(f" Messages: {llm_request_data['messages']}")
-
-        response = llm_provider.send_request(llm_request_data)
-        
-        if response is None:
-            print("Error: No response received from the LLM provider.")
-            return None
+    return get_session_engine().rephrase_prompt(user_request, model, max_tokens, llm_provider=llm_provider, provider=provider)
 
-        print(f"Response received. Processing response...")
-        response_data = llm_provider.process_response(response)
-        print(f"Response Data: {json.dumps(response_data, indent=2)}")
 
-        if "choices" in response_data and len(response_data["choices"]) > 0:
-            rephrased = response_data["choices"][0]["message"]["content"]
-            return rephrased.strip()
-        else:
-            print("Error: Unexpected response format. 'choices' field missing or empty.")
-            return None
-    except Exception as e:
-        print(f"An error occurred: {str(e)}")
-        return None
+def run_agent_round(agent_names):
+    agent_indices = [index for index, agent in enumerate(st.session_state.agents) if agent.name in agent_names]
+    engine = get_session_engine()
+    with st.spinner(f"Running round with {len(agent_indices)} agents..."):
+        engine.run_round(agent_indices)
+    show_engine_messages(engine)
 
 
 def select_model():
@@ -842,6 +771,12 @@ def set_temperature():
         st.session_state.temperature = temperature_slider
 
 
+def show_engine_messages(engine):
+    for level, message in engine.messages:
+        getattr(st, level)(message)
+    engine.messages = []
+
+
 def show_interfaces():
     with st.container():
         col1, col2 = st.columns([3, 1])
@@ -849,117 +784,43 @@ def show_interfaces():
             display_discussion_and_whiteboard()
         with col2:
             auto_moderate = st.checkbox("Auto-moderate (slow, eats tokens, but very cool)", key="auto_moderate", on_change=trigger_moderator_agent_if_checked)
-            if auto_moderate:
-                with st.spinner("Auto-moderating..."):
-                    moderator_response = trigger_moderator_agent()
+            auto_moderation_run = st.session_state.get("auto_moderation_run")
+            if auto_moderation_run is not None:
+                display_auto_moderation_progress()
+            if auto_moderation_run is not None and auto_moderation_run.is_running:
+                pass  # The background run is producing the moderator's input
+            elif auto_moderate:
+                st.checkbox("Speculative moderation (overlap moderator with agent turns)", key="speculative_moderation")
+                moderator_response = st.session_state.pop("pending_moderator_response", None)
+                if moderator_response is None:
+                    with st.spinner("Auto-moderating..."):
+                        moderator_response = trigger_moderator_agent()
                 if moderator_response:
-                    if st.session_state.next_agent:
-                        st.session_state.user_input = f"To {st.session_state.next_agent}: {moderator_response}"
-                    else:
-                        st.session_state.user_input = moderator_response
+                    st.session_state.user_input = format_moderated_input(st.session_state.next_agent, moderator_response)
                     st.success("Auto-moderation complete. New input has been generated.")
                 else:
                     st.warning("Auto-moderation failed due to rate limiting. Please wait a moment and try again, or proceed manually.")
             
             user_input = st.text_area("Additional Input:", value=st.session_state.user_input, height=200, key="user_input_widget")
             reference_url = st.text_input("URL:", key="reference_url_widget")
+            display_round_controls()
+            display_auto_moderation_controls()
 
     return user_input, reference_url
 
 
-def trigger_moderator_agent():
-    current_project = st.session_state.current_project
-    goal = current_project.re_engineered_prompt
-    last_speaker = st.session_state.last_agent
-    last_comment = st.session_state.last_comment
-    discussion_history = st.session_state.discussion_history
-
-    deliverable_index, current_deliverable = current_project.get_next_unchecked_deliverable()
-    
-    if current_deliverable is None:
-        if current_project.current_phase != "Deployment":
-            current_project.move_to_next_phase()
-            st.success(f"Moving to {current_project.current_phase} phase!")
-            deliverable_index, current_deliverable = current_project.get_next_unchecked_deliverable()
-        else:
-            st.success("All deliverables have been completed and deployed!")
-            return None
+def start_auto_moderation(max_cycles, stop_on, speculative):
+    auto_moderation_run = AutoModerationRun.from_session(
+        st.session_state, max_cycles=max_cycles, stop_on=stop_on, speculative=speculative)
+    st.session_state.auto_moderation_version = None
+    st.session_state.auto_moderation_run = auto_moderation_run.start()
 
-    current_phase = current_project.get_next_uncompleted_phase(deliverable_index)
-    
-    team_members = []
-    for agent in st.session_state.agents:
-        if isinstance(agent, AgentBaseModel):
-            team_members.append(f"{agent.name}: {agent.description}")
-        else:
-            # Fallback for dictionary-like structure
-            agent_name = agent.get('config', {}).get('name', agent.get('name', 'Unknown'))
-            agent_description = agent.get('description', 'No description')
-            team_members.append(f"{agent_name}: {agent_description}")
-    team_members_str = "\n".join(team_members)
-
-    moderator_prompt = get_moderator_prompt(discussion_history, goal, last_comment, last_speaker, team_members_str, current_deliverable, current_phase)
-
-    for attempt in range(MAX_RETRIES):
-        api_key = get_api_key()
-        llm_provider = get_llm_provider(api_key=api_key)
-        llm_request_data = {
-            "model": st.session_state.model,
-            "temperature": st.session_state.temperature,
-            "max_tokens": st.session_state.max_tokens,
-            "top_p": 1,
-            "stop": "TERMINATE",
-            "messages": [
-                {
-                    "role": "user",
-                    "content": moderator_prompt
-                }
-            ]
-        }
-        retry_delay = RETRY_DELAY
-        time.sleep(retry_delay)
-        response = llm_provider.send_request(llm_request_data)
-
-        if isinstance(response, dict) and 'choices' in response:
-            # Handle response from providers like Groq
-            content = response['choices'][0]['message']['content']
-        elif hasattr(response, 'content') and isinstance(response.content, list):
-            # Handle Anthropic-style response
-            content = response.content[0].text
-        else:
-            print(f"Unexpected response format: {type(response)}")
-            continue
-
-        if content:
-            # Extract the agent name from the content
-            agent_name_match = re.match(r"To (\w+( \w+)*):", content)
-            if agent_name_match:
-                next_agent = agent_name_match.group(1)
-                # Check if the extracted name is a valid agent and not a tool
-                if any(agent.name.lower() == next_agent.lower() for agent in st.session_state.agents):
-                    st.session_state.next_agent = next_agent
-                    # Remove the "To [Agent Name]:" prefix from the content
-                    content = re.sub(r"^To \w+( \w+)*:\s*", "", content).strip()
-                else:
-                    st.warning(f"'{next_agent}' is not a valid agent. Please select a valid agent.")
-                    st.session_state.next_agent = None
-            else:
-                st.session_state.next_agent = None
-            
-            if "PHASE_COMPLETED" in content:
-                current_project.mark_deliverable_phase_done(deliverable_index, current_phase)
-                content = content.replace("PHASE_COMPLETED", "").strip()
-                st.success(f"Phase {current_phase} completed for deliverable: {current_deliverable}")
-            
-            if "DELIVERABLE_COMPLETED" in content:
-                current_project.mark_deliverable_done(deliverable_index)
-                content = content.replace("DELIVERABLE_COMPLETED", "").strip()
-                st.success(f"Deliverable completed: {current_deliverable}")
-            
-            return content.strip()
 
-    logger.error("All retry attempts failed.")
-    return None
+def trigger_moderator_agent():
+    engine = get_session_engine()
+    moderator_response = engine.trigger_moderator()
+    show_engine_messages(engine)
+    return moderator_response
 
 
 def trigger_moderator_agent_if_checked():
@@ -989,23 +850,12 @@ def update_deliverable_status(index):
         current_project.deliverables[index]["done"] = False
         for phase in current_project.implementation_phases:
             current_project.deliverables[index]["phase"][phase] = False
+    record_deliverables(get_project_store(), st.session_state)
     st.experimental_rerun()
 
 
 def update_discussion_and_whiteboard(agent_name, response, user_input):
-    # Update the full discussion history
-    if user_input:
-        user_input_text = f"\n\nUser: {user_input}\n\n"
-        st.session_state.discussion_history += user_input_text
-
-    # Format the most recent response
-    st.session_state.most_recent_response = f"{agent_name}:\n\n{response}\n\n"
-
-    # Add the new response to the full discussion history
-    st.session_state.discussion_history += st.session_state.most_recent_response
-
-    st.session_state.last_agent = agent_name
-    st.session_state.last_comment = response
+    get_session_engine().update_discussion(agent_name, response, user_input)
 
     # Force a rerun to update the UI
     st.experimental_rerun()
@@ -1,18 +1,28 @@
 # utils/workflow_utils.py
 import datetime
+import logging
 import streamlit as st
 
-from configs.config import FALLBACK_MODEL_TOKEN_LIMITS
-
 from tools.fetch_web_content import fetch_web_content_tool
+from configs.config import LLM_PROVIDER, WORKFLOW_FRAGMENT_CACHE_SIZE
 from utils.agent_utils import create_agent_data
+from utils.resource_utils import SharedResources
 from utils.text_utils import sanitize_text
+from utils.token_utils import get_model_info
+
+logger = logging.getLogger(__name__)
+
+# Per-agent pieces of the generated workflow, shared by all sessions. An edited
+# agent serializes differently, so only the agents that changed are rebuilt.
+workflow_fragments = SharedResources(max_entries=WORKFLOW_FRAGMENT_CACHE_SIZE)
 
 
-def get_workflow_from_agents(agents):
+def get_workflow_from_agents(agents, model=None, temperature=None, provider=None):
     current_timestamp = datetime.datetime.now().isoformat()
-    temperature_value = st.session_state.get('temperature', 0.3)
-    selected_model = st.session_state.get('model')  # Get the selected model from session state
+    # Explicit arguments let the engine build workflows outside a Streamlit session
+    temperature_value = temperature if temperature is not None else st.session_state.get('temperature', 0.3)
+    selected_model = model if model is not None else st.session_state.get('model')
+    selected_provider = provider if provider is not None else st.session_state.get('provider', LLM_PROVIDER)
 
     workflow = {
         "name": "AutoGroq Workflow",
@@ -56,7 +66,7 @@ def get_workflow_from_agents(agents):
                     "temperature": temperature_value,
                     "cache_seed": 42,
                     "timeout": 600,
-                    "max_tokens": FALLBACK_MODEL_TOKEN_LIMITS.get(selected_model, 4096),  # Use the selected model
+                    "max_tokens": get_model_info(None, selected_model)["max_output"],  # Use the selected model
                     "extra_body": None
                 },
                 "human_input_mode": "NEVER",
@@ -86,70 +96,96 @@ def get_workflow_from_agents(agents):
         "sample_tasks": [],
     }
 
+    # The coordinator's message lists the other agents, so it depends on the rest of the team
+    other_agent_names = tuple(get_formatted_agent_name(agent) for agent in agents[1:])
     for index, agent in enumerate(agents):
-        agent_dict = agent.to_dict()
-        agent_name = agent_dict["name"]
-        description = agent_dict["description"]
-        formatted_agent_name = sanitize_text(agent_name).lower().replace(' ', '_')
-        sanitized_description = sanitize_text(description)
-        
-        system_message = f"You are a helpful assistant that can act as {agent_name} who {sanitized_description}."
-        if index == 0:
-            other_agent_names = [sanitize_text(a.name).lower().replace(' ', '_') for a in agents[1:]]
-            system_message += f" You are the primary coordinator who will receive suggestions or advice from all the other agents ({', '.join(other_agent_names)}). You must ensure that the final response integrates the suggestions from other agents or team members. YOUR FINAL RESPONSE MUST OFFER THE COMPLETE RESOLUTION TO THE USER'S REQUEST. When the user's request has been satisfied and all perspectives are integrated, you can respond with TERMINATE."
-
-        agent_config = {
-            "type": "assistant",
-            "config": {
-                "name": formatted_agent_name,
-                "llm_config": {
-                    "config_list": [
-                        {
-                            "user_id": "default",
-                            "timestamp": current_timestamp,
-                            "model": selected_model,  # Use the selected model
-                            "base_url": None,
-                            "api_type": None,
-                            "api_version": None,
-                            "description": "OpenAI model configuration"
-                        }
-                    ],
-                    "temperature": temperature_value,
-                    "cache_seed": 42,
-                    "timeout": 600,
-                    "max_tokens": FALLBACK_MODEL_TOKEN_LIMITS.get(selected_model, 4096),  # Use the selected model
-                    "extra_body": None
-                },
-                "human_input_mode": "NEVER",
-                "max_consecutive_auto_reply": 8,
-                "system_message": system_message,
-                "is_termination_msg": None,
-                "code_execution_config": None,
-                "default_auto_reply": "",
-                "description": None
-            },
-            "timestamp": current_timestamp,
-            "user_id": "default",
-            "tools": [],
-            "role": agent_dict["role"],
-            "goal": agent_dict["goal"],
-            "backstory": agent_dict["backstory"]
-        }
+        agent_config = get_agent_config(agent, selected_model, temperature_value, other_agent_names if index == 0 else None)
+        workflow["receiver"]["groupchat_config"]["agents"].append(agent_config)
 
-        if agent.name == "Web Content Retriever":
-            agent_config['tools'] = [fetch_web_content_tool.to_dict()]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Workflow agents assigned: %s", [agent["config"]["name"] for agent in workflow["receiver"]["groupchat_config"]["agents"]])
 
-        workflow["receiver"]["groupchat_config"]["agents"].append(agent_config)
+    crewai_agents = [get_crewai_agent_data(agent, selected_model, selected_provider) for agent in agents]
+
+    return workflow, crewai_agents
 
 
+def get_formatted_agent_name(agent):
+    name = agent.name
+    return workflow_fragments.get("agent_name", lambda: sanitize_text(name).lower().replace(' ', '_'), name)
 
-    print("Debug: Workflow agents assigned:")
-    for agent in workflow["receiver"]["groupchat_config"]["agents"]:
-        print(agent)
 
-    crewai_agents = []
-    for agent in agents:
-        _, crewai_agent_data = create_agent_data(agent.to_dict())
-        crewai_agents.append(crewai_agent_data)
+def get_agent_config(agent, selected_model, temperature_value, other_agent_names=None):
+    """
+    The workflow entry for `agent`, built once per agent content, model,
+    temperature and (for the coordinator) team, then reused. Its timestamp is
+    when it was built. The returned dict is shared and must not be modified.
+    """
+    agent_json = agent.to_json()
+    return workflow_fragments.get(
+        "agent_config",
+        lambda: build_agent_config(agent, selected_model, temperature_value, other_agent_names),
+        agent_json, selected_model, temperature_value, other_agent_names
+    )
 
-    return workflow, crewai_agents
+
+def get_crewai_agent_data(agent, selected_model, selected_provider):
+    agent_json = agent.to_json()
+    return workflow_fragments.get(
+        "crewai_agent",
+        lambda: create_agent_data(agent.to_dict(), provider=selected_provider, model=selected_model)[1],
+        agent_json, selected_model, selected_provider
+    )
+
+
+def build_agent_config(agent, selected_model, temperature_value, other_agent_names=None):
+    current_timestamp = datetime.datetime.now().isoformat()
+    agent_dict = agent.to_dict()
+    agent_name = agent_dict["name"]
+    sanitized_description = sanitize_text(agent_dict["description"])
+
+    system_message = f"You are a helpful assistant that can act as {agent_name} who {sanitized_description}."
+    if other_agent_names is not None:
+        system_message += f" You are the primary coordinator who will receive suggestions or advice from all the other agents ({', '.join(other_agent_names)}). You must ensure that the final response integrates the suggestions from other agents or team members. YOUR FINAL RESPONSE MUST OFFER THE COMPLETE RESOLUTION TO THE USER'S REQUEST. When the user's request has been satisfied and all perspectives are integrated, you can respond with TERMINATE."
+
+    agent_config = {
+        "type": "assistant",
+        "config": {
+            "name": get_formatted_agent_name(agent),
+            "llm_config": {
+                "config_list": [
+                    {
+                        "user_id": "default",
+                        "timestamp": current_timestamp,
+                        "model": selected_model,  # Use the selected model
+                        "base_url": None,
+                        "api_type": None,
+                        "api_version": None,
+                        "description": "OpenAI model configuration"
+                    }
+                ],
+                "temperature": temperature_value,
+                "cache_seed": 42,
+                "timeout": 600,
+                "max_tokens": get_model_info(None, selected_model)["max_output"],  # Use the selected model
+                "extra_body": None
+            },
+            "human_input_mode": "NEVER",
+            "max_consecutive_auto_reply": 8,
+            "system_message": system_message,
+            "is_termination_msg": None,
+            "code_execution_config": None,
+            "default_auto_reply": "",
+            "description": None
+        },
+        "timestamp": current_timestamp,
+        "user_id": "default",
+        "tools": [],
+        "role": agent_dict["role"],
+        "goal": agent_dict["goal"],
+        "backstory": agent_dict["backstory"]
+    }
+
+    if agent.name == "Web Content Retriever":
+        agent_config['tools'] = [fetch_web_content_tool.to_dict()]
+    return agent_config